@@ -0,0 +1,430 @@
+#!/usr/bin/env python3
+"""
+Analítica incremental del access log de StarkMind
+
+Lee `logs/access.log` (formato combined de nginx/gunicorn, montado desde el
+contenedor) y `logs/access.jsonl` (el access log JSON de la app), incluidas
+sus copias rotadas y comprimidas (`access.log.1`, `access.log.2.gz`...), y
+acumula rollups compactos: peticiones, RPS, estados y bytes por ruta, y los
+referrers y user agents más frecuentes. Las líneas JSON muestreadas (campo
+`sample_rate`, p. ej. 0.1 en los estáticos) cuentan como 1 / sample_rate
+peticiones.
+
+    python access_analytics.py                 # procesar lo nuevo y mostrar el resumen
+    python access_analytics.py --json          # resumen en JSON
+    python access_analytics.py --reset         # olvidar el checkpoint y reprocesar todo
+
+Los archivos se recorren con mmap. El checkpoint (ANALYTICS_STATE_PATH)
+guarda por archivo el offset ya procesado, identificado por su primera línea
+(sobrevive a la rotación y a la compresión), así cada ejecución solo lee las
+líneas nuevas. Los tramos grandes se dividen en límites de línea y se
+procesan en un pool de procesos; los .gz, que no admiten acceso aleatorio,
+van enteros a un proceso cada uno.
+"""
+
+import argparse
+import glob
+import gzip
+import hashlib
+import json
+import mmap
+import os
+import re
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+LOG_DIR = os.getenv('LOG_DIR', 'logs')
+ANALYTICS_STATE_PATH = os.getenv('ANALYTICS_STATE_PATH', os.path.join('data', 'access_analytics.json'))
+ANALYTICS_WORKERS = int(os.getenv('ANALYTICS_WORKERS', str(os.cpu_count() or 1)))
+# Tramos nuevos mayores que esto se reparten entre el pool
+PARALLEL_CHUNK_BYTES = int(os.getenv('ANALYTICS_CHUNK_BYTES', str(64 * 1024 * 1024)))
+# Entradas que se conservan de cada contador de referrers/user agents al guardar
+TOP_KEEP = 1000
+
+DEFAULT_PATTERNS = ('access.log*', 'access.jsonl*')
+
+# host ident user [fecha] "método ruta protocolo" estado bytes "referrer" "user agent"
+COMBINED = re.compile(
+    r'(?P<ip>\S+) \S+ \S+ \[(?P<ts>[^\]]+)\] "(?P<method>[A-Z]+) (?P<path>\S+)[^"]*" '
+    r'(?P<status>\d{3}) (?P<bytes>\d+|-)(?: "(?P<referrer>[^"]*)" "(?P<agent>[^"]*)")?'
+)
+
+# Assets con hash de build e imágenes/videos se agrupan para que los rollups no crezcan sin límite
+ROUTE_GROUPS = (
+    (re.compile(r'^/static/(js|css|media)/'), '/static/{}/*'),
+    (re.compile(r'^/img/'), '/img/*'),
+)
+
+STATUS_CLASSES = tuple(f'{n}xx' for n in range(10))
+
+# Las rutas inexistentes (escaneos de bots) comparten una entrada
+NOT_FOUND_ROUTE = '<404>'
+
+# Cachés por proceso: epoch de cada hora y ruta normalizada de cada path
+MAX_CACHED_ROUTES = 10000
+_hours: Dict[str, float] = {}
+_routes: Dict[str, str] = {}
+
+
+def normalize_route(path: str) -> str:
+    """Ruta sin query string, con los assets agrupados (memorizada: se repiten mucho)"""
+    path = path.split('?', 1)[0] or '/'
+    route = _routes.get(path)
+    if route is not None:
+        return route
+    route = path
+    for pattern, group in ROUTE_GROUPS:
+        match = pattern.match(path)
+        if match:
+            route = group.format(*match.groups())
+            break
+    if len(_routes) >= MAX_CACHED_ROUTES:
+        _routes.clear()
+    _routes[path] = route
+    return route
+
+
+def _combined_ts(ts: str) -> float:
+    """`09/Jun/2025:23:39:16 +0000` a epoch; strptime solo una vez por hora y zona"""
+    key = ts[:14] + ts[20:]
+    hour = _hours.get(key)
+    if hour is None:
+        hour = _hours[key] = datetime.strptime(key, '%d/%b/%Y:%H %z').timestamp()
+    return hour + int(ts[15:17]) * 60 + int(ts[18:20])
+
+
+def _json_ts(ts: str) -> float:
+    """`2026-10-18T16:17:54.829Z` a epoch"""
+    key = ts[:13]
+    hour = _hours.get(key)
+    if hour is None:
+        hour = _hours[key] = datetime.strptime(key, '%Y-%m-%dT%H').replace(tzinfo=timezone.utc).timestamp()
+    return hour + int(ts[14:16]) * 60 + float(ts[17:23].rstrip('Z'))
+
+
+class Rollup:
+    """Agregados por ruta y por hora; se combinan con merge()"""
+
+    def __init__(self):
+        self.lines = 0
+        # Peticiones estimadas: cada línea pesa 1 / sample_rate
+        self.requests = 0
+        self.skipped = 0
+        self.first_ts: Optional[float] = None
+        self.last_ts: Optional[float] = None
+        self.routes: Dict[str, dict] = {}
+        self.hours: Dict[str, Dict[int, int]] = {}
+        self.referrers: Counter = Counter()
+        self.agents: Counter = Counter()
+
+    def add(self, route: str, status: int, size: int, ts: float, referrer: Optional[str], agent: Optional[str],
+            weight: float = 1):
+        self.lines += 1
+        self.requests += weight
+        if status == 404:
+            route = NOT_FOUND_ROUTE
+        if self.first_ts is None or ts < self.first_ts:
+            self.first_ts = ts
+        if self.last_ts is None or ts > self.last_ts:
+            self.last_ts = ts
+        stats = self.routes.get(route)
+        if stats is None:
+            stats = self.routes[route] = {'requests': 0, 'bytes': 0, 'status': {}}
+        stats['requests'] += weight
+        stats['bytes'] += size * weight
+        status_class = STATUS_CLASSES[status // 100]
+        stats['status'][status_class] = stats['status'].get(status_class, 0) + weight
+        hours = self.hours.setdefault(route, {})
+        hour = int(ts) // 3600 * 3600
+        hours[hour] = hours.get(hour, 0) + weight
+        if referrer and referrer != '-':
+            self.referrers[referrer] += weight
+        if agent:
+            self.agents[agent] += weight
+
+    def parse(self, line: bytes):
+        """Una línea en formato combined o JSON; las que no se reconocen se cuentan como skipped"""
+        try:
+            text = line.decode('utf-8', 'replace')
+            if text.startswith('{'):
+                entry = json.loads(text)
+                sample_rate = float(entry.get('sample_rate') or 1)
+                self.add(normalize_route(entry['path']), int(entry['status']),
+                         int(entry.get('bytes') or 0), _json_ts(entry['ts']),
+                         entry.get('referrer'), entry.get('user_agent'),
+                         1 / sample_rate if 0 < sample_rate < 1 else 1)
+                return
+            match = COMBINED.match(text)
+            if match is None:
+                self.skipped += 1
+                return
+            ts, path, status, size, referrer, agent = match.group('ts', 'path', 'status', 'bytes', 'referrer', 'agent')
+            self.add(normalize_route(path), int(status), 0 if size == '-' else int(size), _combined_ts(ts),
+                     referrer, agent)
+        except (ValueError, KeyError, IndexError):
+            self.skipped += 1
+
+    def merge(self, other: 'Rollup') -> 'Rollup':
+        self.lines += other.lines
+        self.requests += other.requests
+        self.skipped += other.skipped
+        for ts in (other.first_ts, other.last_ts):
+            if ts is not None:
+                self.first_ts = ts if self.first_ts is None else min(self.first_ts, ts)
+                self.last_ts = ts if self.last_ts is None else max(self.last_ts, ts)
+        for route, stats in other.routes.items():
+            mine = self.routes.setdefault(route, {'requests': 0, 'bytes': 0, 'status': {}})
+            mine['requests'] += stats['requests']
+            mine['bytes'] += stats['bytes']
+            for status_class, count in stats['status'].items():
+                mine['status'][status_class] = mine['status'].get(status_class, 0) + count
+        for route, hours in other.hours.items():
+            mine = self.hours.setdefault(route, {})
+            for hour, count in hours.items():
+                mine[hour] = mine.get(hour, 0) + count
+        self.referrers.update(other.referrers)
+        self.agents.update(other.agents)
+        return self
+
+    def to_dict(self) -> dict:
+        return {
+            'lines': self.lines,
+            'requests': self.requests,
+            'skipped': self.skipped,
+            'first_ts': self.first_ts,
+            'last_ts': self.last_ts,
+            'routes': self.routes,
+            'hours': {route: {str(hour): count for hour, count in hours.items()} for route, hours in self.hours.items()},
+            # Conteo aproximado de los más frecuentes: se recorta la cola larga
+            'referrers': dict(self.referrers.most_common(TOP_KEEP)),
+            'agents': dict(self.agents.most_common(TOP_KEEP)),
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'Rollup':
+        rollup = cls()
+        rollup.lines = data.get('lines', 0)
+        rollup.requests = data.get('requests', rollup.lines)
+        rollup.skipped = data.get('skipped', 0)
+        rollup.first_ts = data.get('first_ts')
+        rollup.last_ts = data.get('last_ts')
+        rollup.routes = data.get('routes', {})
+        rollup.hours = {route: {int(hour): count for hour, count in hours.items()}
+                        for route, hours in data.get('hours', {}).items()}
+        rollup.referrers = Counter(data.get('referrers', {}))
+        rollup.agents = Counter(data.get('agents', {}))
+        return rollup
+
+    def summary(self, top: int = 10) -> dict:
+        """Rutas ordenadas por peticiones con RPS medio y pico horario, y los tops"""
+        span = max(1.0, (self.last_ts or 0) - (self.first_ts or 0))
+        routes = []
+        for route, stats in sorted(self.routes.items(), key=lambda item: item[1]['requests'], reverse=True)[:top]:
+            routes.append({
+                'route': route,
+                'requests': round(stats['requests']),
+                'rps': round(stats['requests'] / span, 4),
+                'peak_hour_rps': round(max(self.hours.get(route, {0: 0}).values()) / 3600, 4),
+                'bytes': round(stats['bytes']),
+                'status': {status_class: round(count) for status_class, count in sorted(stats['status'].items())},
+            })
+        return {
+            'lines': self.lines,
+            'requests': round(self.requests),
+            'skipped': self.skipped,
+            'from': datetime.fromtimestamp(self.first_ts, timezone.utc).isoformat() if self.first_ts else None,
+            'to': datetime.fromtimestamp(self.last_ts, timezone.utc).isoformat() if self.last_ts else None,
+            'rps': round(self.requests / span, 4),
+            'routes': routes,
+            'top_referrers': [(value, round(count)) for value, count in self.referrers.most_common(top)],
+            'top_user_agents': [(value, round(count)) for value, count in self.agents.most_common(top)],
+        }
+
+
+# -- Lectura de archivos ----------------------------------------------------
+
+def _open(path: str):
+    return gzip.open(path, 'rb') if path.endswith('.gz') else open(path, 'rb')
+
+
+def fingerprint(path: str) -> Optional[str]:
+    """Hash de la primera línea: identifica el archivo aunque se rote o se comprima"""
+    try:
+        with _open(path) as f:
+            first = f.readline(4096)
+    except (OSError, EOFError):
+        return None
+    if not first.endswith(b'\n'):
+        return None  # Aún no hay una línea completa
+    return hashlib.blake2b(first, digest_size=12).hexdigest()
+
+
+def _process_range(path: str, start: int, end: int) -> Rollup:
+    """Parsear las líneas de [start, end) con mmap (el rango empieza y termina en límite de línea)"""
+    rollup = Rollup()
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        mm.seek(start)
+        readline = mm.readline
+        while mm.tell() < end:
+            rollup.parse(readline())
+    return rollup
+
+
+def _process_gzip(path: str, skip: int) -> Tuple[Rollup, int]:
+    """Parsear un archivo comprimido saltando los `skip` bytes ya procesados"""
+    rollup = Rollup()
+    offset = 0
+    with gzip.open(path, 'rb') as f:
+        for line in f:
+            if offset >= skip and line.endswith(b'\n'):
+                rollup.parse(line)
+            offset += len(line)
+    return rollup, offset
+
+
+def split_on_lines(path: str, start: int, end: int, chunk_bytes: int) -> List[Tuple[int, int]]:
+    """Dividir [start, end) en tramos de ~chunk_bytes que terminan en salto de línea"""
+    if end - start <= chunk_bytes:
+        return [(start, end)]
+    ranges = []
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        while start < end:
+            cut = mm.find(b'\n', min(start + chunk_bytes, end - 1), end)
+            cut = end if cut == -1 else cut + 1
+            ranges.append((start, cut))
+            start = cut
+    return ranges
+
+
+def complete_end(path: str, size: int) -> int:
+    """Offset justo después del último salto de línea (la última línea puede estar a medias)"""
+    if size == 0:
+        return 0
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        return mm.rfind(b'\n', 0, size) + 1
+
+
+# -- Checkpoint -------------------------------------------------------------
+
+def load_state(path: str = ANALYTICS_STATE_PATH) -> dict:
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {'files': {}, 'sealed': [], 'rollup': {}}
+
+
+def save_state(state: dict, path: str = ANALYTICS_STATE_PATH):
+    """Escritura atómica del checkpoint y los rollups"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f, separators=(',', ':'))
+    os.replace(tmp_path, path)
+
+
+def discover(log_dir: str = LOG_DIR, patterns=DEFAULT_PATTERNS) -> List[str]:
+    """Archivos de access log, del más antiguo (rotado) al actual"""
+    paths = {path for pattern in patterns for path in glob.glob(os.path.join(log_dir, pattern))}
+    return sorted((p for p in paths if not p.endswith(('.lock', '.tmp'))), key=os.path.getmtime)
+
+
+def run(paths: List[str], state: dict, workers: int = ANALYTICS_WORKERS,
+        chunk_bytes: int = PARALLEL_CHUNK_BYTES) -> Tuple[Rollup, dict]:
+    """Procesar lo nuevo de cada archivo; devuelve el rollup acumulado y estadísticas de la ejecución"""
+    started = time.perf_counter()
+    offsets: Dict[str, int] = state.setdefault('files', {})
+    plain: List[Tuple[str, str, int, int]] = []
+    compressed: List[Tuple[str, str, int]] = []
+    sealed = set(state.setdefault('sealed', []))
+    for path in paths:
+        key = fingerprint(path)
+        if key is None or key in sealed:
+            continue
+        done = offsets.get(key, 0)
+        if path.endswith('.gz'):
+            # Un .gz ya no cambia: se procesa una vez y queda sellado
+            compressed.append((key, path, done))
+            continue
+        end = complete_end(path, os.path.getsize(path))
+        if end < done:
+            done = 0  # Truncado con la misma primera línea: reprocesar
+        if end > done:
+            plain.append((key, path, done, end))
+
+    rollup = Rollup.from_dict(state.get('rollup', {}))
+    new_bytes = sum(end - done for _, _, done, end in plain)
+    tasks = [(path, start, stop) for _, path, done, end in plain for start, stop in split_on_lines(path, done, end, chunk_bytes)]
+    if workers > 1 and len(tasks) + len(compressed) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            range_futures = [pool.submit(_process_range, *task) for task in tasks]
+            gzip_futures = [(key, pool.submit(_process_gzip, path, done)) for key, path, done in compressed]
+            for future in range_futures:
+                rollup.merge(future.result())
+            gzip_results = [(key, future.result()) for key, future in gzip_futures]
+    else:
+        for task in tasks:
+            rollup.merge(_process_range(*task))
+        gzip_results = [(key, _process_gzip(path, done)) for key, path, done in compressed]
+
+    for key, (partial, total) in gzip_results:
+        new_bytes += max(0, total - offsets.get(key, 0))
+        rollup.merge(partial)
+        offsets[key] = total
+        sealed.add(key)
+    for key, _, _, end in plain:
+        offsets[key] = end
+    state['sealed'] = sorted(sealed)
+    state['rollup'] = rollup.to_dict()
+    return rollup, {
+        'files': len(paths),
+        'new_bytes': new_bytes,
+        'tasks': len(tasks) + len(compressed),
+        'elapsed_s': round(time.perf_counter() - started, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Analítica incremental del access log de StarkMind')
+    parser.add_argument('paths', nargs='*', help=f'Archivos de log (por defecto {LOG_DIR}/access.log* y access.jsonl*)')
+    parser.add_argument('--state', default=ANALYTICS_STATE_PATH, help='Checkpoint y rollups acumulados')
+    parser.add_argument('--workers', type=int, default=ANALYTICS_WORKERS)
+    parser.add_argument('--chunk-mb', type=float, default=PARALLEL_CHUNK_BYTES / 1024 / 1024)
+    parser.add_argument('--top', type=int, default=10)
+    parser.add_argument('--reset', action='store_true', help='Descartar el checkpoint y reprocesar todo')
+    parser.add_argument('--json', action='store_true')
+    args = parser.parse_args()
+
+    state = {'files': {}, 'sealed': [], 'rollup': {}} if args.reset else load_state(args.state)
+    paths = args.paths or discover()
+    rollup, run_stats = run(paths, state, args.workers, int(args.chunk_mb * 1024 * 1024))
+    save_state(state, args.state)
+    summary = rollup.summary(args.top)
+
+    if args.json:
+        print(json.dumps({'run': run_stats, 'summary': summary}, indent=2, ensure_ascii=False))
+        return
+    print(f"📈 {run_stats['new_bytes'] / 1024 / 1024:.1f} MB nuevos de {run_stats['files']} archivos "
+          f"en {run_stats['elapsed_s']}s ({run_stats['tasks']} tramos, {args.workers} procesos)")
+    print(f"   {summary['requests']} peticiones acumuladas en {summary['lines']} líneas "
+          f"({summary['skipped']} no reconocidas), "
+          f"{summary['from']} → {summary['to']}, {summary['rps']} rps de media\n")
+    print(f"{'ruta':<36}{'peticiones':>11}{'rps':>9}{'pico/h':>9}{'MB':>9}  estados")
+    for route in summary['routes']:
+        status = ' '.join(f'{k}:{v}' for k, v in route['status'].items())
+        print(f"{route['route'][:35]:<36}{route['requests']:>11}{route['rps']:>9.3f}{route['peak_hour_rps']:>9.3f}"
+              f"{route['bytes'] / 1024 / 1024:>9.1f}  {status}")
+    for title, entries in (('Referrers', summary['top_referrers']), ('User agents', summary['top_user_agents'])):
+        print(f'\n{title}:')
+        for value, count in entries:
+            print(f'{count:>9}  {value[:100]}')
+
+
+if __name__ == '__main__':
+    sys.exit(main())
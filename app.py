@@ -1,85 +1,167 @@
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Blueprint, Flask, current_app, request, jsonify, send_file
 from typing import List
+import time
+import uuid
 from flask_cors import CORS
 import os
 import logging
 from dotenv import load_dotenv
-import brevo_python
-from brevo_python.rest import ApiException
 
-# Cargar variables de entorno
+# Cargar variables de entorno (antes de los módulos locales, que leen su configuración al importarse)
 load_dotenv()
 
-# Configurar Flask para servir React
-app = Flask(__name__, 
-            static_folder='static/static',
-            static_url_path='/static')
+from email_provider import EmailProviderError, get_provider
+from email_queue import EmailQueue
+from early_hints import EarlyHints
+import email_templates
+import image_variants
+from health import EMAIL_DIAGNOSTICS, ReadinessProbe, check_email_network, check_email_provider, check_static
+from idempotency import IN_PROGRESS, REPLAYED, IdempotencyStore, request_key
+from lead_digest import LeadDigest
+import lead_store as leads
+from media_stream import stream_media
+import metrics
+from prerender import DEFAULT_LANGUAGE, LANGUAGES, PRERENDER_ENABLED, PrerenderCache
+from response_cache import ResponseCache
+from rate_limit import EMAIL_LIMIT, IP_LIMIT, RateLimiter, client_ip, email_key
+from static_assets import Asset, StaticIndex
+import structured_logging
 
-# Habilitar CORS para desarrollo
-CORS(app, origins=['http://localhost:3000'])
+# Rutas de la aplicación; create_app() las registra en la instancia de Flask
+bp = Blueprint('landing', __name__)
 
-app.secret_key = os.getenv('SECRET_KEY', 'your-secret-key-here')
-
-# Configurar logging
-logging.basicConfig(level=logging.INFO)
+# Configurar logging: JSON en un hilo de fondo, las peticiones nunca esperan al disco
+log_pipeline = structured_logging.configure()
 logger = logging.getLogger(__name__)
 
-# Helper para enviar correos usando Brevo Python SDK
+# Proveedor de email (con circuit breaker y respaldo opcional); su SDK se importa en el primer envío
+email_provider = get_provider()
+
+# Helper para enviar correos con el proveedor configurado
 def send_mail(sender: str, recipients: List[str], subject: str, html: str, text: str) -> dict:
     """
-    Enviar email usando la API de Brevo con el SDK de Python
+    Enviar email con el proveedor configurado (Brevo por defecto)
     """
+    started = time.perf_counter()
+    status = 'error'
     try:
-        # Configurar cliente Brevo
-        configuration = brevo_python.Configuration()
-        configuration.api_key['api-key'] = os.getenv('BREVO_API_KEY')
-        api_instance = brevo_python.TransactionalEmailsApi(brevo_python.ApiClient(configuration))
-        
-        # Configurar remitente
-        sender_config = {
-            "name": "StarkMind",
-            "email": sender
-        }
-        
-        # Configurar destinatarios
-        to_list = [{"email": email, "name": email.split('@')[0]} for email in recipients]
-        
-        # Configurar reply-to
-        reply_to = {
-            "name": "StarkMind Support",
-            "email": sender
-        }
-        
-        # Crear el email
-        send_smtp_email = brevo_python.SendSmtpEmail(
-            to=to_list,
-            sender=sender_config,
-            reply_to=reply_to,
-            subject=subject,
-            html_content=html,
-            text_content=text
-        )
-        
-        # Enviar el email
-        api_response = api_instance.send_transac_email(send_smtp_email)
-        
-        # Retornar la respuesta
-        return {
-            'success': True,
-            'message_id': api_response.message_id if hasattr(api_response, 'message_id') else None,
-            'response': api_response
-        }
-        
-    except ApiException as e:
-        logger.error(f'Error API Brevo: {e}')
-        raise Exception(f'Error en API Brevo: {e}')
+        result = email_provider.send(sender, recipients, subject, html, text)
+        status = 'ok'
+        return result
+    except EmailProviderError as e:
+        status = str(e.status or (e.smtp_code and f'smtp_{e.smtp_code}') or 'error')
+        logger.error(f'Error API {email_provider.name}: {e}')
+        # Se propaga tal cual: la cola no reintenta los errores permanentes (HTTP 4xx, SMTP 5xx)
+        raise
     except Exception as e:
         logger.error(f'Error general enviando email: {e}')
         raise Exception(f'Error enviando email: {e}')
+    finally:
+        metrics.registry.observe('landing_send_mail_duration_seconds', (), time.perf_counter() - started)
+        metrics.registry.inc('landing_send_mail_total', (('status', status),))
+
+# Cola persistente de correos: el request solo encola y los workers envían
+email_queue = EmailQueue(handler=lambda payload: send_mail(**payload))
+
+def observe_lead_digest(batch_size: int, latency: float):
+    """Tamaño de lote y latencia de cada digest, como histogramas agregados entre workers"""
+    metrics.registry.observe('landing_lead_digest_batch_size', (), batch_size)
+    metrics.registry.observe('landing_lead_digest_flush_latency_seconds', (), latency)
+
+# Las notificaciones internas se agrupan en digests para ahorrar llamadas a Brevo
+lead_digest = LeadDigest(email_queue, send=send_mail, on_flush=observe_lead_digest)
+
+# Plantillas de email compiladas una vez por proceso (con preload, en el master)
+email_templates.precompile()
+
+# Token buckets por IP y por email, compartidos entre workers
+rate_limiter = RateLimiter()
+
+# Copia durable de cada lead, escrita por lotes en segundo plano
+lead_store = leads.LeadStore()
+
+# Respuestas de envíos ya procesados: los duplicados no vuelven a encolar correos
+idempotency_store = IdempotencyStore()
+
+def too_many_requests(retry_after: int):
+    """Respuesta 429 con Retry-After"""
+    response = jsonify({'success': False, 'message': 'Demasiadas solicitudes. Inténtalo de nuevo más tarde.'})
+    response.status_code = 429
+    response.headers['Retry-After'] = str(retry_after)
+    return response
+
+@bp.before_app_request
+def start_background_workers():
+    """Arrancar los workers de la cola en cada proceso (seguro con gunicorn)"""
+    request.environ['landing.started'] = time.perf_counter()
+    request.environ['landing.request_id'] = request.headers.get('X-Request-ID') or uuid.uuid4().hex
+    log_pipeline.start()
+    email_queue.start()
+    lead_digest.start()
+    readiness_probe.start()
+    if metrics.METRICS_ENABLED:
+        metrics.registry.start()
+
+# Endpoints que sirven archivos: su estado se cuenta como hit/miss de caché
+STATIC_ENDPOINTS = {'landing.index', 'landing.root_files', 'landing.static_files', 'landing.serve_images', 'landing.catch_all'}
+STATIC_RESULTS = {304: 'not_modified', 404: 'miss'}
+
+@bp.after_app_request
+def record_request_metrics(response):
+    """Duración y estado por ruta (patrón de la regla, no la URL concreta)"""
+    started = request.environ.get('landing.started')
+    if metrics.METRICS_ENABLED and started is not None:
+        route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        labels = (('route', route), ('method', request.method))
+        metrics.registry.observe('landing_http_request_duration_seconds', labels, time.perf_counter() - started)
+        metrics.registry.inc('landing_http_requests_total', labels + (('status', str(response.status_code)),))
+        if request.endpoint in STATIC_ENDPOINTS:
+            result = STATIC_RESULTS.get(response.status_code, 'served')
+            metrics.registry.inc('landing_static_responses_total', (('result', result),))
+    return response
+
+@bp.after_app_request
+def log_access(response):
+    """Access log en JSON (muestreado para archivos estáticos servidos correctamente)"""
+    request_id = request.environ.get('landing.request_id')
+    if request_id:
+        response.headers['X-Request-ID'] = request_id
+    started = request.environ.get('landing.started')
+    # Las páginas del SPA siempre se registran; los archivos (js, css, imágenes) se muestrean
+    static = request.endpoint in STATIC_ENDPOINTS and response.mimetype != 'text/html'
+    sample_rate = structured_logging.access_sample_rate(response.status_code, static)
+    if started is None or not structured_logging.should_log_access(sample_rate):
+        return response
+    route = request.url_rule.rule if request.url_rule is not None else None
+    structured_logging.access_logger.info(
+        f'{request.method} {request.path} {response.status_code}',
+        extra={
+            'request_id': request_id,
+            'method': request.method,
+            'path': request.path,
+            'route': route,
+            'status': response.status_code,
+            'duration_ms': round((time.perf_counter() - started) * 1000, 3),
+            'bytes': response.content_length,
+            'remote_addr': client_ip(request),
+            'referrer': request.referrer,
+            'user_agent': request.user_agent.string,
+            # Cada línea representa 1 / sample_rate peticiones
+            'sample_rate': sample_rate,
+        }
+    )
+    return response
 
 # API Routes
-@app.route('/api/send-email', methods=['POST'])
+@bp.route('/api/send-email', methods=['POST'])
 def send_email():
+    # Limitar por IP antes de leer el cuerpo
+    retry_after = rate_limiter.hit(f'ip:{client_ip(request)}', IP_LIMIT)
+    if retry_after is not None:
+        logger.warning(f'Límite por IP alcanzado: {client_ip(request)}')
+        return too_many_requests(retry_after)
+    
+    idempotency_key = None
     try:
         # Obtener datos del JSON request
         data = request.get_json()
@@ -102,102 +184,136 @@ def send_email():
         if '@' not in email or '.' not in email:
             return jsonify({'success': False, 'message': 'Por favor ingresa un email válido'}), 400
         
-        # Crear mensaje de notificación
-        subject = f'🎯 LEAD PRIORITARIO - {nombre}'
-        if empresa:
-            subject += f' de {empresa}'
-        
-        # Template HTML simple
-        notification_html = f"""
-        <h1>🎯 Lead Prioritario - StarkMind</h1>
-        <h2>Información del Prospecto</h2>
-        <p><strong>Nombre:</strong> {nombre}</p>
-        <p><strong>Email:</strong> {email}</p>
-        <p><strong>Empresa:</strong> {empresa if empresa else 'No especificada'}</p>
-        <p><strong>Teléfono:</strong> {celular if celular else 'No proporcionado'}</p>
-        <h2>Mensaje</h2>
-        <p>{mensaje}</p>
-        """
+        # Doble clic o reintento del mismo envío: devolver la respuesta original
+        idempotency_key, ttl = request_key(request.headers.get('Idempotency-Key'), email, mensaje)
+        result, stored = idempotency_store.begin(idempotency_key, ttl)
+        if result == REPLAYED:
+            logger.info(f'Envío duplicado para {email}: se repite la respuesta original')
+            response = jsonify(stored[1])
+            response.status_code = stored[0]
+            response.headers['Idempotent-Replayed'] = 'true'
+            return response
+        if result == IN_PROGRESS:
+            response = jsonify({'success': False, 'message': 'Tu mensaje ya se está enviando.'})
+            response.status_code = 409
+            response.headers['Retry-After'] = '1'
+            return response
         
-        # Versión texto plano
-        notification_text = f"""
-LEAD PRIORITARIO - STARKMIND
-
-Nombre: {nombre}
-Email: {email}
-Empresa: {empresa if empresa else 'No especificada'}
-Teléfono: {celular if celular else 'No proporcionado'}
-
-Mensaje: {mensaje}
-        """
+        # Limitar por email para que un bot no inunde a un mismo destinatario desde varias IPs
+        retry_after = rate_limiter.hit(email_key(email), EMAIL_LIMIT)
+        if retry_after is not None:
+            logger.warning(f'Límite por email alcanzado: {email}')
+            idempotency_store.release(idempotency_key)
+            return too_many_requests(retry_after)
         
-        # Confirmación automática
-        auto_reply_subject = f'✅ {nombre}, hemos recibido tu consulta - StarkMind'
-        auto_reply_html = f"""
-        <h1>¡Mensaje Recibido!</h1>
-        <p>Hola {nombre},</p>
-        <p>Gracias por contactar a StarkMind. Hemos recibido tu consulta y te contactaremos pronto.</p>
-        <p>Respuesta garantizada en 24 horas.</p>
-        <p>Saludos,<br>El equipo de StarkMind</p>
-        """
+        # Cuerpos desde templates/emails (compilados al arrancar, HTML con autoescape)
+        language = data.get('idioma') if data.get('idioma') in LANGUAGES else request_language()
+        context = {
+            'nombre': nombre, 'email': email, 'empresa': empresa,
+            'celular': celular, 'mensaje': mensaje, 'idioma': language,
+        }
+        subject, notification_html, notification_text = email_templates.render('lead_notification', **context)
+        auto_reply_subject, auto_reply_html, auto_reply_text = email_templates.render('auto_reply', language, **context)
         
-        auto_reply_text = f"""
-¡Mensaje Recibido!
-
-Hola {nombre},
-
-Gracias por contactar a StarkMind. Hemos recibido tu consulta y te contactaremos pronto.
-
-Respuesta garantizada en 24 horas.
-
-Saludos,
-El equipo de StarkMind
-        """
+        # Guardar el lead (ya en disco antes del 202) aunque luego fallen los correos
+        lead_store.add(nombre=nombre, email=email, mensaje=mensaje, empresa=empresa, celular=celular,
+                       idioma=language, request_id=request.environ.get('landing.request_id'))
         
-        # Enviar emails
-        recipient_email = 'noelsantamaria@agendify.xyz'
+        # Encolar emails; los workers en segundo plano los entregan con reintentos
+        recipient_email = os.getenv('LEAD_NOTIFICATION_EMAIL', 'noelsantamaria@agendify.xyz')
+        sender = os.getenv('DEFAULT_FROM_EMAIL')
         
-        send_mail(
-            sender=os.getenv('DEFAULT_FROM_EMAIL'),
+        # Notificación interna: se envía agrupada en el próximo digest
+        lead_digest.enqueue(
+            sender=sender,
             recipients=[recipient_email],
             subject=subject,
             html=notification_html,
             text=notification_text
         )
         
-        send_mail(
-            sender=os.getenv('DEFAULT_FROM_EMAIL'),
-            recipients=[email],
-            subject=auto_reply_subject,
-            html=auto_reply_html,
-            text=auto_reply_text
-        )
+        # Confirmación al visitante: siempre individual
+        email_queue.enqueue({
+            'sender': sender,
+            'recipients': [email],
+            'subject': auto_reply_subject,
+            'html': auto_reply_html,
+            'text': auto_reply_text
+        })
         
-        logger.info(f'Correos enviados exitosamente para {email} ({nombre})')
+        logger.info(f'Correos encolados para {email} ({nombre})')
         
-        return jsonify({
+        body = {
             'success': True, 
             'message': '¡Mensaje enviado correctamente! Revisa tu email y te contactaremos pronto.'
-        })
+        }
+        idempotency_store.complete(idempotency_key, 202, body)
+        return jsonify(body), 202
     except Exception as e:
+        if idempotency_key is not None:
+            idempotency_store.release(idempotency_key)
         logger.error(f'Error al enviar correo: {str(e)}')
         return jsonify({'success': False, 'message': 'Error interno del servidor. Por favor, intenta nuevamente.'}), 500
 
-@app.route('/api/health')
+def leads_authorized() -> bool:
+    return bool(leads.LEADS_API_TOKEN) and request.headers.get('Authorization') == f'Bearer {leads.LEADS_API_TOKEN}'
+
+def lead_filters() -> dict:
+    """Filtros comunes de /api/leads y /api/leads/export (fechas en epoch)"""
+    since = request.args.get('since', type=float)
+    until = request.args.get('until', type=float)
+    return {'email': request.args.get('email'), 'empresa': request.args.get('empresa'), 'since': since, 'until': until}
+
+@bp.route('/api/leads')
+def list_leads():
+    """Leads paginados por cursor, del más reciente al más antiguo"""
+    if not leads_authorized():
+        return jsonify({'success': False, 'message': 'No autorizado'}), 401
+    try:
+        before = leads.decode_cursor(request.args.get('cursor'))
+    except ValueError:
+        return jsonify({'success': False, 'message': 'Cursor inválido'}), 400
+    page, next_cursor = lead_store.query(before=before, limit=request.args.get('limit', 50, type=int), **lead_filters())
+    return jsonify({'success': True, 'leads': page, 'next_cursor': leads.encode_cursor(next_cursor)})
+
+@bp.route('/api/leads/export')
+def export_leads():
+    """Exportación completa en CSV o JSONL, generada por bloques sin cargar la tabla en memoria"""
+    if not leads_authorized():
+        return jsonify({'success': False, 'message': 'No autorizado'}), 401
+    fmt = request.args.get('format', 'csv')
+    if fmt not in leads.EXPORTERS:
+        return jsonify({'success': False, 'message': f'Formato no soportado: {fmt}'}), 400
+    mimetype, exporter = leads.EXPORTERS[fmt]
+    response = current_app.response_class(exporter(lead_store.iter_leads(**lead_filters())), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename=leads-{time.strftime("%Y%m%d")}.{fmt}'
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
+@bp.route('/api/health/live')
+def health_live():
+    """Liveness: el proceso responde (sin I/O)"""
+    return jsonify({'status': 'alive', 'service': 'StarkMind Landing'})
+
+@bp.route('/api/health/ready')
+def health_ready():
+    """Readiness: último resultado cacheado de build estático y proveedor de email"""
+    result = readiness_probe.result()
+    return jsonify({'service': 'StarkMind Landing', **result}), 503 if result['status'] == 'not_ready' else 200
+
+@bp.route('/api/health')
 def health_check():
-    """Health check endpoint"""
+    """Health check endpoint (formato histórico, a partir del resultado cacheado)"""
     try:
-        static_checks = {
-            'index_html': os.path.exists('static/index.html'),
-            'static_css': os.path.exists('static/static/css') and len([f for f in os.listdir('static/static/css') if f.endswith('.css')]) > 0,
-            'static_js': os.path.exists('static/static/js') and len([f for f in os.listdir('static/static/js') if f.endswith('.js')]) > 0,
-        }
+        result = readiness_probe.result()
+        static_checks = result['checks']['static']['details']
         
         return jsonify({
             'status': 'healthy', 
             'service': 'StarkMind Landing',
+            'readiness': result['status'],
             'static_files': static_checks,
-            'all_static_ok': all(static_checks.values())
+            'all_static_ok': result['checks']['static']['ok']
         })
     except Exception as e:
         return jsonify({
@@ -206,130 +322,219 @@ def health_check():
             'error': str(e)
         }), 500
 
+# Índice en memoria del build de React (se reconstruye con SIGHUP o al cambiar el build)
+static_index = StaticIndex()
+static_index.install_signal_handler()
+
+# Readiness cacheado: un hilo por proceso lo refresca periódicamente
+readiness_probe = ReadinessProbe({
+    'static': lambda: check_static(static_index),
+    'email_provider': check_email_provider,
+    **({'email_network': check_email_network} if EMAIL_DIAGNOSTICS else {}),
+})
+
+# Respuestas pequeñas en un segmento mapeado compartido por los workers (con preload se construye en el master)
+response_cache = ResponseCache()
+response_cache.refresh(static_index)
+
+def send_asset(asset: Asset):
+    """Enviar un archivo ya resuelto por el índice estático, precomprimido si el cliente lo acepta"""
+    variant = asset.negotiate(request.accept_encodings)
+    # Revalidación con el ETag precalculado: 304 sin tocar el disco
+    if request.if_none_match.contains_weak(variant.etag):
+        response = current_app.response_class(status=304)
+        response.set_etag(variant.etag)
+    else:
+        response_cache.refresh(static_index)
+        cached = response_cache.get(variant)
+        if cached is not None:
+            # Cuerpo y cabeceras (Cache-Control y Vary incluidos) preparados al construir el segmento
+            body, headers = cached
+            # Misma revalidación (If-Modified-Since, If-Range) y rangos que send_file
+            response = current_app.response_class(body, headers=headers)
+            return response.make_conditional(request, accept_ranges=True, complete_length=len(body))
+        response = send_file(variant.path, mimetype=asset.content_type, conditional=True,
+                             etag=variant.etag, last_modified=asset.mtime)
+        if variant.encoding:
+            response.content_encoding = variant.encoding
+    response.headers['Cache-Control'] = asset.cache_control
+    if asset.variants:
+        response.vary.add('Accept-Encoding')
+    return response
+
+# Documentos index.html listos para pintar por ruta e idioma
+prerender_cache = PrerenderCache(static_index)
+
+def request_language() -> str:
+    """Idioma del documento: ?lang= explícito o Accept-Language (mismos idiomas que LanguageContext)"""
+    language = request.args.get('lang')
+    if language in LANGUAGES:
+        return language
+    return request.accept_languages.best_match(LANGUAGES, DEFAULT_LANGUAGE)
+
+def send_prerendered(document):
+    """Enviar un documento pre-renderizado desde memoria"""
+    body, encoding, etag = prerender_cache.negotiate(document, request.accept_encodings)
+    if request.if_none_match.contains_weak(etag):
+        response = current_app.response_class(status=304)
+    else:
+        response = current_app.response_class(body, mimetype='text/html')
+        if encoding:
+            response.content_encoding = encoding
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    response.vary.update(('Accept-Encoding', 'Accept-Language'))
+    return response
+
+# Preload de los entrypoints de asset-manifest.json (103 Early Hints o cabecera Link)
+early_hints = EarlyHints(static_index)
+
 # Helper para servir React
 def serve_react_app():
     """Helper para servir la aplicación React"""
-    if os.path.exists('static/index.html'):
-        return send_from_directory('static', 'index.html')
+    early_hints.send_informational(request.environ)
+    if PRERENDER_ENABLED:
+        document = prerender_cache.get(request.path, request_language())
+        if document is not None:
+            return early_hints.apply(send_prerendered(document))
+    asset = static_index.get('index.html')
+    if asset is not None:
+        return early_hints.apply(send_asset(asset))
     else:
         return jsonify({'error': 'React build not found. Run npm build first.'}), 404
 
 # Ruta principal para React
-@app.route('/')
+@bp.route('/')
 def index():
     """Servir la aplicación React desde build/index.html"""
     return serve_react_app()
 
 # Rutas para archivos estáticos específicos
-@app.route('/favicon.ico')
-def favicon():
-    """Servir favicon desde el directorio build"""
-    return send_from_directory('static', 'favicon.ico', mimetype='image/vnd.microsoft.icon')
-
-@app.route('/manifest.json')
-def manifest():
-    """Servir manifest.json desde el directorio build"""
-    return send_from_directory('static', 'manifest.json', mimetype='application/json')
-
-@app.route('/robots.txt')
-def robots():
-    """Servir robots.txt desde el directorio build"""
-    return send_from_directory('static', 'robots.txt', mimetype='text/plain')
+@bp.route('/favicon.ico')
+@bp.route('/manifest.json')
+@bp.route('/robots.txt')
+def root_files():
+    """Servir favicon, manifest.json y robots.txt desde el directorio build"""
+    asset = static_index.get(request.path.lstrip('/'))
+    if asset is None:
+        return "File not found", 404
+    return send_asset(asset)
 
 # Ruta para servir archivos estáticos
-@app.route('/static/<path:filename>')
+@bp.route('/static/<path:filename>')
 def static_files(filename):
     """Servir archivos estáticos desde static/static con búsqueda en subdirectorios"""
-    # Intentar servir directamente desde static/static
-    if os.path.exists(os.path.join('static/static', filename)):
-        return send_from_directory('static/static', filename)
-    
-    # Si no existe, intentar desde subdirectorios
-    file_extension = filename.split('.')[-1].lower() if '.' in filename else ''
-    
-    if file_extension == 'css':
-        css_path = os.path.join('static/static/css', os.path.basename(filename))
-        if os.path.exists(css_path):
-            return send_from_directory('static/static/css', os.path.basename(filename))
-    elif file_extension == 'js':
-        js_path = os.path.join('static/static/js', os.path.basename(filename))
-        if os.path.exists(js_path):
-            return send_from_directory('static/static/js', os.path.basename(filename))
-    elif file_extension in ['png', 'jpg', 'jpeg', 'svg', 'gif']:
-        media_path = os.path.join('static/static/media', os.path.basename(filename))
-        if os.path.exists(media_path):
-            return send_from_directory('static/static/media', os.path.basename(filename))
-    
-    # Si no se encuentra, retornar 404
-    return "Static file not found", 404
+    asset = static_index.resolve_static(filename)
+    if asset is None:
+        return "Static file not found", 404
+    return send_asset(asset)
+
+# Caché en disco de derivados responsivos de las imágenes de /img
+image_cache = image_variants.ImageVariantCache()
 
 # Ruta para servir archivos de imágenes y videos
-@app.route('/img/<path:filename>')
+@bp.route('/img/<path:filename>')
 def serve_images(filename):
-    """Servir archivos de imágenes y videos desde el directorio static/img con soporte de rango"""
-    try:
-        file_path = os.path.join('static/img', filename)
-        if not os.path.exists(file_path):
-            return "Image file not found", 404
-            
-        # Para archivos de video, usar send_file con soporte de rango
-        if filename.lower().endswith(('.mp4', '.webm', '.ogg', '.avi', '.mov')):
-            return send_from_directory('static/img', filename, as_attachment=False, conditional=True)
-        else:
-            return send_from_directory('static/img', filename)
-    except FileNotFoundError:
+    """Servir imágenes y videos desde static/img con soporte de rangos y sendfile"""
+    asset = static_index.get('img/' + filename)
+    if asset is None:
         return "Image file not found", 404
+    
+    # Imágenes: variante WebP/AVIF y/o redimensionada según Accept y ?w=
+    if image_variants.is_available() and image_variants.is_resizable(filename):
+        width = image_variants.snap_width(request.args.get('w', type=int))
+        fmt = image_variants.choose_format(filename, request.accept_mimetypes)
+        variant = None
+        if width or fmt in ('avif', 'webp'):
+            variant = image_cache.get(asset, width, fmt)
+        response = stream_media(variant or asset, filename)
+        response.vary.add('Accept')
+        return response
+    return stream_media(asset, filename)
+
+# Contadores del proceso y profundidad de la cola, exportados en /metrics
+metrics.registry.register_collector(lambda: [
+    ('landing_image_variant_cache_total', {'result': 'hit'}, image_cache.hits),
+    ('landing_image_variant_cache_total', {'result': 'miss'}, image_cache.misses),
+    ('landing_rate_limit_rejections_total', {}, rate_limiter.rejected),
+] + [
+    ('landing_idempotency_total', {'result': result}, count)
+    for result, count in list(idempotency_store.stats.items())
+] + [
+    ('landing_lead_store_total', {'event': event}, count)
+    for event, count in list(lead_store.stats.items())
+] + [
+    ('landing_response_cache_total', {'result': 'hit'}, response_cache.hits),
+    ('landing_response_cache_total', {'result': 'miss'}, response_cache.misses),
+] + [
+    ('landing_early_hints_total', {'kind': kind}, count)
+    for kind, count in list(early_hints.stats.items())
+] + [
+    ('landing_lead_digest_total', {'event': event}, lead_digest.stats()[event])
+    for event in ('flushes', 'leads_sent', 'api_calls_saved')
+] + [
+    ('landing_email_provider_total', {'provider': provider, 'result': result}, count)
+    for (provider, result), count in list(email_provider.stats.items())
+] + [
+    ('landing_email_circuit_opened_total', {'provider': provider.name}, breaker.stats['opened'])
+    for provider, breaker in email_provider.providers
+])
+
+def response_cache_gauges():
+    stats = response_cache.stats()
+    return [
+        ('landing_response_cache_bytes', {'kind': 'segment'}, stats['segment_bytes']),
+        ('landing_response_cache_bytes', {'kind': 'budget'}, stats['budget_bytes']),
+        ('landing_response_cache_entries', {}, stats['entries']),
+    ]
+
+metrics.registry.register_gauge(response_cache_gauges)
+
+def email_queue_gauges():
+    samples = [('landing_email_queue_jobs', {'status': status}, count) for status, count in email_queue.depth().items()]
+    for kind in ('mail', 'lead'):
+        _, oldest = email_queue.pending(kind)
+        samples.append(('landing_email_queue_oldest_seconds', {'kind': kind}, time.time() - oldest if oldest else 0))
+    return samples
+
+metrics.registry.register_gauge(email_queue_gauges)
+
+@bp.route('/metrics')
+def metrics_endpoint():
+    """Métricas agregadas de todos los workers en formato Prometheus"""
+    if not metrics.METRICS_ENABLED:
+        return "Metrics disabled", 404
+    if metrics.METRICS_TOKEN and request.headers.get('Authorization') != f'Bearer {metrics.METRICS_TOKEN}':
+        return "Unauthorized", 401
+    return current_app.response_class(metrics.registry.render(), mimetype='text/plain; version=0.0.4')
 
 # Catch-all route for React Router (SPA)
-@app.route('/<path:path>')
+@bp.route('/<path:path>')
 def catch_all(path):
     """Manejar rutas de React Router en producción"""
-    # Si la ruta contiene un punto, podría ser un archivo estático
+    # Si la ruta contiene un punto, podría ser un archivo estático (js, css, map, media)
     if '.' in path:
-        file_extension = path.split('.')[-1].lower()
-        
-        # Archivos estáticos CSS y JS - buscar en subdirectorios
-        if file_extension in ['js', 'css', 'map']:
-            # Intentar primero la ruta completa
-            if os.path.exists(os.path.join('static/static', path)):
-                return send_from_directory('static/static', path)
-            
-            # Si no existe, buscar en subdirectorios css/ y js/
-            if file_extension == 'css':
-                css_path = os.path.join('static/static/css', os.path.basename(path))
-                if os.path.exists(css_path):
-                    return send_from_directory('static/static/css', os.path.basename(path))
-            elif file_extension == 'js':
-                js_path = os.path.join('static/static/js', os.path.basename(path))
-                if os.path.exists(js_path):
-                    return send_from_directory('static/static/js', os.path.basename(path))
-            elif file_extension == 'map':
-                # Buscar archivos .map en css/ y js/
-                css_map_path = os.path.join('static/static/css', os.path.basename(path))
-                js_map_path = os.path.join('static/static/js', os.path.basename(path))
-                if os.path.exists(css_map_path):
-                    return send_from_directory('static/static/css', os.path.basename(path))
-                elif os.path.exists(js_map_path):
-                    return send_from_directory('static/static/js', os.path.basename(path))
-        
-        # Archivos de media
-        elif file_extension in ['png', 'jpg', 'jpeg', 'svg', 'ico', 'gif', 'woff', 'woff2', 'ttf', 'eot']:
-            # Primero intentar desde static/static/media
-            media_path = os.path.join('static/static/media', os.path.basename(path))
-            if os.path.exists(media_path):
-                return send_from_directory('static/static/media', os.path.basename(path))
-            # Luego desde static/static
-            elif os.path.exists(os.path.join('static/static', path)):
-                return send_from_directory('static/static', path)
-            # Finalmente desde static raíz
-            elif os.path.exists(os.path.join('static', path)):
-                return send_from_directory('static', path)
-        
-        # Si el archivo no se encuentra
-        return "File not found", 404
+        asset = static_index.resolve_spa(path)
+        if asset is None:
+            return "File not found", 404
+        return send_asset(asset)
     
     # Para rutas de React Router sin punto, servir index.html
     return serve_react_app()
 
+def create_app() -> Flask:
+    """Crear la aplicación Flask (usada por wsgi.py/gunicorn y por el servidor de desarrollo)"""
+    # /static lo resuelve el índice en memoria, no el static_folder de Flask
+    app = Flask(__name__, static_folder=None)
+    
+    # Habilitar CORS para desarrollo
+    CORS(app, origins=['http://localhost:3000'])
+    
+    app.secret_key = os.getenv('SECRET_KEY', 'your-secret-key-here')
+    app.register_blueprint(bp)
+    return app
+
+app = create_app()
+
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5000, debug=os.getenv('FLASK_DEBUG', 'False').lower() == 'true')
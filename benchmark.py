@@ -0,0 +1,432 @@
+#!/usr/bin/env python3
+"""
+Benchmark de los modos de servidor de StarkMind Landing
+
+Levanta la app con cada modelo de worker de gunicorn (sync, gthread, gevent),
+con el servidor de desarrollo de Flask (`werkzeug`) o dentro de este mismo
+proceso (`inprocess`), y lanza tráfico concurrente con conexiones keep-alive.
+
+Los envíos de `send_mail()` van a un stub HTTP local que imita
+`POST /v3/smtp/email` de Brevo, con latencia y tasa de errores configurables:
+el benchmark nunca envía correos reales. Cada ejecución usa directorios de
+datos temporales (cola, métricas, logs) y desactiva el rate limiting.
+
+Mezclas de tráfico (`--mix`): rutas del SPA, assets con hash, videos e
+imágenes de /img (con Range, como un navegador) y envíos del formulario de
+contacto. Se reporta RPS, p50/p95/p99 por tipo de petición y memoria por
+worker (RSS, PSS y USS), en JSON para comparar entre commits.
+
+Uso:
+    python benchmark.py                         # todos los modos disponibles
+    python benchmark.py --modes gthread sync --duration 20 --concurrency 32
+    python benchmark.py --modes gthread --mix contact --brevo-latency 300 --brevo-error-rate 0.05
+    python benchmark.py --output bench/$(git rev-parse --short HEAD).json
+"""
+
+import argparse
+import http.client
+import importlib.util
+import json
+import logging
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+from memory_report import memory_per_worker
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+MODES = ['werkzeug', 'sync', 'gthread', 'gevent', 'inprocess']
+
+# Peso de cada tipo de petición en cada mezcla
+MIXES = {
+    'landing': {'spa': 0.45, 'assets': 0.45, 'media': 0.08, 'contact': 0.02},
+    'spa': {'spa': 1.0},
+    'assets': {'assets': 1.0},
+    'media': {'media': 1.0},
+    'contact': {'contact': 1.0},
+}
+
+SPA_ROUTES = ['/', '/services', '/portfolio', '/contact']
+# Primer tramo que pide un navegador al empezar a reproducir un video
+VIDEO_RANGE = 'bytes=0-1048575'
+
+
+class Request(NamedTuple):
+    kind: str
+    method: str
+    path: str
+    body: Optional[bytes]
+    headers: Dict[str, str]
+
+
+def asset_routes(static_root: str) -> List[str]:
+    """Entrypoints con hash de asset-manifest.json"""
+    try:
+        with open(os.path.join(static_root, 'asset-manifest.json'), encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return []
+    return ['/' + entry for entry in manifest.get('entrypoints', [])]
+
+
+def media_routes(static_root: str) -> List[str]:
+    """Videos e imágenes bajo <build>/img"""
+    routes = []
+    img_root = os.path.join(static_root, 'img')
+    for directory, _, filenames in os.walk(img_root):
+        for filename in filenames:
+            relative = os.path.relpath(os.path.join(directory, filename), img_root).replace(os.sep, '/')
+            routes.append('/img/' + relative)
+    return sorted(routes)
+
+
+def request_factories(static_root: str) -> Dict[str, Callable[[random.Random], Request]]:
+    """Generador de peticiones por tipo"""
+    accept = {'Accept-Encoding': 'gzip, br'}
+    assets = asset_routes(static_root) + ['/manifest.json', '/favicon.ico']
+    media = media_routes(static_root) or ['/img/logo.svg']
+
+    def spa(rng):
+        return Request('spa', 'GET', rng.choice(SPA_ROUTES), None, dict(accept, **{'Accept-Language': 'es'}))
+
+    def asset(rng):
+        return Request('assets', 'GET', rng.choice(assets), None, accept)
+
+    def media_file(rng):
+        path = rng.choice(media)
+        headers = {'Range': VIDEO_RANGE} if path.lower().endswith(('.mp4', '.webm')) else {'Accept': 'image/webp,*/*'}
+        return Request('media', 'GET', path, None, headers)
+
+    def contact(rng):
+        body = json.dumps({
+            'nombre': 'Benchmark',
+            'email': f'bench-{uuid.UUID(int=rng.getrandbits(128)).hex[:12]}@starkmind.test',
+            'empresa': 'StarkMind',
+            'mensaje': 'Mensaje de prueba de carga generado por benchmark.py',
+            'idioma': rng.choice(['es', 'en']),
+        }).encode('utf-8')
+        return Request('contact', 'POST', '/api/send-email', body, {'Content-Type': 'application/json'})
+
+    return {'spa': spa, 'assets': asset, 'media': media_file, 'contact': contact}
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(latencies: List[float], errors: int, elapsed: float) -> Dict[str, float]:
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'rps': round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+        'mean_ms': round(statistics.mean(latencies) * 1000, 2) if latencies else 0.0,
+    }
+
+
+def drive_load(host: str, port: int, factories: Dict[str, Callable], mix: Dict[str, float],
+               duration: float, concurrency: int, seed: int = 0) -> dict:
+    """Clientes concurrentes con keep-alive durante `duration` segundos"""
+    kinds = list(mix)
+    weights = [mix[kind] for kind in kinds]
+    latencies: Dict[str, List[float]] = {kind: [] for kind in kinds}
+    errors: Dict[str, int] = {kind: 0 for kind in kinds}
+    statuses: Dict[str, int] = {}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def client(offset: int):
+        # Semilla por cliente: la misma secuencia de peticiones en cada ejecución
+        rng = random.Random(seed * 1000 + offset)
+        conn = http.client.HTTPConnection(host, port, timeout=30)
+        local = {kind: [] for kind in kinds}
+        local_errors = {kind: 0 for kind in kinds}
+        local_statuses: Dict[str, int] = {}
+        while time.perf_counter() < deadline:
+            req = factories[rng.choices(kinds, weights)[0]](rng)
+            started = time.perf_counter()
+            try:
+                conn.request(req.method, req.path, body=req.body, headers=req.headers)
+                response = conn.getresponse()
+                response.read()
+                local_statuses[str(response.status)] = local_statuses.get(str(response.status), 0) + 1
+                if response.status >= 500:
+                    local_errors[req.kind] += 1
+                local[req.kind].append(time.perf_counter() - started)
+            except (OSError, http.client.HTTPException):
+                local_errors[req.kind] += 1
+                conn.close()
+                conn = http.client.HTTPConnection(host, port, timeout=30)
+        conn.close()
+        with lock:
+            for kind in kinds:
+                latencies[kind].extend(local[kind])
+                errors[kind] += local_errors[kind]
+            for status, count in local_statuses.items():
+                statuses[status] = statuses.get(status, 0) + count
+
+    threads = [threading.Thread(target=client, args=(n,)) for n in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    everything = [sample for samples in latencies.values() for sample in samples]
+    result = summarize(everything, sum(errors.values()), elapsed)
+    result['statuses'] = dict(sorted(statuses.items()))
+    result['by_kind'] = {kind: summarize(latencies[kind], errors[kind], elapsed) for kind in kinds}
+    return result
+
+
+# -- Stub de Brevo --------------------------------------------------------
+
+class BrevoStub:
+    """Servidor HTTP local que imita POST /v3/smtp/email con latencia y errores inyectados"""
+
+    def __init__(self, latency_ms: float = 150, jitter_ms: float = 50, error_rate: float = 0.0, seed: int = 0):
+        self.latency = latency_ms / 1000
+        self.jitter = jitter_ms / 1000
+        self.error_rate = error_rate
+        self.rng = random.Random(seed)
+        self.counts = {'accepted': 0, 'failed': 0}
+        self._lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get('Content-Length') or 0))
+                if not self.path.rstrip('/').endswith('/smtp/email'):
+                    return self._reply(404, {'code': 'not_found'})
+                with stub._lock:
+                    delay = max(0.0, stub.latency + stub.rng.uniform(-stub.jitter, stub.jitter))
+                    status = stub.rng.choice((500, 502, 429)) if stub.rng.random() < stub.error_rate else 201
+                    stub.counts['accepted' if status == 201 else 'failed'] += 1
+                time.sleep(delay)
+                if status == 201:
+                    return self._reply(201, {'messageId': f'<{uuid.uuid4().hex}@brevo-stub>'})
+                return self._reply(status, {'code': 'injected_error', 'message': 'Error inyectado por el benchmark'})
+
+            def _reply(self, status: int, payload: dict):
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f'http://127.0.0.1:{self.server.server_address[1]}/v3'
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self.counts)
+
+
+# -- Ejecución ------------------------------------------------------------
+
+def server_env(args, stub: BrevoStub, data_dir: str) -> Dict[str, str]:
+    """Entorno aislado: datos temporales, stub de Brevo y sin rate limiting"""
+    return {
+        'BREVO_API_HOST': stub.url,
+        'BREVO_API_KEY': 'benchmark',
+        'DEFAULT_FROM_EMAIL': 'benchmark@starkmind.test',
+        'LEAD_NOTIFICATION_EMAIL': 'leads@starkmind.test',
+        'EMAIL_QUEUE_PATH': os.path.join(data_dir, 'email_queue.db'),
+        'RATE_LIMIT_ENABLED': 'False',
+        'METRICS_DIR': os.path.join(data_dir, 'metrics'),
+        'LOG_DIR': os.path.join(data_dir, 'logs'),
+        'IMAGE_CACHE_DIR': os.path.join(data_dir, 'image_cache'),
+        'EMAIL_TEMPLATE_CACHE_DIR': os.path.join(data_dir, 'template_cache'),
+        'LEAD_STORE_PATH': os.path.join(data_dir, 'leads.db'),
+        'IDEMPOTENCY_PATH': os.path.join(data_dir, 'idempotency.db'),
+        'RATE_LIMIT_PATH': os.path.join(data_dir, 'rate_limit.db'),
+        # Directorio propio: no reemplazar el segmento del servidor local
+        'RESPONSE_CACHE_DIR': os.path.join(data_dir, 'response_cache'),
+        'GUNICORN_BIND': f'{args.host}:{args.port}',
+    }
+
+
+def wait_until_live(host: str, port: int, timeout: float = 30) -> bool:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            conn = http.client.HTTPConnection(host, port, timeout=1)
+            conn.request('GET', '/api/health/live')
+            if conn.getresponse().status == 200:
+                return True
+        except (OSError, http.client.HTTPException):
+            time.sleep(0.2)
+    return False
+
+
+def measure(args, factories, stub: BrevoStub, server_pid: int) -> dict:
+    """Calentamiento, carga medida, memoria y envíos recibidos por el stub"""
+    # Calentamiento: workers, índice estático, plantillas y conexiones
+    drive_load(args.host, args.port, factories, MIXES[args.mix], 2, args.concurrency, args.seed + 1)
+    sent_before = stub.stats()
+    result = drive_load(args.host, args.port, factories, MIXES[args.mix], args.duration, args.concurrency, args.seed)
+    result['memory'] = memory_per_worker(server_pid)
+    sent_after = stub.stats()
+    result['brevo_stub'] = {key: sent_after[key] - sent_before[key] for key in sent_after}
+    return result
+
+
+def run_mode(mode: str, args, factories, stub: BrevoStub) -> dict:
+    """Levantar el servidor en un modo, medir y detenerlo"""
+    data_dir = tempfile.mkdtemp(prefix=f'starkmind-bench-{mode}-')
+    env = dict(os.environ, **server_env(args, stub, data_dir),
+               GUNICORN_WORKER_CLASS=mode,
+               GUNICORN_ACCESS_LOG='/dev/null')
+    if args.workers:
+        env['GUNICORN_WORKERS'] = str(args.workers)
+    if mode == 'werkzeug':
+        command = [sys.executable, '-m', 'flask', '--app', 'wsgi', 'run',
+                   '--host', args.host, '--port', str(args.port), '--with-threads']
+    else:
+        command = [sys.executable, '-m', 'gunicorn', '--config', 'gunicorn.conf.py', 'wsgi:app']
+    server = subprocess.Popen(command, cwd=BASE_DIR, env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        if not wait_until_live(args.host, args.port):
+            raise RuntimeError(f'servidor ({mode}) no respondió en /api/health/live')
+        return measure(args, factories, stub, server.pid)
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+
+def run_inprocess(args, factories, stub: BrevoStub) -> dict:
+    """La app en este proceso con el servidor WSGI de werkzeug (compite con el cliente por el GIL)"""
+    data_dir = tempfile.mkdtemp(prefix='starkmind-bench-inprocess-')
+    os.environ.update(server_env(args, stub, data_dir))
+    sys.path.insert(0, BASE_DIR)
+    from werkzeug.serving import make_server
+    from app import app, log_pipeline
+
+    # Sin una línea de log de werkzeug por petición (el access log JSON ya va a LOG_DIR)
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    server = make_server(args.host, args.port, app, threaded=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        return measure(args, factories, stub, os.getpid())
+    finally:
+        server.shutdown()
+        log_pipeline.stop()
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd=BASE_DIR,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de modos de servidor de StarkMind Landing')
+    parser.add_argument('--modes', nargs='+', default=['werkzeug', 'sync', 'gthread', 'gevent'], choices=MODES)
+    parser.add_argument('--mix', default='landing', choices=sorted(MIXES))
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--workers', type=int, default=0, help='0 = valor por defecto de gunicorn.conf.py')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5055)
+    parser.add_argument('--seed', type=int, default=0, help='Semilla de la secuencia de peticiones')
+    parser.add_argument('--brevo-latency', type=float, default=150, help='Latencia del stub de Brevo (ms)')
+    parser.add_argument('--brevo-jitter', type=float, default=50, help='Variación de la latencia (± ms)')
+    parser.add_argument('--brevo-error-rate', type=float, default=0.0, help='Fracción de envíos que fallan (500/502/429)')
+    parser.add_argument('--json', action='store_true', help='Imprimir resultados en JSON')
+    parser.add_argument('--output', help='Guardar el JSON en este archivo')
+    args = parser.parse_args()
+
+    from static_assets import STATIC_ROOT
+    factories = request_factories(STATIC_ROOT)
+
+    stub = BrevoStub(args.brevo_latency, args.brevo_jitter, args.brevo_error_rate, args.seed)
+    stub.start()
+    results = {}
+    try:
+        for mode in args.modes:
+            if mode == 'gevent' and importlib.util.find_spec('gevent') is None:
+                print(f'⚠️  Modo {mode} omitido: gevent no está instalado', file=sys.stderr)
+                continue
+            print(f'🚀 Midiendo modo {mode} (mezcla {args.mix})...', file=sys.stderr)
+            if mode == 'inprocess':
+                results[mode] = run_inprocess(args, factories, stub)
+            else:
+                results[mode] = run_mode(mode, args, factories, stub)
+    finally:
+        stub.stop()
+
+    report = {
+        'meta': {
+            'commit': git_commit(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+            'python': platform.python_version(),
+            'cpus': os.cpu_count(),
+            'mix': MIXES[args.mix],
+            'args': {key: value for key, value in vars(args).items() if key not in ('json', 'output')},
+        },
+        'results': results,
+    }
+    if args.output:
+        directory = os.path.dirname(args.output)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    print(f"{'modo':<10}{'rps':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errores':>10}"
+          f"{'RSS/worker MB':>16}{'USS/worker MB':>16}{'PSS total MB':>14}")
+    for mode, r in results.items():
+        workers = [p for p in r['memory'] if p['role'] == 'worker'] or r['memory']
+        rss = sum(p['rss_kb'] for p in workers) / len(workers) / 1024 if workers else 0
+        uss = sum(p['uss_kb'] for p in workers) / len(workers) / 1024 if workers else 0
+        pss = sum(p['pss_kb'] for p in r['memory']) / 1024
+        print(f"{mode:<10}{r['rps']:>10}{r['p50_ms']:>10}{r['p95_ms']:>10}{r['p99_ms']:>10}{r['errors']:>10}"
+              f"{rss:>16.1f}{uss:>16.1f}{pss:>14.1f}")
+
+
+if __name__ == '__main__':
+    main()
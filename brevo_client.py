@@ -0,0 +1,77 @@
+"""
+Cliente Brevo compartido para StarkMind
+
+Un único ApiClient por proceso, creado de forma perezosa y reutilizado por
+todas las llamadas. Mantiene las conexiones HTTP keep-alive del pool de
+urllib3 y se recrea automáticamente en cada proceso hijo tras un fork
+(workers de gunicorn), ya que los sockets y pools de hilos no se pueden
+compartir entre procesos.
+"""
+
+import os
+import threading
+from typing import TYPE_CHECKING, Optional, Tuple
+
+if TYPE_CHECKING:
+    import brevo_python
+
+# URL base de la API (benchmark.py la apunta a un stub local)
+API_HOST = os.getenv('BREVO_API_HOST', 'https://api.brevo.com/v3')
+
+# Configuración del pool HTTP y timeouts (segundos)
+POOL_MAXSIZE = int(os.getenv('BREVO_POOL_MAXSIZE', '4'))
+CONNECT_TIMEOUT = float(os.getenv('BREVO_CONNECT_TIMEOUT', '3'))
+READ_TIMEOUT = float(os.getenv('BREVO_READ_TIMEOUT', '10'))
+
+
+class BrevoClientManager:
+    """Gestor del cliente Brevo: uno por proceso, seguro ante fork"""
+
+    def __init__(self, api_key: Optional[str] = None, pool_maxsize: int = POOL_MAXSIZE,
+                 connect_timeout: float = CONNECT_TIMEOUT, read_timeout: float = READ_TIMEOUT):
+        self._api_key = api_key
+        self.pool_maxsize = pool_maxsize
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self._lock = threading.Lock()
+        self._api: Optional['brevo_python.TransactionalEmailsApi'] = None
+        self._pid: Optional[int] = None
+
+    @property
+    def api_key(self) -> Optional[str]:
+        return self._api_key or os.getenv('BREVO_API_KEY')
+
+    @property
+    def request_timeout(self) -> Tuple[float, float]:
+        """Timeout (conexión, lectura) para pasar como `_request_timeout` al SDK"""
+        return (self.connect_timeout, self.read_timeout)
+
+    def get_api(self) -> 'brevo_python.TransactionalEmailsApi':
+        """Obtener la API transaccional del proceso actual, creándola si hace falta"""
+        api = self._api
+        if api is not None and self._pid == os.getpid():
+            return api
+        # El SDK se importa aquí y no al cargar el módulo (arranque de workers más rápido)
+        import brevo_python
+        with self._lock:
+            if self._api is None or self._pid != os.getpid():
+                configuration = brevo_python.Configuration()
+                configuration.host = API_HOST
+                configuration.api_key['api-key'] = self.api_key
+                configuration.connection_pool_maxsize = self.pool_maxsize
+                self._api = brevo_python.TransactionalEmailsApi(brevo_python.ApiClient(configuration))
+                self._pid = os.getpid()
+            return self._api
+
+    def reset(self):
+        """Descartar el cliente (p. ej. en el hijo tras un fork o al rotar la API key)"""
+        self._lock = threading.Lock()
+        self._api = None
+        self._pid = None
+
+
+# Instancia compartida por app.py, test_email.py y cualquier envío por lotes
+brevo_client = BrevoClientManager()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=brevo_client.reset)
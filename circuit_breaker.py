@@ -0,0 +1,104 @@
+"""
+Circuit breaker para los proveedores de email de StarkMind
+
+Cuenta el resultado y la latencia de las últimas CIRCUIT_WINDOW llamadas. Si
+la fracción de errores o de llamadas lentas supera su umbral, el circuito se
+abre: durante CIRCUIT_OPEN_SECONDS las llamadas fallan al instante en lugar
+de esperar el timeout del proveedor. Después pasa a half-open y deja pasar
+una sonda; si va bien se cierra, si falla vuelve a abrirse.
+
+El estado es por proceso (cada worker de gunicorn decide por su cuenta).
+"""
+
+import collections
+import logging
+import os
+import threading
+import time
+from typing import Deque, Dict, Tuple
+
+logger = logging.getLogger(__name__)
+
+CIRCUIT_WINDOW = int(os.getenv('CIRCUIT_WINDOW', '20'))
+CIRCUIT_MIN_CALLS = int(os.getenv('CIRCUIT_MIN_CALLS', '5'))
+CIRCUIT_ERROR_RATE = float(os.getenv('CIRCUIT_ERROR_RATE', '0.5'))
+CIRCUIT_SLOW_CALL_SECONDS = float(os.getenv('CIRCUIT_SLOW_CALL_SECONDS', '3'))
+CIRCUIT_SLOW_RATE = float(os.getenv('CIRCUIT_SLOW_RATE', '0.5'))
+CIRCUIT_OPEN_SECONDS = float(os.getenv('CIRCUIT_OPEN_SECONDS', '30'))
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitBreaker:
+    """Estados closed / open / half_open con ventana deslizante de llamadas"""
+
+    def __init__(self, name: str, window: int = CIRCUIT_WINDOW, min_calls: int = CIRCUIT_MIN_CALLS,
+                 error_rate: float = CIRCUIT_ERROR_RATE, slow_call_seconds: float = CIRCUIT_SLOW_CALL_SECONDS,
+                 slow_rate: float = CIRCUIT_SLOW_RATE, open_seconds: float = CIRCUIT_OPEN_SECONDS):
+        self.name = name
+        self.min_calls = min_calls
+        self.error_rate = error_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_rate = slow_rate
+        self.open_seconds = open_seconds
+        self.state = CLOSED
+        self._calls: Deque[Tuple[bool, bool]] = collections.deque(maxlen=window)  # (falló, lenta)
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+        self.stats: Dict[str, int] = {'opened': 0, 'rejected': 0}
+
+    def allow(self) -> bool:
+        """¿Se puede llamar al proveedor ahora? En half-open solo pasa una sonda"""
+        with self._lock:
+            if self.state == OPEN and time.monotonic() - self._opened_at >= self.open_seconds:
+                self.state = HALF_OPEN
+                self._probe_in_flight = False
+                logger.info(f'Circuito {self.name}: half-open, probando el proveedor')
+            if self.state == CLOSED:
+                return True
+            if self.state == HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            self.stats['rejected'] += 1
+            return False
+
+    def record(self, success: bool, elapsed: float):
+        """Registrar el resultado de una llamada permitida por allow()"""
+        slow = elapsed >= self.slow_call_seconds
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._probe_in_flight = False
+                if success and not slow:
+                    self.state = CLOSED
+                    self._calls.clear()
+                    logger.info(f'Circuito {self.name}: cerrado, el proveedor se recuperó')
+                else:
+                    self._open()
+                return
+            self._calls.append((not success, slow))
+            if self.state == CLOSED and self._tripped():
+                self._open()
+
+    def release(self):
+        """Liberar una llamada permitida sin contarla (error del cliente, no del proveedor)"""
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._probe_in_flight = False
+
+    def _tripped(self) -> bool:
+        calls = len(self._calls)
+        if calls < self.min_calls:
+            return False
+        failures = sum(1 for failed, _ in self._calls if failed)
+        slow = sum(1 for _, is_slow in self._calls if is_slow)
+        return failures / calls >= self.error_rate or slow / calls >= self.slow_rate
+
+    def _open(self):
+        self.state = OPEN
+        self._opened_at = time.monotonic()
+        self._calls.clear()
+        self.stats['opened'] += 1
+        logger.warning(f'Circuito {self.name}: abierto durante {self.open_seconds:.0f}s')
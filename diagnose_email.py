@@ -1,251 +1,301 @@
 #!/usr/bin/env python3
 """
 Script de diagnóstico completo para el sistema de correos de StarkMind
+
+Las sondas de red (DNS, TCP, TLS y primer byte) se lanzan a la vez con
+asyncio contra todos los destinos: Zoho en 587/465/25, la API de Brevo y los
+que se añadan con DIAGNOSE_TARGETS o --target. El diagnóstico completo tarda
+lo que la sonda más lenta, no la suma de todas.
+
+    python diagnose_email.py                  # informe legible
+    python diagnose_email.py --json           # informe para máquinas
+    python diagnose_email.py --auth --send    # además login SMTP y correo de prueba
+
+health.py usa `run()` para el check de red del readiness probe.
 """
 
+import argparse
+import asyncio
+import json
 import smtplib
 import socket
 import ssl
 import os
+import sys
+import time
 from datetime import datetime
 from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-
-def check_smtp_connectivity():
-    """Verifica la conectividad con el servidor SMTP de Zoho"""
-    
-    print("🔍 DIAGNÓSTICO DE CONECTIVIDAD SMTP")
-    print("=" * 40)
-    
-    smtp_server = "smtp.zoho.com"
-    smtp_port = 465
-    
-    print(f"📡 Probando conexión a {smtp_server}:{smtp_port}")
-    
+from typing import Dict, List, NamedTuple, Optional
+from urllib.parse import urlparse
+
+from dotenv import load_dotenv
+
+# Cargar variables de entorno antes de leer la configuración
+load_dotenv()
+
+SMTP_SERVER = os.getenv('SMTP_HOST', 'smtp.zoho.com')
+BREVO_API_HOST = os.getenv('BREVO_API_HOST', 'https://api.brevo.com/v3')
+# Timeout por sonda (DNS + conexión + TLS + primer byte)
+DIAGNOSE_TIMEOUT = float(os.getenv('DIAGNOSE_TIMEOUT', '5'))
+# Destinos extra: "nombre=host:puerto/modo,..." (modos: smtp, starttls, smtps, https, http)
+DIAGNOSE_TARGETS = os.getenv('DIAGNOSE_TARGETS', '')
+
+MODES = ('smtp', 'starttls', 'smtps', 'https', 'http')
+
+
+class Target(NamedTuple):
+    """Destino a sondear y protocolo con el que se habla"""
+    name: str
+    host: str
+    port: int
+    mode: str
+
+
+def parse_target(spec: str) -> Target:
+    """`nombre=host:puerto/modo` (el nombre y el modo son opcionales)"""
+    name, _, rest = spec.rpartition('=')
+    address, _, mode = rest.partition('/')
+    host, _, port = address.rpartition(':')
+    mode = mode or {'465': 'smtps', '587': 'starttls', '443': 'https', '80': 'http'}.get(port, 'smtp')
+    if mode not in MODES:
+        raise ValueError(f'Modo desconocido en {spec!r}: {mode} (opciones: {", ".join(MODES)})')
+    return Target(name or f'{host}:{port}', host, int(port), mode)
+
+
+def default_targets() -> List[Target]:
+    """Zoho en sus tres puertos, la API de Brevo y los destinos de DIAGNOSE_TARGETS"""
+    api = urlparse(BREVO_API_HOST)
+    targets = [
+        Target('smtp-starttls', SMTP_SERVER, 587, 'starttls'),
+        Target('smtp-ssl', SMTP_SERVER, 465, 'smtps'),
+        Target('smtp-plain', SMTP_SERVER, 25, 'smtp'),
+        Target('brevo-api', api.hostname or 'api.brevo.com', api.port or (80 if api.scheme == 'http' else 443),
+               'https' if api.scheme != 'http' else 'http'),
+    ]
+    targets += [parse_target(spec.strip()) for spec in DIAGNOSE_TARGETS.split(',') if spec.strip()]
+    return targets
+
+
+def _ms(started: float) -> float:
+    return round((time.perf_counter() - started) * 1000, 1)
+
+
+async def _read_reply(reader: asyncio.StreamReader) -> str:
+    """Respuesta SMTP completa (las líneas `250-...` continúan hasta `250 ...`)"""
+    lines = []
+    while True:
+        line = (await reader.readline()).decode('utf-8', 'replace').rstrip()
+        if not line:
+            raise ConnectionError('El servidor cerró la conexión')
+        lines.append(line)
+        if len(line) < 4 or line[3] != '-':
+            return '\n'.join(lines)
+
+
+async def probe(target: Target, resolver: Dict[str, 'asyncio.Task'], timeout: float) -> dict:
+    """DNS, conexión TCP, handshake TLS y primer byte medidos por separado"""
+    result = {'name': target.name, 'host': target.host, 'port': target.port, 'mode': target.mode,
+              'ok': False, 'stage': 'dns'}
+    loop = asyncio.get_running_loop()
+    writer = None
+    context = ssl.create_default_context()
     try:
-        # Verificar resolución DNS
-        print("🔍 Resolviendo DNS...")
-        ip = socket.gethostbyname(smtp_server)
-        print(f"✅ DNS resuelto: {smtp_server} -> {ip}")
-        
-        # Verificar conectividad de red
-        print("🌐 Verificando conectividad de red...")
-        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        sock.settimeout(10)
-        result = sock.connect_ex((smtp_server, smtp_port))
-        sock.close()
-        
-        if result == 0:
-            print("✅ Conectividad de red: OK")
-            
-            # Intentar conexión SMTP
-            print("📧 Verificando conexión SMTP...")
-            context = ssl.create_default_context()
-            
-            try:
-                server = smtplib.SMTP_SSL(smtp_server, smtp_port, context=context)
-                server.set_debuglevel(0)  # Sin debug para output limpio
-                
-                # Obtener info del servidor
-                status, response = server.noop()
-                print(f"✅ Conexión SMTP establecida: {status} - {response.decode()}")
-                
-                server.quit()
-                return True
-                
-            except smtplib.SMTPException as e:
-                print(f"❌ Error SMTP: {str(e)}")
-                return False
-                
-        else:
-            print(f"❌ No se puede conectar al puerto {smtp_port}: Error {result}")
-            return False
-            
-    except socket.gaierror as e:
-        print(f"❌ Error DNS: {str(e)}")
-        return False
-    except Exception as e:
-        print(f"❌ Error inesperado: {str(e)}")
-        return False
+        async with asyncio.timeout(timeout):
+            # Una sola resolución por host, compartida por sus sondas
+            started = time.perf_counter()
+            if target.host not in resolver:
+                resolver[target.host] = asyncio.ensure_future(
+                    loop.getaddrinfo(target.host, None, type=socket.SOCK_STREAM))
+            addresses = await asyncio.shield(resolver[target.host])
+            result['dns_ms'] = _ms(started)
+            result['ip'] = addresses[0][4][0]
+
+            result['stage'] = 'connect'
+            started = time.perf_counter()
+            reader, writer = await asyncio.open_connection(result['ip'], target.port)
+            result['connect_ms'] = _ms(started)
+
+            if target.mode in ('smtps', 'https'):
+                result['stage'] = 'tls'
+                started = time.perf_counter()
+                await writer.start_tls(context, server_hostname=target.host)
+                result['tls_ms'] = _ms(started)
+
+            result['stage'] = 'first_byte'
+            started = time.perf_counter()
+            if target.mode in ('https', 'http'):
+                writer.write(f'HEAD / HTTP/1.1\r\nHost: {target.host}\r\nConnection: close\r\n\r\n'.encode())
+                await writer.drain()
+                status_line = (await reader.readline()).decode('latin-1').strip()
+                result['first_byte_ms'] = _ms(started)
+                result['response'] = status_line
+            else:
+                banner = await _read_reply(reader)
+                result['first_byte_ms'] = _ms(started)
+                result['response'] = banner.splitlines()[0]
+                if not banner.startswith('220'):
+                    raise ConnectionError(f'Saludo SMTP inesperado: {banner}')
+
+            if target.mode == 'starttls':
+                result['stage'] = 'tls'
+                started = time.perf_counter()
+                writer.write(b'EHLO starkmind-diagnose\r\n')
+                await _read_reply(reader)
+                writer.write(b'STARTTLS\r\n')
+                reply = await _read_reply(reader)
+                if not reply.startswith('220'):
+                    raise ConnectionError(f'STARTTLS rechazado: {reply}')
+                await writer.start_tls(context, server_hostname=target.host)
+                result['tls_ms'] = _ms(started)
+
+            result['stage'] = 'done'
+            result['ok'] = True
+    except TimeoutError:
+        result['error'] = f'timeout ({timeout:.0f}s) en {result["stage"]}'
+    except (OSError, ssl.SSLError, ConnectionError) as e:
+        result['error'] = f'{type(e).__name__}: {e}'
+    finally:
+        if writer is not None:
+            writer.close()
+    return result
+
+
+async def diagnose(targets: Optional[List[Target]] = None, timeout: float = DIAGNOSE_TIMEOUT) -> dict:
+    """Todas las sondas a la vez; el informe indica qué vías de envío están disponibles"""
+    targets = targets if targets is not None else default_targets()
+    resolver: Dict[str, asyncio.Task] = {}
+    started = time.perf_counter()
+    probes = await asyncio.gather(*(probe(target, resolver, timeout) for target in targets))
+    smtp_ok = any(p['ok'] for p in probes if p['mode'] in ('starttls', 'smtps'))
+    api_ok = any(p['ok'] for p in probes if p['mode'] in ('https', 'http'))
+    return {
+        'ok': smtp_ok or api_ok,
+        'smtp_ok': smtp_ok,
+        'api_ok': api_ok,
+        'elapsed_ms': _ms(started),
+        'checked_at': datetime.now().isoformat(timespec='seconds'),
+        'probes': probes,
+    }
 
-def test_smtp_auth():
+
+def run(targets: Optional[List[Target]] = None, timeout: float = DIAGNOSE_TIMEOUT) -> dict:
+    """Versión síncrona de diagnose() (crea su propio event loop)"""
+    return asyncio.run(diagnose(targets, timeout))
+
+
+def test_smtp_auth() -> dict:
     """Prueba la autenticación SMTP con las credenciales"""
-    
-    print("\n🔐 PRUEBA DE AUTENTICACIÓN SMTP")
-    print("=" * 35)
-    
-    smtp_server = "smtp.zoho.com"
-    smtp_port = 465
     username = os.getenv('ZOHO_EMAIL')
     password = os.getenv('ZOHO_PASSWORD')
-    
     if not username or not password:
-        print("❌ Credenciales no encontradas en variables de entorno")
-        return False
-    
-    print(f"👤 Usuario: {username}")
-    print(f"🔑 Password: {'*' * len(password)}")
-    
+        return {'ok': False, 'error': 'Credenciales no encontradas en variables de entorno'}
+
+    started = time.perf_counter()
     try:
         context = ssl.create_default_context()
-        server = smtplib.SMTP_SSL(smtp_server, smtp_port, context=context)
-        
-        print("🔍 Intentando autenticación...")
-        server.login(username, password)
-        print("✅ Autenticación exitosa")
-        
-        server.quit()
-        return True
-        
+        with smtplib.SMTP_SSL(SMTP_SERVER, 465, context=context, timeout=DIAGNOSE_TIMEOUT) as server:
+            server.login(username, password)
+        return {'ok': True, 'user': username, 'elapsed_ms': _ms(started)}
     except smtplib.SMTPAuthenticationError as e:
-        print(f"❌ Error de autenticación: {str(e)}")
-        print("💡 Verifica que las credenciales sean correctas")
-        print("💡 Asegúrate de que la autenticación SMTP esté habilitada en Zoho")
-        return False
+        return {'ok': False, 'user': username, 'error': f'Error de autenticación: {e}'}
     except Exception as e:
-        print(f"❌ Error: {str(e)}")
-        return False
-
-def test_alternative_ports():
-    """Prueba puertos alternativos para SMTP"""
-    
-    print("\n🔄 PROBANDO PUERTOS ALTERNATIVOS")
-    print("=" * 35)
-    
-    smtp_server = "smtp.zoho.com"
-    ports = [587, 465, 25]  # TLS, SSL, y puerto estándar
-    
-    for port in ports:
-        print(f"\n📡 Probando puerto {port}...")
-        
-        try:
-            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            sock.settimeout(5)
-            result = sock.connect_ex((smtp_server, port))
-            sock.close()
-            
-            if result == 0:
-                print(f"✅ Puerto {port}: Conectividad OK")
-                
-                # Probar SMTP en este puerto
-                try:
-                    if port == 465:
-                        # SSL
-                        context = ssl.create_default_context()
-                        server = smtplib.SMTP_SSL(smtp_server, port, context=context)
-                    else:
-                        # TLS o plano
-                        server = smtplib.SMTP(smtp_server, port)
-                        if port == 587:
-                            server.starttls()
-                    
-                    status, response = server.noop()
-                    print(f"✅ SMTP funcional en puerto {port}")
-                    server.quit()
-                    
-                except Exception as e:
-                    print(f"❌ SMTP no funcional en puerto {port}: {str(e)}")
-            else:
-                print(f"❌ Puerto {port}: No conecta")
-                
-        except Exception as e:
-            print(f"❌ Error probando puerto {port}: {str(e)}")
-
-def check_env_config():
-    """Verifica la configuración del entorno"""
-    
-    print("\n⚙️  VERIFICACIÓN DE CONFIGURACIÓN")
-    print("=" * 35)
-    
-    required_vars = ['ZOHO_EMAIL', 'ZOHO_PASSWORD', 'FLASK_ENV']
-    
-    for var in required_vars:
-        value = os.getenv(var)
-        if value:
-            if 'PASSWORD' in var:
-                print(f"✅ {var}: {'*' * len(value)}")
-            else:
-                print(f"✅ {var}: {value}")
-        else:
-            print(f"❌ {var}: No configurado")
+        return {'ok': False, 'user': username, 'error': str(e)}
+
 
-def test_simple_email():
+def test_simple_email() -> dict:
     """Envía un correo de prueba simple"""
-    
-    print("\n📧 PRUEBA DE ENVÍO SIMPLE")
-    print("=" * 30)
-    
-    smtp_server = "smtp.zoho.com"
-    smtp_port = 587  # Probemos TLS en lugar de SSL
     username = os.getenv('ZOHO_EMAIL')
     password = os.getenv('ZOHO_PASSWORD')
-    
     if not username or not password:
-        print("❌ Credenciales no disponibles")
-        return False
-    
+        return {'ok': False, 'error': 'Credenciales no disponibles'}
+
+    # Crear mensaje simple
+    msg = MIMEText(f"Test email enviado el {datetime.now()}")
+    msg['Subject'] = "Prueba de correo - StarkMind"
+    msg['From'] = username
+    msg['To'] = username  # Enviarse a sí mismo
+
+    started = time.perf_counter()
     try:
-        # Crear mensaje simple
-        msg = MIMEText(f"Test email enviado el {datetime.now()}")
-        msg['Subject'] = "Prueba de correo - StarkMind"
-        msg['From'] = username
-        msg['To'] = username  # Enviarse a sí mismo
-        
-        print(f"📤 Enviando correo de prueba a {username}...")
-        
-        # Conectar y enviar
-        server = smtplib.SMTP(smtp_server, smtp_port)
-        server.starttls()  # Habilitar TLS
-        server.login(username, password)
-        
-        text = msg.as_string()
-        server.sendmail(username, [username], text)
-        server.quit()
-        
-        print("✅ Correo enviado exitosamente")
-        return True
-        
+        with smtplib.SMTP(SMTP_SERVER, 587, timeout=DIAGNOSE_TIMEOUT) as server:
+            server.starttls()  # Habilitar TLS
+            server.login(username, password)
+            server.sendmail(username, [username], msg.as_string())
+        return {'ok': True, 'to': username, 'elapsed_ms': _ms(started)}
     except Exception as e:
-        print(f"❌ Error enviando correo: {str(e)}")
-        return False
+        return {'ok': False, 'to': username, 'error': str(e)}
 
-def main():
-    """Función principal de diagnóstico"""
-    
+
+def check_env_config() -> Dict[str, bool]:
+    """Variables de entorno necesarias para enviar correo"""
+    return {var: bool(os.getenv(var)) for var in ('BREVO_API_KEY', 'ZOHO_EMAIL', 'ZOHO_PASSWORD', 'FLASK_ENV')}
+
+
+async def full_diagnosis(targets: List[Target], timeout: float, auth: bool) -> dict:
+    """Sondas de red y, si se pide, el login SMTP (en un hilo) en paralelo"""
+    if not auth:
+        return await diagnose(targets, timeout)
+    report, auth_result = await asyncio.gather(diagnose(targets, timeout), asyncio.to_thread(test_smtp_auth))
+    report['auth'] = auth_result
+    return report
+
+
+def print_report(report: dict):
     print("🔧 DIAGNÓSTICO COMPLETO DEL SISTEMA DE CORREOS")
     print("=" * 50)
     print(f"📅 Fecha: {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}")
-    
-    # Cargar variables de entorno
-    from dotenv import load_dotenv
-    load_dotenv()
-    
-    # Ejecutar diagnósticos
-    results = []
-    
-    results.append(("Configuración", check_env_config()))
-    results.append(("Conectividad SMTP", check_smtp_connectivity()))
-    test_alternative_ports()
-    results.append(("Autenticación", test_smtp_auth()))
-    results.append(("Envío simple", test_simple_email()))
-    
-    # Resumen
-    print("\n" + "=" * 50)
-    print("📊 RESUMEN DEL DIAGNÓSTICO")
-    print("=" * 50)
-    
-    for test_name, result in results:
-        if result is None:
-            continue
-        status = "✅ PASS" if result else "❌ FAIL"
-        print(f"{status} {test_name}")
-    
-    # Recomendaciones
+
+    print("\n⚙️  CONFIGURACIÓN")
+    for var, present in report['config'].items():
+        print(f"{'✅' if present else '❌'} {var}: {'configurado' if present else 'No configurado'}")
+
+    print(f"\n📡 SONDAS DE RED ({len(report['probes'])} en paralelo, {report['elapsed_ms']:.0f} ms en total)")
+    print(f"{'destino':<16}{'host:puerto':<28}{'dns':>8}{'tcp':>8}{'tls':>8}{'1er byte':>10}")
+    for p in report['probes']:
+        columns = ''.join(f"{p[key]:>{width}.0f}" if key in p else f"{'-':>{width}}"
+                          for key, width in (('dns_ms', 8), ('connect_ms', 8), ('tls_ms', 8), ('first_byte_ms', 10)))
+        print(f"{'✅' if p['ok'] else '❌'} {p['name']:<14}{p['host'] + ':' + str(p['port']):<28}{columns}")
+        if not p['ok']:
+            print(f"   {p['error']}")
+
+    for key, title in (('auth', 'Autenticación SMTP'), ('send', 'Envío de prueba')):
+        if key in report:
+            result = report[key]
+            print(f"\n{'✅' if result['ok'] else '❌'} {title}" + (f": {result['error']}" if not result['ok'] else ''))
+
     print("\n💡 RECOMENDACIONES:")
-    print("1. Si la conectividad falla, verifica firewall/proxy")
-    print("2. Si la autenticación falla, revisa credenciales en Zoho")
-    print("3. Considera usar puerto 587 con TLS en lugar de 465 SSL")
-    print("4. Verifica que SMTP esté habilitado en tu cuenta Zoho")
+    if not report['smtp_ok']:
+        print("- Ningún puerto SMTP con TLS responde: verifica firewall/proxy de salida")
+    if not report['api_ok']:
+        print("- La API de Brevo no responde: los envíos dependerán del respaldo SMTP")
+    if 'auth' in report and not report['auth']['ok']:
+        print("- Revisa las credenciales y que SMTP esté habilitado en tu cuenta Zoho")
+    if report['ok'] and report['smtp_ok'] and report['api_ok']:
+        print("- Todas las vías de envío están disponibles")
+
+
+def main():
+    """Función principal de diagnóstico"""
+    parser = argparse.ArgumentParser(description='Diagnóstico del sistema de correos de StarkMind')
+    parser.add_argument('--json', action='store_true', help='Informe en JSON')
+    parser.add_argument('--timeout', type=float, default=DIAGNOSE_TIMEOUT, help='Timeout por sonda en segundos')
+    parser.add_argument('--target', action='append', default=[], help='Destino extra nombre=host:puerto/modo')
+    parser.add_argument('--auth', action='store_true', help='Probar también el login SMTP')
+    parser.add_argument('--send', action='store_true', help='Enviar además un correo de prueba')
+    args = parser.parse_args()
+
+    targets = default_targets() + [parse_target(spec) for spec in args.target]
+    report = asyncio.run(full_diagnosis(targets, args.timeout, args.auth))
+    report['config'] = check_env_config()
+    if args.send:
+        report['send'] = test_simple_email()
+
+    if args.json:
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+    else:
+        print_report(report)
+    sys.exit(0 if report['ok'] else 1)
+
 
 if __name__ == "__main__":
     main()
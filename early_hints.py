@@ -0,0 +1,120 @@
+"""
+Early Hints y cabeceras Link de preload para StarkMind
+
+El navegador solo descubre main.<hash>.css y main.<hash>.js al parsear
+index.html. Con los `entrypoints` de asset-manifest.json (leídos por el
+índice estático) se arman, una vez por build, los hints:
+
+- `<...main.css>; rel=preload; as=style` y `<...main.js>; rel=preload; as=script`
+- `rel=preconnect` opcionales para los orígenes de fuentes y media
+  (EARLY_HINTS_PRECONNECT y, con `crossorigin`, EARLY_HINTS_PRECONNECT_CORS)
+
+Al servir `/` y las rutas del SPA:
+
+- `EARLY_HINTS=link` (por defecto): cabecera `Link` en la respuesta. Los
+  CDN (Cloudflare, Fastly) la convierten en `103 Early Hints` para las
+  siguientes visitas.
+- `EARLY_HINTS=103`: además se envía `103 Early Hints` antes de la respuesta
+  si el servidor lo permite: un callable `wsgi.early_hints` en el environ o,
+  con gunicorn, escribiendo la respuesta informativa en el socket (solo
+  HTTP/1.1; activarlo únicamente si el proxy deja pasar respuestas 1xx).
+- `EARLY_HINTS=off`: nada.
+"""
+
+import logging
+import os
+from typing import List, Optional
+
+from static_assets import StaticIndex
+
+logger = logging.getLogger(__name__)
+
+EARLY_HINTS = os.getenv('EARLY_HINTS', 'link').lower()
+# Orígenes separados por comas, p. ej. https://fonts.googleapis.com
+EARLY_HINTS_PRECONNECT = [o.strip() for o in os.getenv('EARLY_HINTS_PRECONNECT', '').split(',') if o.strip()]
+# Orígenes que sirven fuentes u otros recursos CORS, p. ej. https://fonts.gstatic.com
+EARLY_HINTS_PRECONNECT_CORS = [o.strip() for o in os.getenv('EARLY_HINTS_PRECONNECT_CORS', '').split(',') if o.strip()]
+
+# Valor de `as` según la extensión del entrypoint
+PRELOAD_AS = {
+    '.css': 'style',
+    '.js': 'script',
+    '.woff2': 'font',
+    '.woff': 'font',
+}
+
+
+def preload_links(static_index: StaticIndex, preconnect: List[str] = (), preconnect_cors: List[str] = ()) -> List[str]:
+    """Valores de la cabecera Link: preconnect primero, luego los entrypoints del build"""
+    links = [f'<{origin}>; rel=preconnect' for origin in preconnect]
+    links += [f'<{origin}>; rel=preconnect; crossorigin' for origin in preconnect_cors]
+    for name in static_index.manifest.get('entrypoints', []):
+        relative = name.lstrip('/')
+        kind = PRELOAD_AS.get(os.path.splitext(relative)[1])
+        # Solo lo que existe en el índice: nunca precargar un 404
+        if kind is None or static_index.get(relative) is None:
+            continue
+        link = f'</{relative}>; rel=preload; as={kind}'
+        if kind == 'font':
+            link += '; crossorigin'
+        links.append(link)
+    return links
+
+
+class EarlyHints:
+    """Hints del build actual, recalculados cuando cambia el índice estático"""
+
+    def __init__(self, static_index: StaticIndex, mode: str = EARLY_HINTS,
+                 preconnect: List[str] = EARLY_HINTS_PRECONNECT, preconnect_cors: List[str] = EARLY_HINTS_PRECONNECT_CORS):
+        self.static_index = static_index
+        self.mode = mode
+        self.preconnect = preconnect
+        self.preconnect_cors = preconnect_cors
+        self._generation: Optional[int] = None
+        self._header = ''
+        self._informational = b''
+        self.stats = {'link': 0, 'informational': 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode in ('link', '103')
+
+    def header(self) -> str:
+        """Valor de la cabecera Link ('' si el build no tiene entrypoints ni hay preconnect)"""
+        if self._generation != self.static_index.generation:
+            links = preload_links(self.static_index, self.preconnect, self.preconnect_cors)
+            self._header = ', '.join(links)
+            self._informational = (
+                f'HTTP/1.1 103 Early Hints\r\nLink: {self._header}\r\n\r\n'.encode('latin-1') if links else b''
+            )
+            self._generation = self.static_index.generation
+        return self._header
+
+    def send_informational(self, environ: dict) -> bool:
+        """Enviar `103 Early Hints` antes de la respuesta si el servidor lo permite"""
+        if self.mode != '103' or environ.get('SERVER_PROTOCOL') != 'HTTP/1.1':
+            return False
+        header = self.header()
+        if not header:
+            return False
+        try:
+            early_hints = environ.get('wsgi.early_hints')
+            if callable(early_hints):
+                early_hints([('Link', header)])
+            elif 'gunicorn.socket' in environ:
+                environ['gunicorn.socket'].sendall(self._informational)
+            else:
+                return False
+        except OSError as e:
+            logger.debug(f'No se pudo enviar 103 Early Hints: {e}')
+            return False
+        self.stats['informational'] += 1
+        return True
+
+    def apply(self, response):
+        """Añadir la cabecera Link a la respuesta final"""
+        header = self.header() if self.enabled else ''
+        if header and response.status_code == 200:
+            response.headers.add('Link', header)
+            self.stats['link'] += 1
+        return response
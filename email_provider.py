@@ -0,0 +1,318 @@
+"""
+Proveedores de email para StarkMind
+
+`send_mail()` en app.py habla con una interfaz mínima (`EmailProvider.send`)
+en lugar de con el SDK de Brevo. El SDK generado (`brevo_python`, cientos de
+modelos) tarda ~230 ms en importarse: el proveedor lo importa la primera vez
+que envía, en el hilo de la cola de correos, así los workers que solo sirven
+archivos estáticos y los reinicios del contenedor no pagan ese coste. Con
+preload de gunicorn, `preload()` lo importa una sola vez en el master y los
+workers comparten esas páginas.
+
+Cada proveedor va detrás de un circuit breaker (`FailoverProvider`): si Brevo
+falla o se vuelve lento, los envíos pasan al instante al proveedor SMTP de
+respaldo (Zoho, con conexiones autenticadas reutilizadas) en lugar de esperar
+el timeout en cada intento.
+"""
+
+import importlib
+import logging
+import os
+import queue
+import smtplib
+import ssl
+import threading
+import time
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from email.utils import formataddr, make_msgid
+from typing import Dict, List, Optional, Tuple
+
+from brevo_client import brevo_client
+from circuit_breaker import CircuitBreaker
+
+logger = logging.getLogger(__name__)
+
+EMAIL_PROVIDER = os.getenv('EMAIL_PROVIDER', 'brevo').lower()
+# Proveedor de respaldo cuando el circuito del principal está abierto ('' = ninguno)
+EMAIL_FALLBACK_PROVIDER = os.getenv('EMAIL_FALLBACK_PROVIDER', '').lower()
+
+# SMTP de respaldo (mismos servidor y credenciales que diagnose_email.py)
+SMTP_HOST = os.getenv('SMTP_HOST', 'smtp.zoho.com')
+SMTP_PORT = int(os.getenv('SMTP_PORT', '465'))  # 465 SSL o 587 STARTTLS
+SMTP_USERNAME = os.getenv('SMTP_USERNAME') or os.getenv('ZOHO_EMAIL')
+SMTP_PASSWORD = os.getenv('SMTP_PASSWORD') or os.getenv('ZOHO_PASSWORD')
+SMTP_TIMEOUT = float(os.getenv('SMTP_TIMEOUT', '10'))
+SMTP_POOL_SIZE = int(os.getenv('SMTP_POOL_SIZE', '2'))
+# Zoho cierra las sesiones inactivas; una conexión más vieja que esto se verifica con NOOP
+SMTP_MAX_IDLE = float(os.getenv('SMTP_MAX_IDLE', '30'))
+
+
+def http_permanent(status: Optional[int]) -> bool:
+    """Error HTTP del cliente (4xx salvo 408/429, p. ej. destinatario inválido): reintentar no sirve"""
+    return status is not None and 400 <= status < 500 and status not in (408, 429)
+
+
+def smtp_permanent(code: Optional[int]) -> bool:
+    """Respuesta SMTP 5xx (p. ej. 550 buzón inexistente); las 4xx (421, 450, 451, 452) son transitorias"""
+    return code is not None and 500 <= code < 600
+
+
+class EmailProviderError(Exception):
+    """
+    Fallo del proveedor
+
+    `status` es el código HTTP de su API y `smtp_code` la respuesta del
+    servidor SMTP, si los hubo. `permanent` lo decide cada proveedor según su
+    protocolo; por defecto se deduce del código HTTP.
+    """
+
+    def __init__(self, message: str, status: Optional[int] = None, smtp_code: Optional[int] = None,
+                 permanent: Optional[bool] = None):
+        super().__init__(message)
+        self.status = status
+        self.smtp_code = smtp_code
+        self.permanent = http_permanent(status) if permanent is None else permanent
+
+
+class EmailProvider:
+    """Interfaz de los proveedores: un envío transaccional con HTML y texto"""
+
+    name = 'base'
+
+    def send(self, sender: str, recipients: List[str], subject: str, html: str, text: str) -> dict:
+        raise NotImplementedError
+
+    def preload(self):
+        """Importar por adelantado lo que el primer envío cargaría (master de gunicorn con preload)"""
+
+
+class BrevoProvider(EmailProvider):
+    """API transaccional de Brevo (SDK importado en el primer envío)"""
+
+    name = 'brevo'
+
+    def preload(self):
+        try:
+            importlib.import_module('brevo_python')
+            importlib.import_module('brevo_python.rest')
+        except ImportError as e:
+            logger.warning(f'SDK de Brevo no disponible para precargar: {e}')
+
+    def send(self, sender: str, recipients: List[str], subject: str, html: str, text: str) -> dict:
+        import brevo_python
+        from brevo_python.rest import ApiException
+
+        # Cliente Brevo compartido por el proceso (pool keep-alive)
+        api_instance = brevo_client.get_api()
+
+        # Configurar remitente
+        sender_config = {
+            "name": "StarkMind",
+            "email": sender
+        }
+
+        # Configurar destinatarios
+        to_list = [{"email": email, "name": email.split('@')[0]} for email in recipients]
+
+        # Configurar reply-to
+        reply_to = {
+            "name": "StarkMind Support",
+            "email": sender
+        }
+
+        # Crear el email
+        send_smtp_email = brevo_python.SendSmtpEmail(
+            to=to_list,
+            sender=sender_config,
+            reply_to=reply_to,
+            subject=subject,
+            html_content=html,
+            text_content=text
+        )
+
+        try:
+            api_response = api_instance.send_transac_email(
+                send_smtp_email,
+                _request_timeout=brevo_client.request_timeout
+            )
+        except ApiException as e:
+            raise EmailProviderError(f'Error en API Brevo: {e}', status=e.status) from e
+
+        return {
+            'success': True,
+            'message_id': api_response.message_id if hasattr(api_response, 'message_id') else None,
+            'response': api_response
+        }
+
+
+class SmtpProvider(EmailProvider):
+    """SMTP autenticado con un pool de conexiones reutilizadas por proceso"""
+
+    name = 'smtp'
+
+    def __init__(self, host: str = SMTP_HOST, port: int = SMTP_PORT, username: Optional[str] = SMTP_USERNAME,
+                 password: Optional[str] = SMTP_PASSWORD, pool_size: int = SMTP_POOL_SIZE):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.pool_size = pool_size
+        self._pool: 'queue.LifoQueue[Tuple[smtplib.SMTP, float]]' = queue.LifoQueue()
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> smtplib.SMTP:
+        context = ssl.create_default_context()
+        if self.port == 465:
+            server = smtplib.SMTP_SSL(self.host, self.port, timeout=SMTP_TIMEOUT, context=context)
+        else:
+            server = smtplib.SMTP(self.host, self.port, timeout=SMTP_TIMEOUT)
+            server.starttls(context=context)
+        if self.username and self.password:
+            server.login(self.username, self.password)
+        return server
+
+    def _acquire(self) -> smtplib.SMTP:
+        """Conexión del pool (verificada si estuvo inactiva) o una nueva"""
+        with self._lock:
+            if self._pid != os.getpid():
+                # Tras un fork las sesiones TLS del padre no se pueden usar
+                self._pool = queue.LifoQueue()
+                self._pid = os.getpid()
+        while True:
+            try:
+                server, last_used = self._pool.get_nowait()
+            except queue.Empty:
+                return self._connect()
+            if time.monotonic() - last_used < SMTP_MAX_IDLE:
+                return server
+            try:
+                if server.noop()[0] == 250:
+                    return server
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._close(server)
+
+    def _release(self, server: smtplib.SMTP):
+        if self._pool.qsize() < self.pool_size:
+            self._pool.put((server, time.monotonic()))
+        else:
+            self._close(server)
+
+    @staticmethod
+    def _close(server: smtplib.SMTP):
+        try:
+            server.quit()
+        except (smtplib.SMTPException, OSError):
+            server.close()
+
+    def _message(self, sender: str, recipients: List[str], subject: str, html: str, text: str) -> MIMEMultipart:
+        message = MIMEMultipart('alternative')
+        message['Subject'] = subject
+        # El servidor SMTP solo acepta como remitente la cuenta autenticada
+        message['From'] = formataddr(('StarkMind', self.username or sender))
+        message['Reply-To'] = formataddr(('StarkMind Support', sender))
+        message['To'] = ', '.join(recipients)
+        message['Message-ID'] = make_msgid(domain=(self.username or sender).split('@')[-1])
+        message.attach(MIMEText(text, 'plain', 'utf-8'))
+        message.attach(MIMEText(html, 'html', 'utf-8'))
+        return message
+
+    def send(self, sender: str, recipients: List[str], subject: str, html: str, text: str) -> dict:
+        message = self._message(sender, recipients, subject, html, text)
+        # Un reintento con conexión nueva si la reutilizada se cerró por el camino
+        for attempt in range(2):
+            try:
+                server = self._acquire()
+            except (smtplib.SMTPException, OSError) as e:
+                # Fallo de conexión o login (p. ej. 535): es del servidor, no del mensaje; pasar al respaldo
+                raise EmailProviderError(f'Error conectando a SMTP {self.host}:{self.port}: {e}',
+                                         smtp_code=getattr(e, 'smtp_code', None), permanent=False) from e
+            try:
+                server.sendmail(self.username or sender, recipients, message.as_string())
+            except smtplib.SMTPServerDisconnected as e:
+                server.close()
+                if attempt == 0:
+                    continue
+                raise EmailProviderError(f'Error en SMTP: {e}') from e
+            except smtplib.SMTPResponseException as e:
+                self._close(server)
+                raise EmailProviderError(f'Error en SMTP: {e}', smtp_code=e.smtp_code,
+                                         permanent=smtp_permanent(e.smtp_code)) from e
+            except (smtplib.SMTPException, OSError) as e:
+                server.close()
+                raise EmailProviderError(f'Error en SMTP: {e}') from e
+            self._release(server)
+            return {'success': True, 'message_id': message['Message-ID'], 'response': None}
+
+
+class FailoverProvider(EmailProvider):
+    """Proveedores en orden de preferencia, cada uno detrás de su circuit breaker"""
+
+    def __init__(self, providers: List[EmailProvider]):
+        self.providers = [(provider, CircuitBreaker(provider.name)) for provider in providers]
+        self.name = '+'.join(provider.name for provider in providers)
+        self.stats: Dict[Tuple[str, str], int] = {}
+        self._stats_lock = threading.Lock()
+
+    def preload(self):
+        for provider, _ in self.providers:
+            provider.preload()
+
+    def _count(self, provider: str, result: str):
+        with self._stats_lock:
+            self.stats[(provider, result)] = self.stats.get((provider, result), 0) + 1
+
+    def send(self, sender: str, recipients: List[str], subject: str, html: str, text: str) -> dict:
+        last_error: Optional[EmailProviderError] = None
+        for provider, breaker in self.providers:
+            if not breaker.allow():
+                self._count(provider.name, 'circuit_open')
+                continue
+            started = time.perf_counter()
+            try:
+                result = provider.send(sender, recipients, subject, html, text)
+            except EmailProviderError as e:
+                if not e.permanent:
+                    breaker.record(False, time.perf_counter() - started)
+                    self._count(provider.name, 'error')
+                    last_error = e
+                    logger.warning(f'Proveedor {provider.name} falló: {e}')
+                    continue
+                # El proveedor respondió: ni cuenta para su circuito ni se pasa al de respaldo
+                breaker.release()
+                self._count(provider.name, 'rejected')
+                raise
+            except Exception as e:
+                breaker.record(False, time.perf_counter() - started)
+                self._count(provider.name, 'error')
+                last_error = e if isinstance(e, EmailProviderError) else EmailProviderError(str(e))
+                logger.warning(f'Proveedor {provider.name} falló: {e}')
+                continue
+            breaker.record(True, time.perf_counter() - started)
+            self._count(provider.name, 'ok')
+            result['provider'] = provider.name
+            return result
+        if last_error is not None:
+            raise last_error
+        # Todos los circuitos abiertos: fallar sin esperar (la cola reintenta con backoff)
+        raise EmailProviderError(f'Circuito abierto para {self.name}', status=503)
+
+    def circuit_states(self) -> Dict[str, str]:
+        return {provider.name: breaker.state for provider, breaker in self.providers}
+
+
+PROVIDERS: Dict[str, type] = {
+    'brevo': BrevoProvider,
+    'smtp': SmtpProvider,
+}
+
+
+def get_provider(name: str = EMAIL_PROVIDER, fallback: str = EMAIL_FALLBACK_PROVIDER) -> FailoverProvider:
+    """Proveedor principal y, si se configura, el de respaldo, con circuit breakers"""
+    names = [name] + ([fallback] if fallback and fallback != name else [])
+    for provider_name in names:
+        if provider_name not in PROVIDERS:
+            raise ValueError(f'Proveedor de email desconocido: {provider_name} (opciones: {", ".join(PROVIDERS)})')
+    return FailoverProvider([PROVIDERS[provider_name]() for provider_name in names])
@@ -0,0 +1,237 @@
+"""
+Cola persistente de correos salientes para StarkMind
+
+Los envíos se guardan en SQLite (modo WAL) y un pool de hilos en segundo
+plano los entrega con reintentos, backoff exponencial y dead-letter. Así la
+petición HTTP solo valida y encola; la latencia del proveedor de email deja
+de afectar al formulario de contacto.
+
+Una excepción con `permanent = True` (p. ej. `EmailProviderError` con un 4xx
+de la API o un 5xx de SMTP por destinatario inválido) pasa a dead-letter al
+primer intento: reintentarla solo repetiría el rechazo.
+"""
+
+import json
+import logging
+import os
+import random
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Configuración por variables de entorno
+QUEUE_PATH = os.getenv('EMAIL_QUEUE_PATH', os.path.join('data', 'email_queue.db'))
+QUEUE_WORKERS = int(os.getenv('EMAIL_QUEUE_WORKERS', '2'))
+MAX_ATTEMPTS = int(os.getenv('EMAIL_QUEUE_MAX_ATTEMPTS', '5'))
+BACKOFF_BASE = float(os.getenv('EMAIL_QUEUE_BACKOFF_BASE', '2'))
+BACKOFF_MAX = float(os.getenv('EMAIL_QUEUE_BACKOFF_MAX', '300'))
+POLL_INTERVAL = float(os.getenv('EMAIL_QUEUE_POLL_INTERVAL', '1'))
+# Un trabajo reclamado por un worker que murió vuelve a estar disponible tras este tiempo
+LEASE_SECONDS = float(os.getenv('EMAIL_QUEUE_LEASE_SECONDS', '120'))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS email_jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL DEFAULT 'mail',
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    available_at REAL NOT NULL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    last_error TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_email_jobs_ready ON email_jobs (kind, status, available_at);
+"""
+
+Job = Tuple[int, dict, int]
+
+
+class EmailQueue:
+    """Cola de trabajos de email respaldada por SQLite con pool de workers"""
+
+    def __init__(self, handler: Callable[[dict], None], path: str = QUEUE_PATH,
+                 workers: int = QUEUE_WORKERS, max_attempts: int = MAX_ATTEMPTS):
+        self.handler = handler
+        self.path = path
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self._local = threading.local()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._pid: Optional[int] = None
+        self._start_lock = threading.Lock()
+        self._init_schema()
+
+    # -- Conexiones -------------------------------------------------------
+
+    def _connect(self) -> sqlite3.Connection:
+        """Conexión SQLite por hilo y por proceso (no se comparte tras un fork)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute('PRAGMA busy_timeout=30000')
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+    def _init_schema(self):
+        self._connect().executescript(SCHEMA)
+
+    # -- API de la cola ---------------------------------------------------
+
+    def enqueue(self, payload: dict, kind: str = 'mail') -> int:
+        """Guardar un trabajo de forma durable y despertar a los workers"""
+        now = time.time()
+        cursor = self._connect().execute(
+            'INSERT INTO email_jobs (kind, payload, available_at, created_at, updated_at) '
+            'VALUES (?, ?, ?, ?, ?)',
+            (kind, json.dumps(payload), now, now, now)
+        )
+        self._wakeup.set()
+        return cursor.lastrowid
+
+    def claim(self, kind: str = 'mail', limit: int = 1) -> List[Job]:
+        """Reclamar hasta `limit` trabajos listos; el lease evita dobles envíos entre procesos"""
+        now = time.time()
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            rows = conn.execute(
+                "SELECT id, payload, attempts FROM email_jobs "
+                "WHERE kind = ? AND status IN ('pending', 'sending') AND available_at <= ? "
+                "ORDER BY id LIMIT ?",
+                (kind, now, limit)
+            ).fetchall()
+            if rows:
+                conn.executemany(
+                    "UPDATE email_jobs SET status = 'sending', attempts = attempts + 1, "
+                    "available_at = ?, updated_at = ? WHERE id = ?",
+                    [(now + LEASE_SECONDS, now, row[0]) for row in rows]
+                )
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return [(row[0], json.loads(row[1]), row[2] + 1) for row in rows]
+
+    def complete(self, job_ids: List[int]):
+        """Eliminar trabajos entregados"""
+        self._connect().executemany('DELETE FROM email_jobs WHERE id = ?', [(job_id,) for job_id in job_ids])
+
+    def fail(self, job_ids: List[int], attempts: int, error: str, permanent: bool = False):
+        """Reprogramar con backoff exponencial o mover a dead-letter al agotar intentos (o si el error es permanente)"""
+        now = time.time()
+        conn = self._connect()
+        if permanent or attempts >= self.max_attempts:
+            conn.executemany(
+                "UPDATE email_jobs SET status = 'dead', updated_at = ?, last_error = ? WHERE id = ?",
+                [(now, error, job_id) for job_id in job_ids]
+            )
+            reason = 'error permanente' if permanent else f'{attempts} intentos'
+            logger.error(f'Trabajos de email {job_ids} movidos a dead-letter tras {reason}: {error}')
+            return
+        delay = min(BACKOFF_MAX, BACKOFF_BASE ** attempts) * random.uniform(0.8, 1.2)
+        conn.executemany(
+            "UPDATE email_jobs SET status = 'pending', available_at = ?, updated_at = ?, last_error = ? WHERE id = ?",
+            [(now + delay, now, error, job_id) for job_id in job_ids]
+        )
+        logger.warning(f'Trabajos de email {job_ids} fallaron (intento {attempts}), reintento en {delay:.1f}s: {error}')
+
+    def pending(self, kind: str = 'mail') -> Tuple[int, Optional[float]]:
+        """Trabajos listos de un tipo: (cantidad, created_at del más antiguo)"""
+        row = self._connect().execute(
+            "SELECT COUNT(*), MIN(created_at) FROM email_jobs "
+            "WHERE kind = ? AND status IN ('pending', 'sending') AND available_at <= ?",
+            (kind, time.time())
+        ).fetchone()
+        return row[0], row[1]
+
+    def depth(self) -> Dict[str, int]:
+        """Número de trabajos por estado"""
+        rows = self._connect().execute('SELECT status, COUNT(*) FROM email_jobs GROUP BY status').fetchall()
+        return {status: count for status, count in rows}
+
+    def dead_letters(self, limit: int = 100) -> List[dict]:
+        """Trabajos que agotaron sus reintentos, para inspección manual"""
+        rows = self._connect().execute(
+            "SELECT id, kind, payload, attempts, last_error, updated_at FROM email_jobs "
+            "WHERE status = 'dead' ORDER BY id DESC LIMIT ?",
+            (limit,)
+        ).fetchall()
+        return [
+            {'id': r[0], 'kind': r[1], 'payload': json.loads(r[2]), 'attempts': r[3], 'last_error': r[4], 'failed_at': r[5]}
+            for r in rows
+        ]
+
+    def requeue_dead(self) -> int:
+        """Devolver los trabajos en dead-letter a la cola"""
+        now = time.time()
+        cursor = self._connect().execute(
+            "UPDATE email_jobs SET status = 'pending', attempts = 0, available_at = ?, updated_at = ? WHERE status = 'dead'",
+            (now, now)
+        )
+        self._wakeup.set()
+        return cursor.rowcount
+
+    # -- Workers ----------------------------------------------------------
+
+    def start(self):
+        """Arrancar el pool en este proceso; es idempotente y seguro tras fork"""
+        if self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            # Los hilos no sobreviven a un fork: cada proceso crea los suyos
+            self._stop = threading.Event()
+            self._wakeup = threading.Event()
+            self._threads = []
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._worker_loop, name=f'email-worker-{i}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+            self._pid = os.getpid()
+            logger.info(f'Pool de email iniciado con {self.workers} workers (pid {self._pid})')
+
+    def stop(self, timeout: float = 5.0):
+        """Detener los workers del proceso actual"""
+        self._stop.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+        self._pid = None
+
+    def _worker_loop(self):
+        while not self._stop.is_set():
+            try:
+                jobs = self.claim()
+            except sqlite3.Error as e:
+                logger.error(f'Error leyendo la cola de email: {e}')
+                jobs = []
+            if not jobs:
+                self._wakeup.wait(POLL_INTERVAL)
+                self._wakeup.clear()
+                continue
+            for job_id, payload, attempts in jobs:
+                self.process(job_id, payload, attempts)
+
+    def process(self, job_id: int, payload: dict, attempts: int):
+        """Ejecutar un trabajo y registrar su resultado"""
+        try:
+            self.handler(payload)
+        except Exception as e:
+            self.fail([job_id], attempts, str(e), permanent=getattr(e, 'permanent', False))
+        else:
+            self.complete([job_id])
@@ -0,0 +1,120 @@
+"""
+Plantillas de los correos del formulario de contacto para StarkMind
+
+Los cuerpos HTML y de texto viven en templates/emails/ como plantillas Jinja:
+
+- `lead_notification.*`: notificación interna del lead (en español).
+- `<idioma>/auto_reply.*`: confirmación al visitante, en el idioma de
+  `LanguageContext` con el que envió el formulario.
+
+Cada correo tiene `.subject.txt`, `.html` y `.txt`. El HTML se renderiza con
+autoescape (los datos del formulario nunca se inyectan como marcado). Las
+plantillas se compilan una sola vez al arrancar (`precompile()`), con caché
+de bytecode en disco para que los workers nuevos no vuelvan a parsearlas.
+
+Micro-benchmark: `python email_templates.py --benchmark [iteraciones]`
+"""
+
+import logging
+import os
+import sys
+import time
+from typing import Dict, Tuple
+
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader, Template, select_autoescape
+
+from prerender import DEFAULT_LANGUAGE, LANGUAGES
+
+logger = logging.getLogger(__name__)
+
+TEMPLATES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'templates', 'emails')
+TEMPLATE_CACHE_DIR = os.getenv('EMAIL_TEMPLATE_CACHE_DIR', os.path.join('data', 'template_cache'))
+
+EMAILS = ('lead_notification', 'auto_reply')
+PARTS = ('subject.txt', 'html', 'txt')
+
+
+def _bytecode_cache():
+    try:
+        os.makedirs(TEMPLATE_CACHE_DIR, exist_ok=True)
+    except OSError as e:
+        logger.warning(f'Caché de bytecode de plantillas deshabilitada: {e}')
+        return None
+    return FileSystemBytecodeCache(TEMPLATE_CACHE_DIR)
+
+
+environment = Environment(
+    loader=FileSystemLoader(TEMPLATES_DIR),
+    autoescape=select_autoescape(enabled_extensions=('html',), default_for_string=False),
+    bytecode_cache=_bytecode_cache(),
+    auto_reload=False,
+    keep_trailing_newline=False,
+)
+
+# (correo, idioma) -> plantillas compiladas de (asunto, html, texto)
+_compiled: Dict[Tuple[str, str], Tuple[Template, Template, Template]] = {}
+
+
+def _load(name: str, language: str) -> Tuple[Template, Template, Template]:
+    """Variante del idioma o, si no existe, la plantilla común"""
+    return tuple(
+        environment.select_template([f'{language}/{name}.{part}', f'{name}.{part}'])
+        for part in PARTS
+    )
+
+
+def precompile():
+    """Compilar todas las plantillas por adelantado (una vez por proceso)"""
+    for name in EMAILS:
+        for language in LANGUAGES:
+            _compiled[(name, language)] = _load(name, language)
+    logger.info(f'Plantillas de email compiladas: {len(_compiled)}')
+
+
+def render(name: str, language: str = DEFAULT_LANGUAGE, **context) -> Tuple[str, str, str]:
+    """(asunto, html, texto) de un correo en el idioma pedido"""
+    if language not in LANGUAGES:
+        language = DEFAULT_LANGUAGE
+    templates = _compiled.get((name, language))
+    if templates is None:
+        templates = _compiled[(name, language)] = _load(name, language)
+    subject, html, text = (template.render(context) for template in templates)
+    return subject.strip(), html, text
+
+
+def benchmark(iterations: int = 10000) -> Dict[str, float]:
+    """Microsegundos por render de cada correo e idioma, frente a las f-strings anteriores"""
+    context = {
+        'nombre': 'Ana <script>', 'email': 'ana@example.com', 'empresa': 'ACME & Co',
+        'celular': '+507 6000-0000', 'mensaje': 'Hola, quiero automatizar reportes.\n' * 5, 'idioma': 'es',
+    }
+    results = {}
+    started = time.perf_counter()
+    precompile()
+    results['precompile_ms'] = round((time.perf_counter() - started) * 1000, 2)
+    for name, language in sorted(_compiled):
+        started = time.perf_counter()
+        for _ in range(iterations):
+            render(name, language, **context)
+        results[f'{name}[{language}]_us'] = round((time.perf_counter() - started) / iterations * 1e6, 2)
+
+    def fstrings(nombre, email, empresa, celular, mensaje, idioma):
+        # Referencia: cuerpos construidos como antes en send_email() (sin escapar)
+        return (f'<h1>Lead</h1><p>{nombre}</p><p>{email}</p><p>{empresa or "No especificada"}</p>'
+                f'<p>{celular or "No proporcionado"}</p><p>{mensaje}</p>',
+                f'Nombre: {nombre}\nEmail: {email}\nEmpresa: {empresa}\nTeléfono: {celular}\n\nMensaje: {mensaje}')
+
+    started = time.perf_counter()
+    for _ in range(iterations):
+        fstrings(**context)
+    results['fstring_reference_us'] = round((time.perf_counter() - started) / iterations * 1e6, 2)
+    return results
+
+
+if __name__ == '__main__':
+    # Uso: python email_templates.py --benchmark [iteraciones]
+    if len(sys.argv) < 2 or sys.argv[1] != '--benchmark':
+        print('Uso: python email_templates.py --benchmark [iteraciones]')
+        sys.exit(1)
+    for label, value in benchmark(int(sys.argv[2]) if len(sys.argv) > 2 else 10000).items():
+        print(f'{label:<36}{value:>10}')
@@ -0,0 +1,113 @@
+"""
+Configuración de gunicorn para StarkMind Landing
+
+Todos los valores se pueden ajustar por variables de entorno. Modos de worker:
+
+- sync:    un request por proceso; simple, pero un cliente lento bloquea el worker.
+- gthread: procesos con pool de hilos; modo por defecto (estáticos + API con
+           I/O corta, y los envíos de email ya van por la cola en segundo plano).
+- gevent:  greenlets para muchas conexiones lentas/keep-alive; requiere
+           `pip install gevent`.
+
+Recarga elegante: `kill -HUP <pid del master>` (o `./prod.sh reload`) levanta
+workers nuevos y termina los viejos cuando acaban sus requests.
+
+Con preload el master importa la app, construye el índice estático, las
+plantillas, los documentos pre-renderizados e importa el SDK de Brevo; antes
+de cada fork congela el heap (`gc.freeze()`) para que el GC de los workers no
+escriba en esos objetos y sus páginas sigan compartidas copy-on-write.
+`python memory_report.py` muestra el USS/PSS de cada worker.
+"""
+
+import gc
+import multiprocessing
+import os
+
+cpu_count = multiprocessing.cpu_count()
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:5000')
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gthread')
+
+# Workers según el modelo: sync necesita más procesos, gthread/gevent reparten con hilos/greenlets
+_default_workers = {
+    'sync': cpu_count * 2 + 1,
+    'gthread': cpu_count + 1,
+    'gevent': cpu_count,
+}.get(worker_class, cpu_count + 1)
+workers = int(os.getenv('GUNICORN_WORKERS', str(_default_workers)))
+threads = int(os.getenv('GUNICORN_THREADS', '4')) if worker_class == 'gthread' else 1
+worker_connections = int(os.getenv('GUNICORN_WORKER_CONNECTIONS', '1000'))
+
+# Cargar la app en el master antes del fork: arranque más rápido y memoria compartida
+preload_app = os.getenv('GUNICORN_PRELOAD', 'True').lower() == 'true'
+
+# Heap del master congelado antes de cada fork (solo con preload)
+gc_freeze = preload_app and os.getenv('GUNICORN_GC_FREEZE', 'True').lower() == 'true'
+if gc_freeze:
+    # Sin colecciones mientras se carga la app: no dejan huecos en páginas que luego se comparten
+    gc.disable()
+
+# Reciclar workers periódicamente para acotar fugas de memoria
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', '1000'))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', '100'))
+
+# Respuestas con wsgi.file_wrapper (videos de /img) se envían con os.sendfile
+sendfile = True
+
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '30'))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', '30'))
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', '5'))
+
+# El access log lo escribe la app en JSON (logs/access.jsonl); '-' reactiva el de gunicorn
+accesslog = os.getenv('GUNICORN_ACCESS_LOG') or None
+errorlog = os.getenv('GUNICORN_ERROR_LOG', '-')
+loglevel = os.getenv('GUNICORN_LOG_LEVEL', 'info')
+
+
+def on_starting(server):
+    """Descartar las métricas de la ejecución anterior antes de crear workers"""
+    from metrics import reset_directory
+    reset_directory()
+
+
+def when_ready(server):
+    """Con preload: hacer en el master lo que cada worker haría en sus primeras peticiones"""
+    if not preload_app:
+        return
+    from app import early_hints, email_provider, prerender_cache
+    from prerender import PRERENDER_ENABLED
+    if PRERENDER_ENABLED:
+        prerender_cache.build()
+    early_hints.header()
+    email_provider.preload()
+    if gc_freeze:
+        # Descartar la basura de la carga antes de congelar el resto
+        gc.collect()
+
+
+def pre_fork(server, worker):
+    """Congelar los objetos del master: el GC de los workers los ignora y no copia sus páginas"""
+    if gc_freeze:
+        gc.freeze()
+        # Desactivado solo durante la carga; el worker hereda el GC activo
+        gc.enable()
+
+
+def post_worker_init(worker):
+    """Preparar cada worker tras el fork: handler SIGHUP del índice estático (gunicorn lo restablece) e hilo de logging"""
+    from app import log_pipeline, static_index
+    static_index.install_signal_handler()
+    # El hilo de logging del master no existe en el worker
+    log_pipeline.start()
+
+
+def worker_exit(server, worker):
+    """Volcar las últimas métricas antes de que el worker termine"""
+    import metrics
+    metrics.registry.close()
+
+
+def child_exit(server, worker):
+    """En el master: sumar las métricas del worker terminado al acumulado y borrar su instantánea"""
+    from metrics import retire_snapshot
+    retire_snapshot(worker.pid)
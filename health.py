@@ -0,0 +1,139 @@
+"""
+Health checks de StarkMind Landing
+
+- Liveness: respuesta constante, sin I/O.
+- Readiness: resultado cacheado que un hilo en segundo plano refresca cada
+  HEALTH_REFRESH_INTERVAL segundos. Cubre la integridad del build de React y
+  la alcanzabilidad del proveedor de email, de modo que el coste por sondeo
+  es el mismo sin importar con qué frecuencia se consulte.
+"""
+
+import logging
+import os
+import socket
+import threading
+import time
+from typing import Callable, Dict, Optional
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+REFRESH_INTERVAL = float(os.getenv('HEALTH_REFRESH_INTERVAL', '15'))
+PROVIDER_URL = os.getenv('BREVO_API_HOST', 'https://api.brevo.com/v3')
+PROVIDER_TIMEOUT = float(os.getenv('HEALTH_PROVIDER_TIMEOUT', '3'))
+# Diagnóstico de red completo (SMTP y API en paralelo) en el readiness probe
+EMAIL_DIAGNOSTICS = os.getenv('HEALTH_EMAIL_DIAGNOSTICS', 'False').lower() == 'true'
+
+Check = Callable[[], dict]
+
+
+def check_static(static_index) -> dict:
+    """Integridad del build: index.html, CSS/JS y entrypoints de asset-manifest.json presentes en disco"""
+    files = static_index.files
+    entrypoints = static_index.manifest.get('entrypoints', [])
+    checks = {
+        'index_html': 'index.html' in files,
+        'static_css': any(name.startswith('static/css/') and name.endswith('.css') for name in files),
+        'static_js': any(name.startswith('static/js/') and name.endswith('.js') for name in files),
+        'entrypoints': all(os.path.exists(files[name].path) for name in entrypoints if name in files)
+                       and all(name in files for name in entrypoints),
+    }
+    return {'ok': all(checks.values()), 'critical': True, 'details': checks}
+
+
+def check_email_provider(url: str = PROVIDER_URL, timeout: float = PROVIDER_TIMEOUT) -> dict:
+    """Alcanzabilidad TCP de la API del proveedor de email"""
+    parsed = urlparse(url)
+    host = parsed.hostname or url
+    port = parsed.port or (443 if parsed.scheme != 'http' else 80)
+    started = time.perf_counter()
+    try:
+        with socket.create_connection((host, port), timeout=timeout):
+            pass
+    except OSError as e:
+        return {'ok': False, 'critical': False, 'details': {'host': host, 'error': str(e)}}
+    latency_ms = (time.perf_counter() - started) * 1000
+    return {'ok': True, 'critical': False, 'details': {'host': host, 'connect_ms': round(latency_ms, 1)}}
+
+
+def check_email_network(timeout: float = PROVIDER_TIMEOUT) -> dict:
+    """Sondas concurrentes de diagnose_email.py: hay al menos una vía de envío disponible"""
+    import diagnose_email
+
+    report = diagnose_email.run(timeout=timeout)
+    details = {
+        probe['name']: {key: probe[key] for key in ('ok', 'connect_ms', 'tls_ms', 'first_byte_ms', 'error') if key in probe}
+        for probe in report['probes']
+    }
+    details['elapsed_ms'] = report['elapsed_ms']
+    return {'ok': report['ok'], 'critical': False, 'details': details}
+
+
+class ReadinessProbe:
+    """Ejecuta los checks en segundo plano y sirve el último resultado"""
+
+    def __init__(self, checks: Dict[str, Check], interval: float = REFRESH_INTERVAL):
+        self.checks = checks
+        self.interval = interval
+        self._result: Optional[dict] = None
+        self._refresh_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        self._start_lock = threading.Lock()
+
+    def refresh(self) -> dict:
+        """Ejecutar todos los checks y publicar el resultado"""
+        with self._refresh_lock:
+            started = time.perf_counter()
+            results = {}
+            for name, check in self.checks.items():
+                try:
+                    results[name] = check()
+                except Exception as e:
+                    results[name] = {'ok': False, 'critical': True, 'details': {'error': str(e)}}
+            if all(r['ok'] for r in results.values()):
+                status = 'ready'
+            elif all(r['ok'] for r in results.values() if r['critical']):
+                status = 'degraded'
+            else:
+                status = 'not_ready'
+            self._result = {
+                'status': status,
+                'checks': results,
+                'checked_at': time.time(),
+                'check_duration_ms': round((time.perf_counter() - started) * 1000, 1),
+            }
+            return self._result
+
+    def result(self) -> dict:
+        """Último resultado cacheado (el primer acceso lo calcula si aún no existe)"""
+        return self._result or self.refresh()
+
+    def start(self):
+        """Arrancar el refresco periódico en este proceso; idempotente y seguro tras fork"""
+        if self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            self._stop = threading.Event()
+            self._thread = threading.Thread(target=self._loop, name='readiness-probe', daemon=True)
+            self._thread.start()
+            self._pid = os.getpid()
+
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self._thread = None
+        self._pid = None
+
+    def _loop(self):
+        while True:
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.error(f'Error refrescando el readiness check: {e}')
+            if self._stop.wait(self.interval):
+                return
@@ -0,0 +1,191 @@
+"""
+Envíos idempotentes del formulario de contacto para StarkMind
+
+Un doble clic en "Enviar" o el reintento de un móvil con mala conexión
+repiten el mismo POST. Cada envío tiene una clave de idempotencia:
+
+- la cabecera `Idempotency-Key` si el cliente la manda (ContactSection.tsx
+  genera una por contenido del formulario), válida IDEMPOTENCY_TTL segundos;
+- si no, un hash del email y el mensaje, válido IDEMPOTENCY_CONTENT_TTL
+  segundos (ventana fija desde el primer envío).
+
+La primera petición reserva la clave y guarda su respuesta; los duplicados
+reciben esa misma respuesta sin encolar correos ni tocar el proveedor. La
+reserva caduca a los IDEMPOTENCY_LEASE_SECONDS: si el worker que la tenía
+muere o agota el timeout, el siguiente reintento la toma. La
+tabla vive en SQLite (WAL), compartida por los workers del nodo, y se
+recorta a IDEMPOTENCY_MAX_ENTRIES filas.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_ENABLED = os.getenv('IDEMPOTENCY_ENABLED', 'True').lower() == 'true'
+IDEMPOTENCY_PATH = os.getenv('IDEMPOTENCY_PATH', os.path.join('data', 'idempotency.db'))
+# Vigencia de las claves enviadas por el cliente y de las derivadas del contenido
+IDEMPOTENCY_TTL = float(os.getenv('IDEMPOTENCY_TTL', '86400'))
+IDEMPOTENCY_CONTENT_TTL = float(os.getenv('IDEMPOTENCY_CONTENT_TTL', '600'))
+IDEMPOTENCY_MAX_ENTRIES = int(os.getenv('IDEMPOTENCY_MAX_ENTRIES', '10000'))
+# Cuánto espera un duplicado a que termine la petición original antes de responder 409
+IDEMPOTENCY_WAIT_SECONDS = float(os.getenv('IDEMPOTENCY_WAIT_SECONDS', '2'))
+# Vigencia de una reserva sin respuesta: pasado este tiempo otra petición puede tomarla
+IDEMPOTENCY_LEASE_SECONDS = float(os.getenv('IDEMPOTENCY_LEASE_SECONDS', '10'))
+# Longitud máxima aceptada para la cabecera Idempotency-Key
+MAX_KEY_LENGTH = 128
+# Cada cuántas reservas se borran las claves vencidas y las que sobran
+PRUNE_EVERY = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS idempotency_keys (
+    key TEXT PRIMARY KEY,
+    status INTEGER,
+    body TEXT,
+    created_at REAL NOT NULL,
+    expires_at REAL NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_idempotency_expires ON idempotency_keys (expires_at);
+"""
+
+NEW = 'new'
+REPLAYED = 'replayed'
+IN_PROGRESS = 'in_progress'
+
+
+def _digest(*parts: str) -> str:
+    return hashlib.blake2b('\x1f'.join(parts).encode('utf-8'), digest_size=16).hexdigest()
+
+
+def request_key(header: Optional[str], email: str, message: str) -> Tuple[str, float]:
+    """Clave (sin datos en claro) y su vigencia en segundos"""
+    email = email.strip().lower()
+    if header and len(header) <= MAX_KEY_LENGTH:
+        # Ligada al email para que una clave adivinada no devuelva la respuesta de otro
+        return f'client:{_digest(header.strip(), email)}', IDEMPOTENCY_TTL
+    return f'content:{_digest(email, " ".join(message.split()))}', IDEMPOTENCY_CONTENT_TTL
+
+
+class IdempotencyStore:
+    """Claves reservadas y respuestas guardadas en SQLite, compartidas entre workers"""
+
+    def __init__(self, path: str = IDEMPOTENCY_PATH, max_entries: int = IDEMPOTENCY_MAX_ENTRIES,
+                 lease: float = IDEMPOTENCY_LEASE_SECONDS, enabled: bool = IDEMPOTENCY_ENABLED):
+        self.path = path
+        self.max_entries = max_entries
+        self.lease = lease
+        self.enabled = enabled
+        self._local = threading.local()
+        self._calls = 0
+        self.stats = {NEW: 0, REPLAYED: 0, IN_PROGRESS: 0}
+        if enabled:
+            self._connect().executescript(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        """Conexión SQLite por hilo y por proceso (no se comparte tras un fork)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute('PRAGMA busy_timeout=5000')
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+    def _reserve(self, key: str, ttl: float, now: float) -> Optional[Tuple[Optional[int], Optional[str]]]:
+        """Reservar la clave; None si es nueva (o su reserva caducó) o (estado, cuerpo) de la fila existente"""
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute(
+                'SELECT status, body, created_at, expires_at FROM idempotency_keys WHERE key = ?', (key,)
+            ).fetchone()
+            # Una reserva sin respuesta (status NULL) solo bloquea mientras dura su lease
+            if row is not None and row[3] > now and (row[0] is not None or row[2] + self.lease > now):
+                conn.execute('COMMIT')
+                return row[0], row[1]
+            conn.execute(
+                'INSERT OR REPLACE INTO idempotency_keys (key, status, body, created_at, expires_at) '
+                'VALUES (?, NULL, NULL, ?, ?)',
+                (key, now, now + ttl)
+            )
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return None
+
+    def begin(self, key: str, ttl: float) -> Tuple[str, Optional[Tuple[int, dict]]]:
+        """(NEW, None) si hay que procesar la petición, (REPLAYED, (estado, cuerpo)) o (IN_PROGRESS, None)"""
+        if not self.enabled:
+            return NEW, None
+        deadline = time.monotonic() + IDEMPOTENCY_WAIT_SECONDS
+        try:
+            while True:
+                existing = self._reserve(key, ttl, time.time())
+                if existing is None:
+                    self._count(NEW)
+                    return NEW, None
+                status, body = existing
+                if status is not None:
+                    self._count(REPLAYED)
+                    return REPLAYED, (status, json.loads(body))
+                # La petición original sigue en curso (doble clic): esperar su respuesta
+                if time.monotonic() >= deadline:
+                    self._count(IN_PROGRESS)
+                    return IN_PROGRESS, None
+                time.sleep(0.05)
+        except sqlite3.Error as e:
+            # Sin almacén se procesa igual: a lo sumo se duplica un correo
+            logger.warning(f'Almacén de idempotencia no disponible ({key}): {e}')
+            return NEW, None
+
+    def complete(self, key: str, status: int, body: dict):
+        """Guardar la respuesta de la petición original para los duplicados"""
+        if not self.enabled:
+            return
+        try:
+            self._connect().execute(
+                'UPDATE idempotency_keys SET status = ?, body = ? WHERE key = ?',
+                (status, json.dumps(body, ensure_ascii=False), key)
+            )
+        except sqlite3.Error as e:
+            logger.warning(f'No se pudo guardar la respuesta idempotente ({key}): {e}')
+
+    def release(self, key: str):
+        """Liberar la clave si la petición falló, para que el reintento se procese"""
+        if not self.enabled:
+            return
+        try:
+            self._connect().execute('DELETE FROM idempotency_keys WHERE key = ? AND status IS NULL', (key,))
+        except sqlite3.Error as e:
+            logger.warning(f'No se pudo liberar la clave de idempotencia ({key}): {e}')
+
+    def _count(self, result: str):
+        self.stats[result] += 1
+        self._calls += 1
+        if self._calls % PRUNE_EVERY == 0:
+            self.prune()
+
+    def prune(self, now: Optional[float] = None) -> int:
+        """Borrar claves vencidas y, si sobran, las más antiguas"""
+        now = time.time() if now is None else now
+        conn = self._connect()
+        removed = conn.execute('DELETE FROM idempotency_keys WHERE expires_at <= ?', (now,)).rowcount
+        removed += conn.execute(
+            'DELETE FROM idempotency_keys WHERE key IN ('
+            'SELECT key FROM idempotency_keys ORDER BY created_at DESC LIMIT -1 OFFSET ?)',
+            (self.max_entries,)
+        ).rowcount
+        return removed
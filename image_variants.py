@@ -0,0 +1,294 @@
+"""
+Derivados responsivos de las imágenes de /img para StarkMind
+
+Las capturas del portfolio (public/img/Portfolio) pesan varios MB en PNG a
+tamaño completo. Este módulo genera variantes WebP/AVIF (o el formato
+original redimensionado) en anchos estándar, la primera vez que se piden o
+en el build (`python image_variants.py --pregenerate static/img`).
+
+Las variantes se guardan en una caché en disco direccionada por contenido
+(hash del ETag del original + ancho + formato), compartida por todos los
+workers, con expulsión LRU cuando supera IMAGE_CACHE_MAX_BYTES. Requiere
+Pillow; sin él las imágenes se sirven tal cual.
+"""
+
+import functools
+import hashlib
+import importlib.util
+import io
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+from typing import List, Optional, Tuple
+
+from static_assets import Asset
+
+logger = logging.getLogger(__name__)
+
+IMAGE_CACHE_DIR = os.getenv('IMAGE_CACHE_DIR', os.path.join('data', 'image_cache'))
+IMAGE_CACHE_MAX_BYTES = int(os.getenv('IMAGE_CACHE_MAX_BYTES', str(256 * 1024 * 1024)))
+IMAGE_WIDTHS = tuple(int(w) for w in os.getenv('IMAGE_WIDTHS', '320,640,960,1280,1920').split(','))
+IMAGE_QUALITY = int(os.getenv('IMAGE_QUALITY', '80'))
+# Solo se actualiza el mtime (marca LRU) de una variante si lleva más de esto sin tocarse
+LRU_TOUCH_INTERVAL = 3600
+# Cada proceso lleva la cuenta de los bytes que escribe; cada tanto recorre el directorio
+# para sumar lo que escribieron los demás workers
+USAGE_RESYNC_INTERVAL = 60
+# Variantes cuyo render falló (original corrupto o formato no soportado); no se reintentan en
+# este proceso. La clave incluye el ETag del original, así que al reemplazarlo se vuelve a probar
+MAX_FAILED_KEYS = 1024
+
+# Opcional: sin Pillow no hay derivados. Se importa al usarlo (~30 ms menos al arrancar)
+PILLOW_INSTALLED = importlib.util.find_spec('PIL') is not None
+
+RESIZABLE_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+FORMATS = {
+    'avif': ('AVIF', 'image/avif'),
+    'webp': ('WEBP', 'image/webp'),
+    'png': ('PNG', 'image/png'),
+    'jpeg': ('JPEG', 'image/jpeg'),
+}
+
+
+def is_available() -> bool:
+    return PILLOW_INSTALLED
+
+
+@functools.lru_cache(maxsize=None)
+def _image_module():
+    from PIL import Image
+    Image.init()
+    return Image
+
+
+@functools.lru_cache(maxsize=None)
+def _supports(fmt: str) -> bool:
+    """Pillow puede escribir el formato (AVIF requiere Pillow >= 11.2 o pillow-avif-plugin)"""
+    if not PILLOW_INSTALLED:
+        return False
+    return FORMATS[fmt][0] in _image_module().SAVE
+
+
+def is_resizable(filename: str) -> bool:
+    return filename.lower().endswith(RESIZABLE_EXTENSIONS)
+
+
+def snap_width(requested: Optional[int]) -> Optional[int]:
+    """Ajustar el ancho pedido al estándar inmediatamente superior (acota la caché)"""
+    if not requested or requested <= 0:
+        return None
+    for width in IMAGE_WIDTHS:
+        if width >= requested:
+            return width
+    return IMAGE_WIDTHS[-1]
+
+
+def choose_format(filename: str, accept_mimetypes) -> str:
+    """Mejor formato aceptado por el cliente: AVIF, WebP o el original"""
+    # Solo si el cliente lo anuncia explícitamente (un */* no garantiza soporte)
+    explicit = {value for value, quality in accept_mimetypes if quality > 0}
+    for fmt in ('avif', 'webp'):
+        if FORMATS[fmt][1] in explicit and _supports(fmt):
+            return fmt
+    return 'png' if filename.lower().endswith('.png') else 'jpeg'
+
+
+class ImageVariantCache:
+    """Caché de derivados en disco, direccionada por contenido y acotada en bytes"""
+
+    def __init__(self, directory: str = IMAGE_CACHE_DIR, max_bytes: int = IMAGE_CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+        self._failed = set()
+        self._stats_lock = threading.Lock()
+        # Bytes en uso estimados y cuándo se recorrió el directorio por última vez
+        self._bytes: Optional[int] = None
+        self._synced_at = 0.0
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, key: str, fmt: str) -> str:
+        return os.path.join(self.directory, key[:2], f'{key}.{fmt}')
+
+    def _lock(self, key: str) -> threading.Lock:
+        with self._locks_guard:
+            return self._locks.setdefault(key, threading.Lock())
+
+    @staticmethod
+    def key(asset: Asset, width: Optional[int], fmt: str) -> str:
+        return hashlib.blake2b(f'{asset.etag}:{width or 0}:{fmt}'.encode(), digest_size=16).hexdigest()
+
+    def get(self, asset: Asset, width: Optional[int], fmt: str) -> Optional[Asset]:
+        """Variante como Asset (generándola si hace falta); None si no aporta o falla"""
+        key = self.key(asset, width, fmt)
+        path = self._path(key, fmt)
+        variant = self._stat_variant(path, key, fmt)
+        if variant is not None:
+            self._count('hits')
+            return variant
+        if key in self._failed:
+            return None
+        try:
+            with self._lock(key):
+                variant = self._stat_variant(path, key, fmt)
+                if variant is not None:
+                    self._count('hits')
+                    return variant
+                if key in self._failed:
+                    return None
+                self._count('misses')
+                try:
+                    data = self._render(asset.path, width, fmt)
+                except Exception as e:
+                    logger.warning(f'No se pudo generar la variante {fmt}/{width} de {asset.path}: {e}')
+                    self._mark_failed(key)
+                    return None
+                self._write(path, data)
+        finally:
+            with self._locks_guard:
+                self._locks.pop(key, None)
+        self._added(len(data))
+        return self._stat_variant(path, key, fmt)
+
+    def _mark_failed(self, key: str):
+        with self._locks_guard:
+            if len(self._failed) >= MAX_FAILED_KEYS:
+                self._failed.clear()
+            self._failed.add(key)
+
+    def _count(self, counter: str):
+        with self._stats_lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def _added(self, size: int):
+        """Sumar una variante nueva al total y expulsar solo si se pasa del presupuesto"""
+        with self._stats_lock:
+            stale = self._bytes is None or time.monotonic() - self._synced_at > USAGE_RESYNC_INTERVAL
+            if not stale:
+                self._bytes += size
+                if self._bytes <= self.max_bytes:
+                    return
+        # Primer uso, cuenta vencida o presupuesto superado: recorrer el directorio
+        self.evict()
+
+    def _stat_variant(self, path: str, key: str, fmt: str) -> Optional[Asset]:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        if time.time() - stat.st_mtime > LRU_TOUCH_INTERVAL:
+            try:
+                os.utime(path)
+            except OSError:
+                pass
+        return Asset(path, stat.st_size, stat.st_mtime, FORMATS[fmt][1], key)
+
+    @staticmethod
+    def _render(source: str, width: Optional[int], fmt: str) -> bytes:
+        Image = _image_module()
+        with Image.open(source) as image:
+            image.load()
+            if width and image.width > width:
+                height = round(image.height * width / image.width)
+                image = image.resize((width, height), Image.LANCZOS)
+            if fmt == 'jpeg' and image.mode not in ('RGB', 'L'):
+                image = image.convert('RGB')
+            output = io.BytesIO()
+            pil_format = FORMATS[fmt][0]
+            if pil_format in ('WEBP', 'AVIF', 'JPEG'):
+                image.save(output, pil_format, quality=IMAGE_QUALITY)
+            else:
+                image.save(output, pil_format, optimize=True)
+            return output.getvalue()
+
+    @staticmethod
+    def _write(path: str, data: bytes):
+        """Escritura atómica: otros workers nunca ven un archivo a medias"""
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.variant-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+    def usage(self) -> Tuple[int, List[Tuple[float, int, str]]]:
+        """Bytes totales y entradas (mtime, tamaño, ruta) de la caché"""
+        entries = []
+        total = 0
+        for directory, _, filenames in os.walk(self.directory):
+            for filename in filenames:
+                if filename.startswith('.variant-'):
+                    continue
+                path = os.path.join(directory, filename)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+                total += stat.st_size
+        return total, entries
+
+    def _synced(self, total: int):
+        with self._stats_lock:
+            self._bytes = total
+            self._synced_at = time.monotonic()
+
+    def evict(self) -> int:
+        """Borrar las variantes menos usadas hasta quedar por debajo del 90% del presupuesto"""
+        total, entries = self.usage()
+        if total <= self.max_bytes:
+            self._synced(total)
+            return 0
+        target = self.max_bytes * 0.9
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total <= target:
+                break
+            try:
+                os.unlink(path)
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+        self._synced(total)
+        logger.info(f'Caché de imágenes: {removed} variantes expulsadas ({total} bytes en uso)')
+        return removed
+
+
+def pregenerate(static_index, prefix: str = 'img/') -> int:
+    """Generar en el build todas las variantes estándar de las imágenes bajo `prefix`"""
+    cache = ImageVariantCache()
+    formats = [fmt for fmt in ('avif', 'webp') if _supports(fmt)]
+    generated = 0
+    for relative, asset in static_index.files.items():
+        if not relative.startswith(prefix) or not is_resizable(relative):
+            continue
+        for fmt in formats:
+            for width in (None,) + IMAGE_WIDTHS:
+                if cache.get(asset, width, fmt) is not None:
+                    generated += 1
+    return generated
+
+
+if __name__ == '__main__':
+    # Uso: python image_variants.py --pregenerate [directorio_build]
+    if len(sys.argv) < 2 or sys.argv[1] != '--pregenerate':
+        print('Uso: python image_variants.py --pregenerate [directorio_build]')
+        sys.exit(1)
+    logging.basicConfig(level=logging.INFO)
+    if not is_available():
+        print('⚠️  Pillow no está instalado: no se generan variantes')
+        sys.exit(0)
+    from static_assets import STATIC_ROOT, StaticIndex
+    index = StaticIndex(sys.argv[2] if len(sys.argv) > 2 else STATIC_ROOT)
+    print(f'✅ {pregenerate(index)} variantes disponibles en {IMAGE_CACHE_DIR}')
@@ -0,0 +1,157 @@
+"""
+Digest de notificaciones internas de leads para StarkMind
+
+Las notificaciones "LEAD PRIORITARIO" se encolan como trabajos de tipo
+`lead` y un hilo en segundo plano las agrupa en un único email cuando se
+alcanza el tamaño máximo del lote o cuando el lead más antiguo supera la
+ventana de espera. Las respuestas automáticas al visitante siguen
+enviándose de forma individual por la cola normal.
+"""
+
+import html
+import logging
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from email_queue import EmailQueue
+
+logger = logging.getLogger(__name__)
+
+LEAD_KIND = 'lead'
+DIGEST_WINDOW = float(os.getenv('LEAD_DIGEST_WINDOW', '60'))
+DIGEST_MAX_BATCH = int(os.getenv('LEAD_DIGEST_MAX_BATCH', '25'))
+
+
+def build_digest(payloads: List[dict]) -> Tuple[str, str, str]:
+    """Combinar varias notificaciones en un solo (asunto, html, texto)"""
+    if len(payloads) == 1:
+        payload = payloads[0]
+        return payload['subject'], payload['html'], payload['text']
+
+    subject = f'🎯 {len(payloads)} LEADS PRIORITARIOS - StarkMind'
+    html_parts = [f'<h1>🎯 {len(payloads)} Leads Prioritarios - StarkMind</h1>']
+    text_parts = [f'{len(payloads)} LEADS PRIORITARIOS - STARKMIND']
+    for index, payload in enumerate(payloads, start=1):
+        html_parts.append(f'<hr><h2>#{index} - {html.escape(payload["subject"])}</h2>{payload["html"]}')
+        text_parts.append(f'{"=" * 40}\n#{index} - {payload["subject"]}\n{payload["text"]}')
+    return subject, '\n'.join(html_parts), '\n'.join(text_parts)
+
+
+class LeadDigest:
+    """Agrupa notificaciones de leads de la cola y las envía como digest"""
+
+    def __init__(self, queue: EmailQueue, send: Callable[..., dict],
+                 window: float = DIGEST_WINDOW, max_batch: int = DIGEST_MAX_BATCH,
+                 on_flush: Optional[Callable[[int, float], None]] = None):
+        self.queue = queue
+        self.send = send
+        # Recibe (tamaño del lote, latencia) de cada digest enviado; app.py lo lleva a /metrics
+        self.on_flush = on_flush
+        self.window = window
+        self.max_batch = max_batch
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            'flushes': 0,
+            'leads_sent': 0,
+            'last_batch_size': 0,
+            'last_flush_latency': 0.0,
+            'max_flush_latency': 0.0,
+            'total_flush_latency': 0.0,
+        }
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        self._start_lock = threading.Lock()
+
+    def enqueue(self, sender: str, recipients: List[str], subject: str, html: str, text: str) -> int:
+        """Encolar una notificación interna para el próximo digest"""
+        return self.queue.enqueue({
+            'sender': sender,
+            'recipients': recipients,
+            'subject': subject,
+            'html': html,
+            'text': text,
+            'queued_at': time.time()
+        }, kind=LEAD_KIND)
+
+    def due(self) -> bool:
+        """Hay un lote listo por tamaño o por ventana de tiempo"""
+        count, oldest = self.queue.pending(LEAD_KIND)
+        if count == 0:
+            return False
+        return count >= self.max_batch or time.time() - oldest >= self.window
+
+    def flush(self) -> int:
+        """Enviar un digest con hasta `max_batch` leads; devuelve cuántos incluyó"""
+        jobs = self.queue.claim(LEAD_KIND, limit=self.max_batch)
+        if not jobs:
+            return 0
+        job_ids = [job_id for job_id, _, _ in jobs]
+        payloads = [payload for _, payload, _ in jobs]
+        attempts = max(job_attempts for _, _, job_attempts in jobs)
+        subject, html, text = build_digest(payloads)
+        # Todas las notificaciones de un lote comparten remitente y destinatario interno
+        recipients = sorted({email for payload in payloads for email in payload['recipients']})
+        try:
+            self.send(sender=payloads[0]['sender'], recipients=recipients, subject=subject, html=html, text=text)
+        except Exception as e:
+            self.queue.fail(job_ids, attempts, str(e), permanent=getattr(e, 'permanent', False))
+            return 0
+        self.queue.complete(job_ids)
+        latency = time.time() - min(payload.get('queued_at', time.time()) for payload in payloads)
+        self._record(len(jobs), latency)
+        logger.info(f'Digest de leads enviado: {len(jobs)} leads, latencia {latency:.1f}s')
+        return len(jobs)
+
+    def _record(self, batch_size: int, latency: float):
+        with self._stats_lock:
+            self._stats['flushes'] += 1
+            self._stats['leads_sent'] += batch_size
+            self._stats['last_batch_size'] = batch_size
+            self._stats['last_flush_latency'] = latency
+            self._stats['max_flush_latency'] = max(self._stats['max_flush_latency'], latency)
+            self._stats['total_flush_latency'] += latency
+        if self.on_flush is not None:
+            self.on_flush(batch_size, latency)
+
+    def stats(self) -> Dict[str, float]:
+        """Métricas del proceso: tamaño de lote, latencia de flush y llamadas ahorradas"""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        flushes = stats['flushes']
+        stats['avg_batch_size'] = stats['leads_sent'] / flushes if flushes else 0.0
+        stats['avg_flush_latency'] = stats.pop('total_flush_latency') / flushes if flushes else 0.0
+        stats['api_calls_saved'] = stats['leads_sent'] - flushes
+        return stats
+
+    # -- Hilo de flush ----------------------------------------------------
+
+    def start(self):
+        """Arrancar el hilo de flush en este proceso; idempotente y seguro tras fork"""
+        if self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            self._stop = threading.Event()
+            self._thread = threading.Thread(target=self._loop, name='lead-digest', daemon=True)
+            self._thread.start()
+            self._pid = os.getpid()
+
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self._thread = None
+        self._pid = None
+
+    def _loop(self):
+        interval = max(0.5, min(5.0, self.window / 4))
+        while not self._stop.wait(interval):
+            try:
+                while self.due() and self.flush():
+                    pass
+            except Exception as e:
+                logger.error(f'Error procesando el digest de leads: {e}')
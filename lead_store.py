@@ -0,0 +1,223 @@
+"""
+Almacén de leads de StarkMind
+
+Cada envío válido del formulario se guarda en SQLite (modo WAL), con índices
+por email, empresa y fecha de recepción, para que ventas pueda buscar y
+exportar leads sin depender del buzón ni de que Brevo entregue los correos.
+
+`add()` inserta el lead en la propia petición, antes de responder 202: un
+worker que muere justo después (crash, SIGKILL, OOM) no pierde nada. Con WAL
+y `synchronous=NORMAL` el commit es un append al WAL sin fsync, así que no
+serializa las peticiones de forma apreciable. Lo que se agrupa es la
+notificación interna (lead_digest.py), que ya vive en la cola persistente.
+
+Las consultas paginan por cursor (received_at, id) y la exportación recorre
+la tabla en bloques, así la memoria es constante aunque haya cientos de miles
+de filas.
+"""
+
+import csv
+import io
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+LEAD_STORE_ENABLED = os.getenv('LEAD_STORE_ENABLED', 'True').lower() == 'true'
+LEAD_STORE_PATH = os.getenv('LEAD_STORE_PATH', os.path.join('data', 'leads.db'))
+# /api/leads y /api/leads/export exigen `Authorization: Bearer <token>`; vacío = deshabilitados
+LEADS_API_TOKEN = os.getenv('LEADS_API_TOKEN', '')
+# Tamaño máximo de página de la API y de cada bloque de la exportación
+MAX_PAGE_SIZE = 500
+EXPORT_CHUNK_SIZE = 1000
+
+FIELDS = ('id', 'received_at', 'nombre', 'email', 'empresa', 'celular', 'mensaje', 'idioma', 'request_id')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS leads (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    received_at REAL NOT NULL,
+    nombre TEXT NOT NULL,
+    email TEXT NOT NULL COLLATE NOCASE,
+    empresa TEXT NOT NULL DEFAULT '' COLLATE NOCASE,
+    celular TEXT NOT NULL DEFAULT '',
+    mensaje TEXT NOT NULL,
+    idioma TEXT,
+    request_id TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_leads_email ON leads (email, received_at);
+CREATE INDEX IF NOT EXISTS idx_leads_empresa ON leads (empresa, received_at);
+CREATE INDEX IF NOT EXISTS idx_leads_received ON leads (received_at, id);
+"""
+
+INSERT = ('INSERT INTO leads (received_at, nombre, email, empresa, celular, mensaje, idioma, request_id) '
+          'VALUES (:received_at, :nombre, :email, :empresa, :celular, :mensaje, :idioma, :request_id)')
+
+Cursor = Tuple[float, int]
+
+
+def encode_cursor(cursor: Optional[Cursor]) -> Optional[str]:
+    return f'{cursor[0]!r}:{cursor[1]}' if cursor else None
+
+
+def decode_cursor(value: Optional[str]) -> Optional[Cursor]:
+    """Cursor `received_at:id` de la página anterior (ValueError si está mal formado)"""
+    if not value:
+        return None
+    received_at, _, lead_id = value.partition(':')
+    return float(received_at), int(lead_id)
+
+
+class LeadStore:
+    """Leads en SQLite, escritos de forma durable en la petición que los recibe"""
+
+    def __init__(self, path: str = LEAD_STORE_PATH, enabled: bool = LEAD_STORE_ENABLED):
+        self.path = path
+        self.enabled = enabled
+        self._local = threading.local()
+        self._stats_lock = threading.Lock()
+        self.stats = {'stored': 0, 'errors': 0}
+        if enabled:
+            self._connect().executescript(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        """Conexión SQLite por hilo y por proceso (no se comparte tras un fork)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute('PRAGMA busy_timeout=30000')
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+    # -- Escritura --------------------------------------------------------
+
+    def add(self, nombre: str, email: str, mensaje: str, empresa: str = '', celular: str = '',
+            idioma: Optional[str] = None, request_id: Optional[str] = None) -> Optional[int]:
+        """Guardar un lead (commit en el WAL); devuelve su id o None si está deshabilitado o falla"""
+        if not self.enabled:
+            return None
+        lead = {
+            'received_at': time.time(), 'nombre': nombre, 'email': email, 'empresa': empresa,
+            'celular': celular, 'mensaje': mensaje, 'idioma': idioma, 'request_id': request_id,
+        }
+        try:
+            lead_id = self._connect().execute(INSERT, lead).lastrowid
+        except sqlite3.Error as e:
+            self._count('errors')
+            logger.error(f'Error guardando el lead {request_id}: {e}')
+            return None
+        self._count('stored')
+        return lead_id
+
+    def _count(self, event: str):
+        with self._stats_lock:
+            self.stats[event] += 1
+
+    # -- Consultas --------------------------------------------------------
+
+    @staticmethod
+    def _filters(email: Optional[str] = None, empresa: Optional[str] = None, since: Optional[float] = None,
+                 until: Optional[float] = None, before: Optional[Cursor] = None) -> Tuple[str, list]:
+        clauses, params = [], []
+        if email:
+            clauses.append('email = ?')
+            params.append(email.strip())
+        if empresa:
+            clauses.append('empresa = ?')
+            params.append(empresa.strip())
+        if since is not None:
+            clauses.append('received_at >= ?')
+            params.append(since)
+        if until is not None:
+            clauses.append('received_at < ?')
+            params.append(until)
+        if before is not None:
+            clauses.append('(received_at, id) < (?, ?)')
+            params.extend(before)
+        return (' WHERE ' + ' AND '.join(clauses)) if clauses else '', params
+
+    def query(self, email: Optional[str] = None, empresa: Optional[str] = None, since: Optional[float] = None,
+              until: Optional[float] = None, before: Optional[Cursor] = None,
+              limit: int = 50) -> Tuple[List[dict], Optional[Cursor]]:
+        """Una página de leads, del más reciente al más antiguo, y el cursor de la siguiente"""
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        where, params = self._filters(email, empresa, since, until, before)
+        rows = self._connect().execute(
+            f'SELECT {", ".join(FIELDS)} FROM leads{where} ORDER BY received_at DESC, id DESC LIMIT ?',
+            params + [limit + 1]
+        ).fetchall()
+        leads = [dict(zip(FIELDS, row)) for row in rows[:limit]]
+        next_cursor = (leads[-1]['received_at'], leads[-1]['id']) if len(rows) > limit else None
+        return leads, next_cursor
+
+    def iter_leads(self, chunk_size: int = EXPORT_CHUNK_SIZE, **filters) -> Iterator[dict]:
+        """Todos los leads que cumplen los filtros, leídos por bloques con cursor"""
+        before = None
+        while True:
+            where, params = self._filters(before=before, **filters)
+            rows = self._connect().execute(
+                f'SELECT {", ".join(FIELDS)} FROM leads{where} ORDER BY received_at DESC, id DESC LIMIT ?',
+                params + [chunk_size]
+            ).fetchall()
+            for row in rows:
+                yield dict(zip(FIELDS, row))
+            if len(rows) < chunk_size:
+                return
+            before = (rows[-1][1], rows[-1][0])
+
+    def count(self) -> int:
+        return self._connect().execute('SELECT COUNT(*) FROM leads').fetchone()[0]
+
+
+def _spreadsheet_safe(value):
+    """Evitar que Excel/Sheets interpreten como fórmula un campo escrito por el visitante"""
+    if isinstance(value, str) and value[:1] in ('=', '+', '-', '@', '\t', '\r'):
+        return "'" + value
+    return value
+
+
+def export_csv(leads: Iterator[dict]) -> Iterator[str]:
+    """Generador de líneas CSV (cabecera incluida)"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(FIELDS)
+    for lead in leads:
+        writer.writerow([_spreadsheet_safe(lead[field]) for field in FIELDS])
+        # Vaciar el buffer cada ~64 KB para enviar bloques razonables
+        if buffer.tell() >= 65536:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def export_jsonl(leads: Iterator[dict]) -> Iterator[str]:
+    """Generador de bloques JSON Lines"""
+    lines = []
+    size = 0
+    for lead in leads:
+        line = json.dumps(lead, ensure_ascii=False) + '\n'
+        lines.append(line)
+        size += len(line)
+        if size >= 65536:
+            yield ''.join(lines)
+            lines, size = [], 0
+    yield ''.join(lines)
+
+
+EXPORTERS: Dict[str, Tuple[str, Callable[[Iterator[dict]], Iterator[str]]]] = {
+    'csv': ('text/csv; charset=utf-8', export_csv),
+    'jsonl': ('application/x-ndjson; charset=utf-8', export_jsonl),
+}
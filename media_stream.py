@@ -0,0 +1,163 @@
+"""
+Streaming de imágenes y videos de /img para StarkMind
+
+Motor dedicado para los videos de demo (`DemoVideos.tsx`) y las imágenes del
+portfolio:
+
+- Rangos HTTP simples (206) y múltiples (multipart/byteranges), 416 cuando
+  no son satisfacibles, If-Range e If-None-Match con el ETag del índice.
+- Detrás de un proxy, la transferencia se delega con X-Accel-Redirect
+  (nginx) o X-Sendfile (apache/lighttpd) y el worker queda libre al instante.
+- Sin proxy, el cuerpo se entrega con `wsgi.file_wrapper` posicionado en el
+  inicio del rango: gunicorn lo envía con `os.sendfile` (zero-copy) limitado
+  al Content-Length. Si el servidor no ofrece file_wrapper se lee en bloques
+  de MEDIA_CHUNK_SIZE, así la memoria se mantiene constante por espectador.
+"""
+
+import os
+import urllib.parse
+import uuid
+from typing import Iterator, List, Optional, Tuple
+
+from flask import Response, request
+from werkzeug.http import http_date
+
+from static_assets import Asset
+
+MEDIA_OFFLOAD = os.getenv('MEDIA_OFFLOAD', '').lower()  # '', 'x-accel' o 'x-sendfile'
+MEDIA_ACCEL_PREFIX = os.getenv('MEDIA_ACCEL_PREFIX', '/_protected_media/')
+MEDIA_CHUNK_SIZE = int(os.getenv('MEDIA_CHUNK_SIZE', str(256 * 1024)))
+MEDIA_MAX_RANGES = int(os.getenv('MEDIA_MAX_RANGES', '16'))
+VIDEO_MAX_AGE = int(os.getenv('MEDIA_VIDEO_MAX_AGE', '86400'))
+IMAGE_MAX_AGE = int(os.getenv('MEDIA_IMAGE_MAX_AGE', '604800'))
+
+VIDEO_EXTENSIONS = ('.mp4', '.webm', '.ogg', '.avi', '.mov')
+
+ByteRange = Tuple[int, int]  # [inicio, fin) en bytes
+
+
+def is_video(filename: str) -> bool:
+    return filename.lower().endswith(VIDEO_EXTENSIONS)
+
+
+def resolve_ranges(asset: Asset) -> Optional[List[ByteRange]]:
+    """Rangos pedidos normalizados al tamaño del archivo
+
+    None: sin Range válido (se responde completo). Lista vacía: ningún rango
+    satisfacible (416).
+    """
+    header = request.range
+    if header is None or header.units != 'bytes' or len(header.ranges) > MEDIA_MAX_RANGES:
+        return None
+    # If-Range: si el recurso cambió desde que el cliente empezó, se envía completo
+    if_range = request.if_range
+    if if_range.etag is not None and if_range.etag != asset.etag:
+        return None
+    if if_range.date is not None and int(asset.mtime) > if_range.date.timestamp():
+        return None
+    size = asset.size
+    ranges = []
+    for start, stop in header.ranges:
+        if start < 0:
+            start, stop = max(0, size + start), size
+        else:
+            stop = size if stop is None else min(stop, size)
+        if start < stop:
+            ranges.append((start, stop))
+    return ranges
+
+
+def _iter_file(path: str, start: int, length: int) -> Iterator[bytes]:
+    """Leer un tramo del archivo en bloques de MEDIA_CHUNK_SIZE"""
+    with open(path, 'rb') as f:
+        f.seek(start)
+        remaining = length
+        while remaining > 0:
+            chunk = f.read(min(MEDIA_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def _file_body(path: str, start: int, length: int):
+    """Cuerpo zero-copy si el servidor WSGI ofrece file_wrapper (gunicorn usa sendfile)"""
+    file_wrapper = request.environ.get('wsgi.file_wrapper')
+    if file_wrapper is None:
+        return _iter_file(path, start, length)
+    f = open(path, 'rb')
+    f.seek(start)
+    return file_wrapper(f, MEDIA_CHUNK_SIZE)
+
+
+def _multipart_body(path: str, ranges: List[ByteRange], size: int, content_type: str,
+                    boundary: str) -> Tuple[Iterator[bytes], int]:
+    """Cuerpo multipart/byteranges y su longitud exacta"""
+    heads = [
+        (f'\r\n--{boundary}\r\nContent-Type: {content_type}\r\n'
+         f'Content-Range: bytes {start}-{stop - 1}/{size}\r\n\r\n').encode()
+        for start, stop in ranges
+    ]
+    tail = f'\r\n--{boundary}--\r\n'.encode()
+    length = sum(len(head) for head in heads) + sum(stop - start for start, stop in ranges) + len(tail)
+
+    def generate():
+        for head, (start, stop) in zip(heads, ranges):
+            yield head
+            yield from _iter_file(path, start, stop - start)
+        yield tail
+
+    return generate(), length
+
+
+def _cache_headers(response: Response, asset: Asset, filename: str):
+    max_age = VIDEO_MAX_AGE if is_video(filename) else IMAGE_MAX_AGE
+    response.headers['Cache-Control'] = f'public, max-age={max_age}'
+    response.headers['Accept-Ranges'] = 'bytes'
+    response.headers['Last-Modified'] = http_date(asset.mtime)
+    response.set_etag(asset.etag)
+
+
+def stream_media(asset: Asset, filename: str) -> Response:
+    """Responder una petición a /img/<filename> ya resuelta por el índice estático"""
+    # Revalidación: 304 sin abrir el archivo
+    if request.if_none_match.contains_weak(asset.etag):
+        response = Response(status=304)
+        _cache_headers(response, asset, filename)
+        return response
+
+    # Delegar la transferencia (y los rangos) al proxy
+    if MEDIA_OFFLOAD in ('x-accel', 'x-sendfile'):
+        response = Response(mimetype=asset.content_type)
+        if MEDIA_OFFLOAD == 'x-accel':
+            # nginx decodifica la URI: espacios, %, ? o no ASCII deben ir escapados
+            response.headers['X-Accel-Redirect'] = MEDIA_ACCEL_PREFIX + urllib.parse.quote(filename)
+        else:
+            response.headers['X-Sendfile'] = asset.path
+        _cache_headers(response, asset, filename)
+        return response
+
+    size = asset.size
+    ranges = resolve_ranges(asset)
+
+    if ranges is None:
+        response = Response(_file_body(asset.path, 0, size), mimetype=asset.content_type, direct_passthrough=True)
+        response.content_length = size
+    elif not ranges:
+        response = Response(status=416)
+        response.headers['Content-Range'] = f'bytes */{size}'
+    elif len(ranges) == 1:
+        start, stop = ranges[0]
+        response = Response(_file_body(asset.path, start, stop - start), status=206,
+                            mimetype=asset.content_type, direct_passthrough=True)
+        response.content_length = stop - start
+        response.headers['Content-Range'] = f'bytes {start}-{stop - 1}/{size}'
+    else:
+        boundary = uuid.uuid4().hex
+        body, length = _multipart_body(asset.path, ranges, size, asset.content_type, boundary)
+        response = Response(body, status=206, direct_passthrough=True,
+                            content_type=f'multipart/byteranges; boundary={boundary}')
+        response.content_length = length
+
+    _cache_headers(response, asset, filename)
+    return response
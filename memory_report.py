@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Memoria por worker de StarkMind Landing (Linux)
+
+El RSS cuenta las páginas compartidas con el master en cada worker, así que
+sumarlo exagera el consumo real. Este informe lee /proc/<pid>/smaps_rollup:
+
+- USS: memoria privada del proceso; lo que se libera al quitar un worker
+  y, por tanto, lo que cuesta añadir uno más.
+- PSS: RSS con las páginas compartidas repartidas entre quienes las usan;
+  la suma de todos los PSS es la memoria real del servidor.
+
+Uso:
+    python memory_report.py                 # busca el master de gunicorn
+    python memory_report.py --pid 1234      # master concreto
+    python memory_report.py --json
+"""
+
+import argparse
+import json
+import os
+import sys
+from typing import Dict, List, Optional
+
+
+def _smaps_rollup(pid: int) -> Dict[str, int]:
+    """RSS, PSS y USS (privada) en KB de un proceso"""
+    values = {}
+    try:
+        with open(f'/proc/{pid}/smaps_rollup') as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) >= 2 and parts[1].isdigit():
+                    values[parts[0].rstrip(':')] = int(parts[1])
+    except OSError:
+        return {}
+    return {
+        'rss_kb': values.get('Rss', 0),
+        'pss_kb': values.get('Pss', 0),
+        'uss_kb': values.get('Private_Clean', 0) + values.get('Private_Dirty', 0),
+    }
+
+
+def _children(pid: int) -> List[int]:
+    children = []
+    try:
+        for task in os.listdir(f'/proc/{pid}/task'):
+            with open(f'/proc/{pid}/task/{task}/children') as f:
+                children.extend(int(child) for child in f.read().split())
+    except OSError:
+        pass
+    return children
+
+
+def memory_per_worker(pid: int) -> List[dict]:
+    """Memoria del proceso principal y de cada worker hijo (Linux)"""
+    processes = [{'pid': pid, 'role': 'master', **_smaps_rollup(pid)}]
+    processes += [{'pid': child, 'role': 'worker', **_smaps_rollup(child)} for child in _children(pid)]
+    return [p for p in processes if 'rss_kb' in p]
+
+
+def _cmdline(pid: int) -> List[str]:
+    try:
+        with open(f'/proc/{pid}/cmdline', 'rb') as f:
+            return f.read().decode(errors='replace').split('\0')
+    except OSError:
+        return []
+
+
+def _is_gunicorn(argv: List[str]) -> bool:
+    """`gunicorn ...`, `python gunicorn ...`, `python -m gunicorn ...` o `gunicorn: master [wsgi:app]`"""
+    names = [os.path.basename(arg) for arg in argv[:3]]
+    # Saltar el intérprete y `-m` para llegar al programa (no cuenta `timeout gunicorn ...`)
+    if names and names[0].startswith('python'):
+        names = names[1:]
+        if names[:1] == ['-m']:
+            names = names[1:]
+    return bool(names) and names[0].startswith('gunicorn') and 'wsgi:app' in ' '.join(argv)
+
+
+def _parent(pid: int) -> Optional[int]:
+    try:
+        with open(f'/proc/{pid}/stat') as f:
+            # El nombre del proceso va entre paréntesis y puede contener espacios
+            return int(f.read().rsplit(')', 1)[1].split()[1])
+    except (OSError, IndexError, ValueError):
+        return None
+
+
+def find_master() -> Optional[int]:
+    """PID del master de gunicorn con wsgi:app (el proceso gunicorn cuyo padre no es gunicorn)"""
+    candidates = [int(name) for name in os.listdir('/proc') if name.isdigit() and _is_gunicorn(_cmdline(int(name)))]
+    masters = [pid for pid in candidates if _parent(pid) not in candidates]
+    return min(masters) if masters else None
+
+
+def summarize(processes: List[dict]) -> dict:
+    """Totales del servidor y coste marginal de un worker"""
+    workers = [p for p in processes if p['role'] == 'worker']
+    master = next((p for p in processes if p['role'] == 'master'), None)
+    summary = {
+        'workers': len(workers),
+        'total_pss_kb': sum(p['pss_kb'] for p in processes),
+        'total_rss_kb': sum(p['rss_kb'] for p in processes),
+        'master_pss_kb': master['pss_kb'] if master else 0,
+    }
+    if workers:
+        summary['worker_avg_uss_kb'] = round(sum(p['uss_kb'] for p in workers) / len(workers))
+        summary['worker_avg_pss_kb'] = round(sum(p['pss_kb'] for p in workers) / len(workers))
+        summary['worker_avg_rss_kb'] = round(sum(p['rss_kb'] for p in workers) / len(workers))
+        # Fracción del RSS de cada worker que comparte con el master y los demás workers
+        summary['worker_shared_ratio'] = round(1 - summary['worker_avg_uss_kb'] / summary['worker_avg_rss_kb'], 3) \
+            if summary['worker_avg_rss_kb'] else 0
+        # Workers adicionales por GB: cada uno cuesta su USS
+        summary['workers_per_gb'] = round(1024 * 1024 / summary['worker_avg_uss_kb'], 1) \
+            if summary['worker_avg_uss_kb'] else None
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Memoria RSS/PSS/USS por worker de gunicorn')
+    parser.add_argument('--pid', type=int, help='PID del master (por defecto se busca el de wsgi:app)')
+    parser.add_argument('--json', action='store_true', help='Imprimir el informe en JSON')
+    args = parser.parse_args()
+
+    pid = args.pid or find_master()
+    if pid is None:
+        print('❌ No se encontró el master de gunicorn (usa --pid)', file=sys.stderr)
+        sys.exit(1)
+    processes = memory_per_worker(pid)
+    if not processes:
+        print(f'❌ No se pudo leer /proc/{pid}/smaps_rollup', file=sys.stderr)
+        sys.exit(1)
+    summary = summarize(processes)
+    if args.json:
+        print(json.dumps({'processes': processes, 'summary': summary}, indent=2))
+        return
+
+    print(f"{'pid':>8}  {'rol':<8}{'RSS MB':>10}{'PSS MB':>10}{'USS MB':>10}")
+    for p in processes:
+        print(f"{p['pid']:>8}  {p['role']:<8}{p['rss_kb'] / 1024:>10.1f}{p['pss_kb'] / 1024:>10.1f}{p['uss_kb'] / 1024:>10.1f}")
+    print(f"\nTotal real (suma de PSS): {summary['total_pss_kb'] / 1024:.1f} MB "
+          f"(la suma de RSS diría {summary['total_rss_kb'] / 1024:.1f} MB)")
+    if summary['workers']:
+        print(f"Worker medio: USS {summary['worker_avg_uss_kb'] / 1024:.1f} MB, PSS {summary['worker_avg_pss_kb'] / 1024:.1f} MB, "
+              f"{summary['worker_shared_ratio']:.0%} de su RSS compartido")
+        print(f"Workers adicionales por GB: ~{summary['workers_per_gb']}")
+
+
+if __name__ == '__main__':
+    main()
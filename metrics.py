@@ -0,0 +1,346 @@
+"""
+Métricas estilo Prometheus para StarkMind
+
+Cada worker acumula contadores e histogramas en memoria (un lock y unas
+sumas por observación, sin E/S en la petición). Un hilo en segundo plano
+vuelca una instantánea cada METRICS_FLUSH_INTERVAL segundos a
+`METRICS_DIR/<pid>.json`, y `/metrics` suma las instantáneas de todos los
+workers (las del propio proceso, en vivo) en formato de texto de Prometheus.
+
+Cuando un worker termina (reciclado por `max_requests`, timeout o recarga)
+vuelca una última instantánea y el master la suma a `retired.json` y borra
+la suya (`retire_snapshot()`): los contadores siguen siendo monótonos, el
+directorio no crece y un worker nuevo que reutilice el PID empieza de cero.
+Cada instantánea lleva un id (pid + arranque); las ya sumadas se ignoran aunque
+un scrape las lea a mitad de la operación. El directorio se vacía al arrancar
+el master de gunicorn (`reset_directory()`).
+
+Overhead por petición: `python metrics.py --benchmark`
+"""
+
+import bisect
+import glob
+import json
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'True').lower() == 'true'
+METRICS_DIR = os.getenv('METRICS_DIR', os.path.join('data', 'metrics'))
+METRICS_FLUSH_INTERVAL = float(os.getenv('METRICS_FLUSH_INTERVAL', '5'))
+# Si se define, /metrics exige `Authorization: Bearer <token>`
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+
+# Instantánea acumulada de los workers terminados
+RETIRED_SNAPSHOT = 'retired.json'
+# Ids de instantáneas ya sumadas que se recuerdan (solo importan durante la carrera con un scrape)
+RETIRED_IDS = 64
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Histogramas que no miden latencias de petición (el resto usa LATENCY_BUCKETS)
+BUCKETS = {
+    'landing_lead_digest_batch_size': (1, 2, 3, 5, 10, 15, 25, 50, 100),
+    'landing_lead_digest_flush_latency_seconds': (1, 5, 15, 30, 60, 120, 300, 600, 1800, 3600),
+}
+
+# nombre -> (tipo, descripción)
+METRICS = {
+    'landing_http_request_duration_seconds': ('histogram', 'Duración de las peticiones por ruta'),
+    'landing_http_requests_total': ('counter', 'Peticiones por ruta, método y estado'),
+    'landing_static_responses_total': ('counter', 'Respuestas de archivos estáticos: not_modified (caché del cliente), served o miss'),
+    'landing_send_mail_duration_seconds': ('histogram', 'Latencia de send_mail() contra el proveedor de email'),
+    'landing_send_mail_total': ('counter', 'Envíos de send_mail() por estado del proveedor'),
+    'landing_email_provider_total': ('counter', 'Intentos por proveedor de email: ok, error, rejected (4xx del cliente) o circuit_open'),
+    'landing_email_circuit_opened_total': ('counter', 'Veces que se abrió el circuito de cada proveedor'),
+    'landing_response_cache_total': ('counter', 'Búsquedas en la caché compartida de respuestas estáticas'),
+    'landing_response_cache_bytes': ('gauge', 'Tamaño del segmento compartido de respuestas y presupuesto'),
+    'landing_response_cache_entries': ('gauge', 'Cuerpos guardados en el segmento compartido'),
+    'landing_early_hints_total': ('counter', 'Hints de preload enviados: link (cabecera) o informational (103)'),
+    'landing_image_variant_cache_total': ('counter', 'Búsquedas en la caché de variantes de imagen'),
+    'landing_rate_limit_rejections_total': ('counter', 'Peticiones rechazadas por el limitador'),
+    'landing_idempotency_total': ('counter', 'Envíos del formulario: new, replayed (duplicado) o in_progress'),
+    'landing_lead_store_total': ('counter', 'Almacén de leads: stored (filas) y errors'),
+    'landing_lead_digest_total': ('counter', 'Actividad del digest de leads'),
+    'landing_lead_digest_batch_size': ('histogram', 'Leads incluidos en cada digest'),
+    'landing_lead_digest_flush_latency_seconds': ('histogram', 'Espera del lead más antiguo de cada digest hasta su envío'),
+    'landing_email_queue_jobs': ('gauge', 'Trabajos en la cola de email por estado'),
+    'landing_email_queue_oldest_seconds': ('gauge', 'Antigüedad del trabajo pendiente más antiguo'),
+}
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class MetricsRegistry:
+    """Contadores e histogramas del proceso con volcado periódico a disco"""
+
+    def __init__(self, directory: str = METRICS_DIR, flush_interval: float = METRICS_FLUSH_INTERVAL):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._counters: Dict[Tuple[str, Labels], float] = {}
+        self._histograms: Dict[Tuple[str, Labels], List[float]] = {}
+        # Contadores que otros módulos ya llevan (p. ej. image_cache.hits): se leen al volcar
+        self._collectors: List[Callable[[], List[Tuple[str, dict, float]]]] = []
+        self._gauges: List[Callable[[], List[Tuple[str, dict, float]]]] = []
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        self._id: Optional[str] = None
+        self._start_lock = threading.Lock()
+
+    # -- Registro (camino caliente) ---------------------------------------
+
+    def inc(self, name: str, labels: Labels = (), value: float = 1.0):
+        key = (name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0.0) + value
+
+    def observe(self, name: str, labels: Labels, seconds: float):
+        """Observación de histograma: [contadores por bucket..., +Inf, suma]"""
+        key = (name, labels)
+        buckets = BUCKETS.get(name, LATENCY_BUCKETS)
+        index = bisect.bisect_left(buckets, seconds)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = [0.0] * (len(buckets) + 2)
+            histogram[index] += 1
+            histogram[-1] += seconds
+
+    def register_collector(self, collector: Callable[[], List[Tuple[str, dict, float]]]):
+        """Contadores acumulados por el proceso, leídos al volcar"""
+        self._collectors.append(collector)
+
+    def register_gauge(self, gauge: Callable[[], List[Tuple[str, dict, float]]]):
+        """Valores del nodo calculados en el momento del scrape (no se suman entre workers)"""
+        self._gauges.append(gauge)
+
+    # -- Instantáneas -----------------------------------------------------
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            counters = [[name, dict(labels), value] for (name, labels), value in self._counters.items()]
+            histograms = [[name, dict(labels), list(values)] for (name, labels), values in self._histograms.items()]
+        for collector in self._collectors:
+            try:
+                counters.extend([name, labels, value] for name, labels, value in collector())
+            except Exception as e:
+                logger.warning(f'Colector de métricas falló: {e}')
+        return {'id': self._id, 'counters': counters, 'histograms': histograms}
+
+    def flush(self):
+        """Escribir la instantánea del proceso de forma atómica"""
+        _write_snapshot(self.directory, f'{os.getpid()}.json', self.snapshot())
+
+    def _snapshots(self) -> List[dict]:
+        """Instantáneas de todos los workers; la del proceso actual, en vivo"""
+        own = f'{os.getpid()}.json'
+        snapshots = [self.snapshot()]
+        for path in glob.glob(os.path.join(self.directory, '*.json')):
+            if os.path.basename(path) in (own, RETIRED_SNAPSHOT):
+                continue
+            snapshot = _read_snapshot(path)
+            if snapshot is not None:
+                snapshots.append(snapshot)
+        # El acumulado se lee después: si ya incluye una instantánea leída arriba, esa se descarta
+        retired = _read_snapshot(os.path.join(self.directory, RETIRED_SNAPSHOT))
+        if retired is not None:
+            folded = set(retired.get('folded', []))
+            snapshots = [snapshot for snapshot in snapshots if snapshot.get('id') not in folded] + [retired]
+        return snapshots
+
+    def render(self) -> str:
+        """Exposición en formato de texto de Prometheus (0.0.4), agregada entre workers"""
+        counters, histograms = _aggregate(self._snapshots())
+        gauges = []
+        for gauge in self._gauges:
+            try:
+                gauges.extend((name, tuple(sorted(labels.items())), value) for name, labels, value in gauge())
+            except Exception as e:
+                logger.warning(f'Gauge de métricas falló: {e}')
+
+        lines = []
+        for name, (kind, description) in METRICS.items():
+            samples = []
+            if kind == 'counter':
+                samples = [(name, labels, value) for (n, labels), value in sorted(counters.items()) if n == name]
+            elif kind == 'gauge':
+                samples = [(name, labels, value) for n, labels, value in gauges if n == name]
+            else:
+                for (n, labels), values in sorted(histograms.items()):
+                    if n != name:
+                        continue
+                    cumulative = 0.0
+                    for bound, count in zip(BUCKETS.get(name, LATENCY_BUCKETS) + ('+Inf',), values):
+                        cumulative += count
+                        samples.append((f'{name}_bucket', labels + (('le', str(bound)),), cumulative))
+                    samples.append((f'{name}_sum', labels, values[-1]))
+                    samples.append((f'{name}_count', labels, cumulative))
+            if not samples:
+                continue
+            lines.append(f'# HELP {name} {description}')
+            lines.append(f'# TYPE {name} {kind}')
+            for sample, labels, value in samples:
+                lines.append(f'{sample}{_format_labels(labels)} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+    # -- Volcado en segundo plano -----------------------------------------
+
+    def start(self):
+        """Arrancar el hilo de volcado en este proceso (idempotente y seguro tras fork)"""
+        with self._start_lock:
+            pid = os.getpid()
+            if self._pid == pid:
+                return
+            if self._pid is not None:
+                # Proceso hijo tras un fork: no heredar lo contado por el padre
+                with self._lock:
+                    self._counters.clear()
+                    self._histograms.clear()
+            self._pid = pid
+            self._id = f'{pid}-{time.time()}'
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, name='metrics-flush', daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def close(self):
+        """Detener el hilo y volcar lo contado desde el último volcado (al terminar el worker)"""
+        if self._pid != os.getpid():
+            return
+        self.stop()
+        try:
+            self.flush()
+        except Exception as e:
+            logger.warning(f'No se pudieron volcar las métricas finales: {e}')
+
+    def _loop(self):
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception as e:
+                logger.warning(f'No se pudieron volcar las métricas: {e}')
+
+
+def _format_labels(labels: Labels) -> str:
+    if not labels:
+        return ''
+    escaped = (f'{key}="{str(value).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+               for key, value in labels)
+    return '{' + ','.join(escaped) + '}'
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(value)
+
+
+def _aggregate(snapshots: List[dict]) -> Tuple[Dict[Tuple[str, Labels], float], Dict[Tuple[str, Labels], List[float]]]:
+    """Sumar contadores e histogramas de varias instantáneas"""
+    counters: Dict[Tuple[str, Labels], float] = {}
+    histograms: Dict[Tuple[str, Labels], List[float]] = {}
+    for snapshot in snapshots:
+        for name, labels, value in snapshot['counters']:
+            key = (name, tuple(sorted(labels.items())))
+            counters[key] = counters.get(key, 0.0) + value
+        for name, labels, values in snapshot['histograms']:
+            key = (name, tuple(sorted(labels.items())))
+            merged = histograms.setdefault(key, [0.0] * len(values))
+            for index, value in enumerate(values):
+                merged[index] += value
+    return counters, histograms
+
+
+def _read_snapshot(path: str) -> Optional[dict]:
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_snapshot(directory: str, name: str, data: dict):
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.metrics-')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, os.path.join(directory, name))
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def retire_snapshot(pid: int, directory: str = METRICS_DIR) -> bool:
+    """Sumar la instantánea de un worker terminado a retired.json y borrarla (en el master)"""
+    path = os.path.join(directory, f'{pid}.json')
+    snapshot = _read_snapshot(path)
+    if snapshot is None:
+        return False
+    retired = _read_snapshot(os.path.join(directory, RETIRED_SNAPSHOT)) or {'counters': [], 'histograms': []}
+    counters, histograms = _aggregate([retired, snapshot])
+    folded = retired.get('folded', [])
+    if snapshot.get('id') is not None:
+        folded = (folded + [snapshot['id']])[-RETIRED_IDS:]
+    # Primero el acumulado (con el id) y después el borrado: un scrape nunca pierde ni duplica la instantánea
+    _write_snapshot(directory, RETIRED_SNAPSHOT, {
+        'folded': folded,
+        'counters': [[name, dict(labels), value] for (name, labels), value in counters.items()],
+        'histograms': [[name, dict(labels), values] for (name, labels), values in histograms.items()],
+    })
+    try:
+        os.unlink(path)
+    except OSError:
+        pass
+    return True
+
+
+def reset_directory(directory: str = METRICS_DIR):
+    """Vaciar las instantáneas de una ejecución anterior (al arrancar el master)"""
+    for path in glob.glob(os.path.join(directory, '*.json')):
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+
+
+registry = MetricsRegistry()
+
+
+def benchmark(iterations: int = 200000) -> Dict[str, float]:
+    """Microsegundos por petición instrumentada (un histograma y dos contadores)"""
+    bench = MetricsRegistry(directory=tempfile.mkdtemp())
+    labels = (('route', '/static/<path:filename>'), ('method', 'GET'))
+    started = time.perf_counter()
+    for i in range(iterations):
+        began = time.perf_counter()
+        bench.observe('landing_http_request_duration_seconds', labels, time.perf_counter() - began)
+        bench.inc('landing_http_requests_total', labels + (('status', '200'),))
+        bench.inc('landing_static_responses_total', (('result', 'served'),))
+    per_request = (time.perf_counter() - started) / iterations * 1e6
+    started = time.perf_counter()
+    for _ in range(100):
+        bench.render()
+    return {
+        'per_request_us': round(per_request, 3),
+        'render_ms': round((time.perf_counter() - started) / 100 * 1000, 3),
+    }
+
+
+if __name__ == '__main__':
+    # Uso: python metrics.py --benchmark
+    if len(sys.argv) < 2 or sys.argv[1] != '--benchmark':
+        print('Uso: python metrics.py --benchmark')
+        sys.exit(1)
+    for label, value in benchmark().items():
+        print(f'{label:<20}{value:>10}')
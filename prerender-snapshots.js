@@ -0,0 +1,104 @@
+#!/usr/bin/env node
+/*
+ * Snapshots del HTML renderizado para prerender.py
+ *
+ * Tras `npm run build`, abre el build en Chromium headless una vez por idioma
+ * y guarda el contenido de #root en build/prerender/<idioma>/home.html.
+ * prerender.py lo inserta en el index.html servido e inlinea el CSS crítico.
+ * El SPA no tiene router, así que el resto de rutas usan el snapshot de home.
+ *
+ * Uso:
+ *   npm install --no-save puppeteer-core@21
+ *   PUPPETEER_EXECUTABLE_PATH=/usr/bin/chromium-browser npm run prerender
+ */
+
+const fs = require('fs');
+const http = require('http');
+const path = require('path');
+
+const BUILD_DIR = path.resolve(process.env.BUILD_DIR || 'build');
+const LANGUAGES = (process.env.PRERENDER_LANGUAGES || 'es,en').split(',').map((l) => l.trim()).filter(Boolean);
+const TIMEOUT_MS = Number(process.env.PRERENDER_TIMEOUT_MS || 30000);
+
+const MIME_TYPES = {
+  '.html': 'text/html; charset=utf-8',
+  '.js': 'application/javascript',
+  '.css': 'text/css',
+  '.json': 'application/json',
+  '.svg': 'image/svg+xml',
+  '.png': 'image/png',
+  '.jpg': 'image/jpeg',
+  '.webp': 'image/webp',
+  '.ico': 'image/x-icon',
+  '.woff2': 'font/woff2',
+};
+
+// Servidor mínimo del build con fallback del SPA; ?lang= fija <html lang data-lang> como hace prerender.py
+function serveBuild() {
+  const shell = fs.readFileSync(path.join(BUILD_DIR, 'index.html'), 'utf8');
+  const server = http.createServer((req, res) => {
+    const url = new URL(req.url, 'http://localhost');
+    const file = path.join(BUILD_DIR, path.normalize(decodeURIComponent(url.pathname)));
+    if (file.startsWith(BUILD_DIR + path.sep) && fs.existsSync(file) && fs.statSync(file).isFile()
+        && path.basename(file) !== 'index.html') {
+      res.writeHead(200, { 'Content-Type': MIME_TYPES[path.extname(file)] || 'application/octet-stream' });
+      fs.createReadStream(file).pipe(res);
+      return;
+    }
+    const lang = url.searchParams.get('lang') || 'es';
+    res.writeHead(200, { 'Content-Type': MIME_TYPES['.html'] });
+    res.end(shell.replace(/<html\b[^>]*>/, `<html lang="${lang}" data-lang="${lang}">`));
+  });
+  return new Promise((resolve) => server.listen(0, '127.0.0.1', () => resolve(server)));
+}
+
+async function snapshot(browser, origin, lang) {
+  const page = await browser.newPage();
+  await page.setRequestInterception(true);
+  // Sin red externa ni media: solo interesa el marcado inicial
+  page.on('request', (request) => {
+    const blocked = !request.url().startsWith(origin) || ['media', 'image', 'font'].includes(request.resourceType());
+    if (blocked) {
+      request.abort();
+    } else {
+      request.continue();
+    }
+  });
+  await page.goto(`${origin}/?lang=${lang}`, { waitUntil: 'networkidle0', timeout: TIMEOUT_MS });
+  await page.waitForSelector('#root > *', { timeout: TIMEOUT_MS });
+  const markup = await page.$eval('#root', (root) => root.innerHTML);
+  await page.close();
+  return markup;
+}
+
+async function main() {
+  const puppeteer = require('puppeteer-core');
+  const executablePath = process.env.PUPPETEER_EXECUTABLE_PATH;
+  if (!executablePath) {
+    throw new Error('PUPPETEER_EXECUTABLE_PATH no definido (ruta a Chromium)');
+  }
+  const server = await serveBuild();
+  const origin = `http://127.0.0.1:${server.address().port}`;
+  const browser = await puppeteer.launch({
+    executablePath,
+    headless: 'new',
+    args: ['--no-sandbox', '--disable-dev-shm-usage'],
+  });
+  try {
+    for (const lang of LANGUAGES) {
+      const markup = await snapshot(browser, origin, lang);
+      const target = path.join(BUILD_DIR, 'prerender', lang, 'home.html');
+      fs.mkdirSync(path.dirname(target), { recursive: true });
+      fs.writeFileSync(target, markup);
+      console.log(`✅ ${path.relative(process.cwd(), target)} (${markup.length} bytes)`);
+    }
+  } finally {
+    await browser.close();
+    server.close();
+  }
+}
+
+main().catch((error) => {
+  console.error(`❌ Snapshots de prerender: ${error.message}`);
+  process.exit(1);
+});
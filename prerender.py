@@ -0,0 +1,210 @@
+"""
+Documentos index.html pre-renderizados para StarkMind
+
+El catch-all de React sirve el mismo index.html vacío para todas las rutas y
+el navegador no pinta nada hasta ejecutar main.js. Este módulo prepara, una
+vez por build, un documento listo para pintar por cada ruta principal y cada
+idioma de `LanguageContext`:
+
+- `<html lang>`, `<title>` y meta description en el idioma pedido.
+- Si existe un snapshot del HTML renderizado en
+  `<build>/prerender/<idioma>/<ruta>.html` (lo genera `npm run prerender`
+  tras `npm run build`; el Dockerfile lo hace en la etapa de React), se
+  inserta en `#root`, se inlinea el CSS crítico de main.<hash>.css que usa
+  ese marcado y la hoja completa pasa a cargarse sin bloquear el render.
+
+Los documentos se guardan en memoria (con variantes gzip/brotli) y se
+regeneran cuando cambia el índice estático; servir uno es una búsqueda en
+un diccionario.
+"""
+
+import gzip
+import hashlib
+import html
+import logging
+import os
+import re
+import threading
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
+
+from static_assets import StaticIndex, brotli
+
+logger = logging.getLogger(__name__)
+
+PRERENDER_ENABLED = os.getenv('PRERENDER', 'True').lower() == 'true'
+PRERENDER_ROUTES = [r.strip() for r in os.getenv('PRERENDER_ROUTES', 'home,services,portfolio,contact').split(',') if r.strip()]
+DEFAULT_LANGUAGE = 'es'
+
+# Metadatos por idioma (mismos textos que contentData en src/context/LanguageContext.tsx)
+PAGE_META = {
+    'es': {
+        'title': 'StarkMind - Automatización Inteligente y Análisis de Datos para Empresas Modernas',
+        'description': 'Firma tecnológica especializada en automatización inteligente, scraping web de alto rendimiento y extracción de datos impulsada por IA. Reducimos costos operativos y convertimos datos en decisiones estratégicas.',
+    },
+    'en': {
+        'title': 'StarkMind - Smart Automation & Data Intelligence for the Modern Business',
+        'description': 'Boutique technology firm specialized in intelligent automation, high-performance web scraping, and AI-driven data extraction. We help businesses reduce operational costs and transform raw data into strategic insights.',
+    },
+}
+LANGUAGES = tuple(PAGE_META)
+
+CSS_COMMENT_RE = re.compile(r'/\*.*?\*/', re.S)
+CLASS_ATTR_RE = re.compile(r'class(?:Name)?="([^"]*)"')
+CSS_CLASS_RE = re.compile(r'\.((?:\\.|[\w-])+)')
+CSS_ESCAPE_RE = re.compile(r'\\(.)')
+
+
+class Document(NamedTuple):
+    """index.html preparado para una ruta e idioma"""
+    body: bytes
+    etag: str
+    encodings: Dict[str, bytes]
+
+
+# -- CSS crítico ----------------------------------------------------------
+
+def split_rules(css: str) -> List[Tuple[str, str]]:
+    """Dividir CSS en reglas de primer nivel (prelude, cuerpo), respetando bloques anidados"""
+    rules = []
+    depth = 0
+    start = 0
+    prelude = ''
+    for index, char in enumerate(css):
+        if char == '{':
+            if depth == 0:
+                prelude = css[start:index].strip()
+                start = index + 1
+            depth += 1
+        elif char == '}':
+            depth -= 1
+            if depth == 0:
+                rules.append((prelude, css[start:index]))
+                start = index + 1
+        elif char == ';' and depth == 0:
+            # Sentencias sin bloque (@import, @charset)
+            rules.append((css[start:index].strip(), None))
+            start = index + 1
+    return rules
+
+
+def _selector_is_critical(selector: str, used_classes: Set[str]) -> bool:
+    classes = {CSS_ESCAPE_RE.sub(r'\1', name) for name in CSS_CLASS_RE.findall(selector)}
+    return classes <= used_classes
+
+
+def critical_css(css: str, used_classes: Set[str]) -> str:
+    """Reglas de `css` cuyos selectores solo usan clases presentes en el marcado
+
+    Las reglas sin clases (preflight, :root, elementos) se conservan siempre;
+    @import y @keyframes se dejan para la hoja completa.
+    """
+    output = []
+    for prelude, body in split_rules(CSS_COMMENT_RE.sub('', css)):
+        if body is None or prelude.startswith(('@import', '@keyframes', '@font-face', '@charset')):
+            continue
+        if prelude.startswith(('@media', '@supports')):
+            inner = critical_css(body, used_classes)
+            if inner:
+                output.append(f'{prelude}{{{inner}}}')
+            continue
+        selectors = [s for s in prelude.split(',') if _selector_is_critical(s, used_classes)]
+        if selectors:
+            output.append(f'{",".join(selectors)}{{{body}}}')
+    return ''.join(output)
+
+
+def used_classes(markup: str) -> Set[str]:
+    classes = set()
+    for value in CLASS_ATTR_RE.findall(markup):
+        classes.update(html.unescape(value).split())
+    return classes
+
+
+# -- Documentos -----------------------------------------------------------
+
+def _read(path: str) -> Optional[str]:
+    try:
+        with open(path, encoding='utf-8') as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def render_document(shell: str, language: str, css_href: Optional[str], css: Optional[str],
+                    snapshot: Optional[str]) -> str:
+    """Aplicar idioma, snapshot y CSS crítico al index.html del build"""
+    meta = PAGE_META[language]
+    # data-lang: idioma elegido por el servidor, el que LanguageContext usa al arrancar
+    document = re.sub(r'<html\b[^>]*>', f'<html lang="{language}" data-lang="{language}">', shell, count=1)
+    document = re.sub(r'<title>.*?</title>', f'<title>{html.escape(meta["title"])}</title>', document, count=1, flags=re.S)
+    document = re.sub(r'(<meta name="description" content=")[^"]*(")',
+                      lambda m: m.group(1) + html.escape(meta['description']) + m.group(2), document, count=1)
+
+    if snapshot and css_href and css is not None:
+        critical = critical_css(css, used_classes(snapshot))
+        stylesheet = f'<link href="{css_href}" rel="stylesheet">'
+        deferred = (f'<style id="critical-css">{critical}</style>'
+                    f'<link rel="preload" href="{css_href}" as="style" onload="this.onload=null;this.rel=\'stylesheet\'">'
+                    f'<noscript>{stylesheet}</noscript>')
+        if stylesheet in document:
+            document = document.replace(stylesheet, deferred, 1)
+        document = document.replace('<div id="root"></div>', f'<div id="root">{snapshot}</div>', 1)
+    return document
+
+
+class PrerenderCache:
+    """Documentos por (ruta, idioma), regenerados cuando cambia el build"""
+
+    def __init__(self, static_index: StaticIndex, routes: List[str] = PRERENDER_ROUTES):
+        self.static_index = static_index
+        self.routes = routes
+        self.documents: Dict[Tuple[str, str], Document] = {}
+        self._generation = -1
+        # Una sola reconstrucción aunque lleguen varias primeras peticiones a la vez
+        self._lock = threading.Lock()
+
+    def build(self):
+        static_index = self.static_index
+        shell_asset = static_index.files.get('index.html')
+        documents: Dict[Tuple[str, str], Document] = {}
+        if shell_asset is not None:
+            shell = _read(shell_asset.path) or ''
+            css_entry = next((e for e in static_index.manifest.get('entrypoints', []) if e.endswith('.css')), None)
+            css_asset = static_index.files.get(css_entry) if css_entry else None
+            css = _read(css_asset.path) if css_asset else None
+            css_href = '/' + css_entry if css_entry else None
+            snapshot_root = os.path.join(static_index.root, 'prerender')
+            for language in LANGUAGES:
+                home_snapshot = _read(os.path.join(snapshot_root, language, 'home.html'))
+                for route in self.routes:
+                    snapshot = _read(os.path.join(snapshot_root, language, f'{route}.html')) or home_snapshot
+                    body = render_document(shell, language, css_href, css, snapshot).encode('utf-8')
+                    documents[(route, language)] = self._document(body)
+        self.documents = documents
+        self._generation = static_index.generation
+        logger.info(f'Documentos pre-renderizados: {len(documents)}')
+
+    @staticmethod
+    def _document(body: bytes) -> Document:
+        etag = hashlib.blake2b(body, digest_size=16).hexdigest()
+        encodings = {'gzip': gzip.compress(body, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            encodings['br'] = brotli.compress(body, quality=11)
+        return Document(body, etag, encodings)
+
+    def negotiate(self, document: Document, accept_encodings) -> Tuple[bytes, Optional[str], str]:
+        """(cuerpo, Content-Encoding, ETag) según Accept-Encoding"""
+        for encoding in ('br', 'gzip'):
+            if encoding in document.encodings and accept_encodings[encoding] > 0:
+                return document.encodings[encoding], encoding, f'{document.etag}-{encoding}'
+        return document.body, None, document.etag
+
+    def get(self, path: str, language: str) -> Optional[Document]:
+        """Documento para una ruta del SPA; las rutas no listadas usan el de inicio"""
+        self.static_index.refresh_if_changed()
+        if self._generation != self.static_index.generation:
+            with self._lock:
+                if self._generation != self.static_index.generation:
+                    self.build()
+        route = path.strip('/').split('/', 1)[0] or 'home'
+        return self.documents.get((route, language)) or self.documents.get(('home', language))
@@ -15,7 +15,7 @@ NC='\033[0m' # No Color
 function usage() {
   echo -e "${BLUE}StarkMind Production Helper${NC}"
   echo ""
-  echo -e "${YELLOW}Uso:${NC} $0 {prod|build|stop|restart|logs|status|clean|health|backup|setup|kill|prebuild|clean-build|assets|verify-assets}"
+  echo -e "${YELLOW}Uso:${NC} $0 {prod|build|stop|restart|reload|logs|status|clean|health|backup|setup|kill|prebuild|clean-build|assets|verify-assets}"
   echo ""
   echo -e "${YELLOW}Comandos principales:${NC}"
   echo "  prod         - Iniciar entorno de producción"
@@ -26,6 +26,7 @@ function usage() {
   echo "  clean-build  - Limpiar builds anteriores"
   echo "  stop         - Detener entorno de producción"
   echo "  restart      - Reiniciar entorno de producción"
+  echo "  reload       - Recargar workers de gunicorn sin downtime"
   echo "  logs         - Mostrar logs de producción"
   echo "  status       - Mostrar estado del entorno"
   echo "  clean        - Limpiar recursos de Docker"
@@ -433,6 +434,12 @@ case "$1" in
     echo -e "${GREEN}✅ Entorno de producción reiniciado${NC}"
     ;;
 
+  reload)
+    echo -e "${BLUE}♻️  Recarga elegante de los workers de gunicorn...${NC}"
+    docker-compose -f $COMPOSE_FILE exec app kill -HUP 1
+    echo -e "${GREEN}✅ Workers recargados sin cortar conexiones${NC}"
+    ;;
+
   logs)
     echo -e "${BLUE}📋 Mostrando logs de producción...${NC}"
     docker-compose -f $COMPOSE_FILE logs -f
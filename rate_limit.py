@@ -0,0 +1,254 @@
+"""
+Limitación de peticiones por cliente para StarkMind
+
+Token bucket por clave (IP del cliente y email del formulario). El estado
+vive en un backend compartido por todos los workers de gunicorn del nodo:
+
+- `sqlite` (por defecto): tabla en SQLite modo WAL, actualizada dentro de
+  una transacción BEGIN IMMEDIATE, así dos workers nunca gastan el mismo token.
+- `redis`: para despliegues con varios nodos (requiere el paquete `redis`).
+- `memory`: solo para un proceso (desarrollo).
+
+Cuando una clave se queda sin tokens, cada proceso recuerda en memoria hasta
+cuándo está bloqueada: los siguientes intentos se rechazan sin tocar el
+backend, en microsegundos.
+"""
+
+import hashlib
+import logging
+import math
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, NamedTuple, Optional, Tuple
+
+try:
+    import redis
+except ImportError:  # Opcional: solo para el backend redis
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMIT_ENABLED = os.getenv('RATE_LIMIT_ENABLED', 'True').lower() == 'true'
+RATE_LIMIT_BACKEND = os.getenv('RATE_LIMIT_BACKEND', 'sqlite').lower()
+RATE_LIMIT_PATH = os.getenv('RATE_LIMIT_PATH', os.path.join('data', 'rate_limit.db'))
+RATE_LIMIT_REDIS_URL = os.getenv('RATE_LIMIT_REDIS_URL', 'redis://localhost:6379/0')
+# Ráfaga permitida y segundos para recuperar cada token
+RATE_LIMIT_IP_CAPACITY = float(os.getenv('RATE_LIMIT_IP_CAPACITY', '5'))
+RATE_LIMIT_IP_REFILL = float(os.getenv('RATE_LIMIT_IP_REFILL', '60'))
+RATE_LIMIT_EMAIL_CAPACITY = float(os.getenv('RATE_LIMIT_EMAIL_CAPACITY', '3'))
+RATE_LIMIT_EMAIL_REFILL = float(os.getenv('RATE_LIMIT_EMAIL_REFILL', '600'))
+# Número de proxies de confianza delante de la app (X-Forwarded-For)
+RATE_LIMIT_TRUSTED_PROXIES = int(os.getenv('RATE_LIMIT_TRUSTED_PROXIES', '0'))
+# Cada cuántas consultas se borran los buckets ya llenos (equivalen a no tener fila)
+PRUNE_EVERY = 1000
+# Tamaño a partir del cual se limpian los bloqueos locales vencidos
+MAX_BLOCKED_KEYS = 10000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS rate_buckets (
+    key TEXT PRIMARY KEY,
+    tokens REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    full_at REAL
+) WITHOUT ROWID;
+"""
+
+# Token bucket atómico en redis: devuelve {permitido, segundos de espera}
+REDIS_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local interval = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated_at')
+local tokens = tonumber(bucket[1]) or capacity
+local updated_at = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + (now - updated_at) / interval)
+local allowed = 0
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+else
+    wait = (1 - tokens) * interval
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'updated_at', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity * interval))
+return {allowed, tostring(wait)}
+"""
+
+
+class Limit(NamedTuple):
+    """Capacidad del bucket y segundos para recuperar un token"""
+    capacity: float
+    interval: float
+
+
+IP_LIMIT = Limit(RATE_LIMIT_IP_CAPACITY, RATE_LIMIT_IP_REFILL)
+EMAIL_LIMIT = Limit(RATE_LIMIT_EMAIL_CAPACITY, RATE_LIMIT_EMAIL_REFILL)
+# Tiempo máximo que tarda en llenarse un bucket vacío, con cualquiera de los límites
+MAX_REFILL_SECONDS = max(limit.capacity * limit.interval for limit in (IP_LIMIT, EMAIL_LIMIT))
+
+
+def refill(tokens: float, elapsed: float, limit: Limit) -> float:
+    return min(limit.capacity, tokens + max(0.0, elapsed) / limit.interval)
+
+
+class MemoryBackend:
+    """Buckets en memoria del proceso (un solo worker)"""
+
+    def __init__(self):
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+        self._lock = threading.Lock()
+
+    def consume(self, key: str, limit: Limit, now: float) -> Tuple[bool, float]:
+        with self._lock:
+            tokens, updated_at = self._buckets.get(key, (limit.capacity, now))
+            tokens = refill(tokens, now - updated_at, limit)
+            if tokens >= 1:
+                self._buckets[key] = (tokens - 1, now)
+                return True, 0.0
+            self._buckets[key] = (tokens, now)
+            return False, (1 - tokens) * limit.interval
+
+
+class SQLiteBackend:
+    """Buckets en SQLite (WAL) compartidos por los workers del nodo"""
+
+    def __init__(self, path: str = RATE_LIMIT_PATH):
+        self.path = path
+        self._local = threading.local()
+        self._calls = 0
+        conn = self._connect()
+        conn.executescript(SCHEMA)
+        self._migrate(conn)
+
+    def _connect(self) -> sqlite3.Connection:
+        """Conexión SQLite por hilo y por proceso (no se comparte tras un fork)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute('PRAGMA busy_timeout=5000')
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+    @staticmethod
+    def _migrate(conn: sqlite3.Connection):
+        """Añadir full_at a tablas anteriores; sus filas se conservan el tiempo del límite más largo"""
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            columns = {row[1] for row in conn.execute('PRAGMA table_info(rate_buckets)')}
+            if 'full_at' not in columns:
+                conn.execute('ALTER TABLE rate_buckets ADD COLUMN full_at REAL')
+                conn.execute('UPDATE rate_buckets SET full_at = updated_at + ?', (MAX_REFILL_SECONDS,))
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+    def consume(self, key: str, limit: Limit, now: float) -> Tuple[bool, float]:
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute('SELECT tokens, updated_at FROM rate_buckets WHERE key = ?', (key,)).fetchone()
+            tokens = refill(row[0], now - row[1], limit) if row else limit.capacity
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            # Cada fila guarda cuándo estará llena con su propio límite: la poda no depende de quién la lance
+            conn.execute(
+                'INSERT INTO rate_buckets (key, tokens, updated_at, full_at) VALUES (?, ?, ?, ?) '
+                'ON CONFLICT(key) DO UPDATE SET tokens = excluded.tokens, updated_at = excluded.updated_at, '
+                'full_at = excluded.full_at',
+                (key, tokens, now, now + (limit.capacity - tokens) * limit.interval)
+            )
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        self._calls += 1
+        if self._calls % PRUNE_EVERY == 0:
+            self.prune(now)
+        return allowed, 0.0 if allowed else (1 - tokens) * limit.interval
+
+    def prune(self, now: float) -> int:
+        """Borrar buckets que ya se habrían rellenado por completo"""
+        cursor = self._connect().execute('DELETE FROM rate_buckets WHERE full_at <= ?', (now,))
+        return cursor.rowcount
+
+
+class RedisBackend:
+    """Buckets en redis, compartidos entre nodos"""
+
+    def __init__(self, url: str = RATE_LIMIT_REDIS_URL):
+        if redis is None:
+            raise RuntimeError('RATE_LIMIT_BACKEND=redis requiere el paquete redis')
+        self._client = redis.Redis.from_url(url, socket_timeout=0.5)
+        self._script = self._client.register_script(REDIS_SCRIPT)
+
+    def consume(self, key: str, limit: Limit, now: float) -> Tuple[bool, float]:
+        allowed, wait = self._script(keys=[f'rate:{key}'], args=[limit.capacity, limit.interval, now])
+        return bool(allowed), float(wait)
+
+
+BACKENDS = {
+    'memory': MemoryBackend,
+    'sqlite': SQLiteBackend,
+    'redis': RedisBackend,
+}
+
+
+class RateLimiter:
+    """Token buckets por clave con rechazo local de las claves ya bloqueadas"""
+
+    def __init__(self, backend=None, enabled: bool = RATE_LIMIT_ENABLED):
+        self.backend = backend if backend is not None else BACKENDS[RATE_LIMIT_BACKEND]()
+        self.enabled = enabled
+        self._blocked: Dict[str, float] = {}
+        self.rejected = 0
+
+    def hit(self, key: str, limit: Limit) -> Optional[int]:
+        """Consumir un token; None si se permite o segundos de Retry-After si no"""
+        if not self.enabled:
+            return None
+        now = time.time()
+        blocked_until = self._blocked.get(key)
+        if blocked_until is not None:
+            if now < blocked_until:
+                self.rejected += 1
+                return math.ceil(blocked_until - now)
+            self._blocked.pop(key, None)
+        try:
+            allowed, wait = self.backend.consume(key, limit, now)
+        except Exception as e:
+            # Si el almacén falla se deja pasar: el formulario no depende del limitador
+            logger.warning(f'Limitador no disponible ({key}): {e}')
+            return None
+        if allowed:
+            return None
+        if len(self._blocked) >= MAX_BLOCKED_KEYS:
+            self._blocked = {k: until for k, until in self._blocked.items() if until > now}
+        self._blocked[key] = now + wait
+        self.rejected += 1
+        return max(1, math.ceil(wait))
+
+
+def client_ip(request) -> str:
+    """IP del cliente, tomando X-Forwarded-For solo si hay proxies de confianza"""
+    if RATE_LIMIT_TRUSTED_PROXIES > 0:
+        route = request.access_route
+        return route[max(0, len(route) - RATE_LIMIT_TRUSTED_PROXIES)]
+    return request.remote_addr or 'unknown'
+
+
+def email_key(email: str) -> str:
+    """Clave del email normalizado (sin guardar la dirección en claro)"""
+    digest = hashlib.blake2b(email.strip().lower().encode('utf-8'), digest_size=16).hexdigest()
+    return f'email:{digest}'
@@ -0,0 +1,225 @@
+"""
+Caché compartida de respuestas estáticas pequeñas para StarkMind
+
+index.html (fallback del SPA), manifest.json, favicon, robots.txt, logos y
+las variantes comprimidas de los entrypoints se sirven sin open/stat/read:
+sus cuerpos, con las cabeceras ya preparadas, viven en un único archivo
+mapeado en memoria (en /dev/shm si existe). Todos los workers mapean el
+mismo archivo, así hay una sola copia en RAM en lugar de una por worker.
+
+El segmento (`responses.bin`) se construye una vez por build: el primer
+proceso que lo necesita lo escribe en un temporal (con flock) y lo publica
+con rename atómico. Su cabecera lleva la huella del contenido y un número
+de generación que crece en cada reemplazo. Un proceso cuyo build coincide
+con la huella solo lo mapea; los que aún mapean uno anterior conservan su
+copia hasta cambiar de build, y el kernel la libera al desmapearla. Nadie
+borra los segmentos de otros procesos. Entra lo que cabe en
+RESPONSE_CACHE_BUDGET bytes, empezando por los archivos raíz y los
+entrypoints; el resto se sirve desde disco como antes.
+"""
+
+import fcntl
+import hashlib
+import json
+import logging
+import mmap
+import os
+import struct
+import threading
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from werkzeug.http import http_date
+
+from static_assets import Asset, StaticIndex, Variant
+
+logger = logging.getLogger(__name__)
+
+RESPONSE_CACHE_ENABLED = os.getenv('RESPONSE_CACHE_ENABLED', 'True').lower() == 'true'
+RESPONSE_CACHE_DIR = os.getenv(
+    'RESPONSE_CACHE_DIR',
+    '/dev/shm/starkmind-responses' if os.path.isdir('/dev/shm') else os.path.join('data', 'response_cache')
+)
+RESPONSE_CACHE_BUDGET = int(os.getenv('RESPONSE_CACHE_BUDGET', str(8 * 1024 * 1024)))
+# Tamaño máximo de cada cuerpo (original o variante .br/.gz)
+RESPONSE_CACHE_MAX_ENTRY = int(os.getenv('RESPONSE_CACHE_MAX_ENTRY', str(128 * 1024)))
+
+SEGMENT_NAME = 'responses.bin'
+# Cabecera del archivo: offset y longitud del índice JSON (que va tras los cuerpos),
+# generación del segmento y huella del contenido
+HEADER = struct.Struct('<QQQ24s')
+
+
+class Entry(NamedTuple):
+    """Cuerpo dentro del segmento y cabeceras de la respuesta 200"""
+    offset: int
+    length: int
+    etag: str
+    headers: List[Tuple[str, str]]
+
+
+def _priority(relative: str, entrypoints: set) -> int:
+    """Primero los archivos raíz (index.html, favicon...), luego los entrypoints, luego el resto"""
+    if '/' not in relative:
+        return 0
+    if relative in entrypoints:
+        return 1
+    return 2
+
+
+def select(static_index: StaticIndex, budget: int, max_entry: int) -> List[Tuple[str, Asset, Variant]]:
+    """Variantes que entran en el presupuesto, por prioridad y de menor a mayor"""
+    entrypoints = {name.lstrip('/') for name in static_index.manifest.get('entrypoints', [])}
+    candidates = []
+    for relative, asset in static_index.files.items():
+        for variant in (Variant(None, asset.path, asset.size, asset.etag),) + asset.variants:
+            if variant.size <= max_entry:
+                candidates.append((_priority(relative, entrypoints), variant.size, relative, asset, variant))
+    candidates.sort(key=lambda candidate: candidate[:3])
+    selected, used = [], 0
+    for _, size, relative, asset, variant in candidates:
+        if used + size <= budget:
+            selected.append((relative, asset, variant))
+            used += size
+    return selected
+
+
+def _headers(asset: Asset, variant: Variant) -> List[Tuple[str, str]]:
+    headers = [
+        ('Content-Type', asset.content_type),
+        ('Content-Length', str(variant.size)),
+        ('ETag', f'"{variant.etag}"'),
+        ('Last-Modified', http_date(asset.mtime)),
+        ('Cache-Control', asset.cache_control),
+    ]
+    if variant.encoding:
+        headers.append(('Content-Encoding', variant.encoding))
+    if asset.variants:
+        headers.append(('Vary', 'Accept-Encoding'))
+    return headers
+
+
+class ResponseCache:
+    """Segmento mapeado en memoria con las respuestas de un build"""
+
+    def __init__(self, directory: str = RESPONSE_CACHE_DIR, budget: int = RESPONSE_CACHE_BUDGET,
+                 max_entry: int = RESPONSE_CACHE_MAX_ENTRY, enabled: bool = RESPONSE_CACHE_ENABLED):
+        self.directory = directory
+        self.budget = budget
+        self.max_entry = max_entry
+        self.enabled = enabled
+        self._entries: Dict[str, Entry] = {}
+        self._mm: Optional[mmap.mmap] = None
+        self._generation: Optional[int] = None
+        self._lock = threading.Lock()
+        self.segment_path: Optional[str] = None
+        self.segment_bytes = 0
+        self.segment_generation = 0
+        self._stats_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def refresh(self, static_index: StaticIndex):
+        """Mapear el segmento del build actual (construyéndolo si ningún proceso lo hizo aún)"""
+        if not self.enabled or static_index.generation == self._generation:
+            return
+        with self._lock:
+            if static_index.generation == self._generation:
+                return
+            generation = static_index.generation
+            try:
+                self._load(static_index)
+            except OSError as e:
+                # Sin segmento se sirve desde disco: la caché es solo una optimización
+                logger.warning(f'Caché de respuestas no disponible: {e}')
+                self._entries, self._mm = {}, None
+            self._generation = generation
+
+    def _load(self, static_index: StaticIndex):
+        selected = select(static_index, self.budget, self.max_entry)
+        key = hashlib.blake2b(
+            json.dumps([(relative, variant.etag, asset.cache_control) for relative, asset, variant in selected]).encode(),
+            digest_size=12
+        ).hexdigest()
+        path = os.path.join(self.directory, SEGMENT_NAME)
+        os.makedirs(self.directory, exist_ok=True)
+        segment = self._map(path)
+        if segment is None or segment[2] != key:
+            with open(os.path.join(self.directory, '.lock'), 'w') as lock:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+                segment = self._map(path)
+                if segment is None or segment[2] != key:
+                    self._write(path, selected, key, segment[1] + 1 if segment else 1)
+                    segment = self._map(path)
+        if segment is None:
+            raise OSError(f'segmento ilegible: {path}')
+        mm, generation, _ = segment
+        index_offset, index_length = HEADER.unpack_from(mm, 0)[:2]
+        index = json.loads(mm[index_offset:index_offset + index_length])
+        self._entries = {
+            variant_path: Entry(offset, length, etag, [tuple(header) for header in headers])
+            for variant_path, (offset, length, etag, headers) in index.items()
+        }
+        self._mm = mm
+        self.segment_path = path
+        self.segment_bytes = len(mm)
+        self.segment_generation = generation
+
+    @staticmethod
+    def _map(path: str) -> Optional[Tuple[mmap.mmap, int, str]]:
+        """Segmento publicado con su generación y huella (None si no existe o está vacío)"""
+        try:
+            with open(path, 'rb') as f:
+                if os.fstat(f.fileno()).st_size < HEADER.size:
+                    return None
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except FileNotFoundError:
+            return None
+        _, _, generation, key = HEADER.unpack_from(mm, 0)
+        return mm, generation, key.decode('ascii')
+
+    def _write(self, path: str, selected: List[Tuple[str, Asset, Variant]], key: str, generation: int):
+        """Escribir cuerpos + índice en un temporal y publicarlo con rename atómico sobre el segmento actual"""
+        index, offset = {}, HEADER.size
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'wb') as out:
+            out.write(HEADER.pack(0, 0, 0, b''))
+            for _, asset, variant in selected:
+                try:
+                    with open(variant.path, 'rb') as f:
+                        body = f.read()
+                except OSError:
+                    continue
+                out.write(body)
+                index[variant.path] = [offset, len(body), variant.etag, _headers(asset, variant._replace(size=len(body)))]
+                offset += len(body)
+            encoded = json.dumps(index).encode()
+            out.write(encoded)
+            out.seek(0)
+            out.write(HEADER.pack(offset, len(encoded), generation, key.encode('ascii')))
+        # Los procesos que mapean el segmento anterior conservan su copia hasta cambiar de build
+        os.replace(tmp_path, path)
+        logger.info(f'Caché de respuestas: {len(index)} cuerpos, {(offset - HEADER.size) / 1024:.0f} KB '
+                    f'en {path} (generación {generation})')
+
+    def get(self, variant: Variant) -> Optional[Tuple[bytes, List[Tuple[str, str]]]]:
+        """Cuerpo y cabeceras de la variante, o None si no está en el segmento"""
+        entry = self._entries.get(variant.path)
+        if entry is None or entry.etag != variant.etag or self._mm is None:
+            with self._stats_lock:
+                self.misses += 1
+            return None
+        with self._stats_lock:
+            self.hits += 1
+        return self._mm[entry.offset:entry.offset + entry.length], entry.headers
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'segment_bytes': self.segment_bytes,
+            'segment_generation': self.segment_generation,
+            'budget_bytes': self.budget,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': round(self.hits / lookups, 4) if lookups else None,
+        }
@@ -1,4 +1,4 @@
-import React, { useState } from 'react';
+import React, { useRef, useState } from 'react';
 import { useLanguage } from '../context/LanguageContext';
 import { Send, CheckCircle, AlertCircle, User, Mail, Building, Phone, MessageSquare, Calendar, Clock, Shield, Zap } from 'lucide-react';
 
@@ -16,6 +16,13 @@ const ContactSection: React.FC = () => {
   const [formData, setFormData] = useState({ nombre: '', email: '', empresa: '', celular: '', mensaje: '' });
   const [errors, setErrors] = useState<FormErrors>({});
   const [touched, setTouched] = useState<Record<string, boolean>>({});
+  // Clave de idempotencia del contenido actual: los reintentos y dobles clics la reutilizan
+  const submissionKey = useRef<string | null>(null);
+
+  const newSubmissionKey = () =>
+    typeof crypto !== 'undefined' && 'randomUUID' in crypto
+      ? crypto.randomUUID()
+      : `${Date.now().toString(36)}-${Math.random().toString(36).slice(2)}`;
 
   const validateField = (name: string, value: string): string | undefined => {
     switch (name) {
@@ -39,6 +46,7 @@ const ContactSection: React.FC = () => {
   const handleChange = (e: React.ChangeEvent<HTMLInputElement | HTMLTextAreaElement>) => {
     const { name, value } = e.target;
     setFormData({ ...formData, [name]: value });
+    submissionKey.current = null;
     
     // Real-time validation
     if (touched[name]) {
@@ -56,6 +64,7 @@ const ContactSection: React.FC = () => {
 
   const handleSubmit = async (e: React.FormEvent) => {
     e.preventDefault();
+    if (formState === 'submitting') return;
     
     // Validate all fields
     const newErrors: FormErrors = {};
@@ -75,21 +84,25 @@ const ContactSection: React.FC = () => {
     }
     
     setFormState('submitting');
+    const idempotencyKey = submissionKey.current ?? newSubmissionKey();
+    submissionKey.current = idempotencyKey;
     
     try {
       const response = await fetch('/api/send-email', {
         method: 'POST',
         headers: { 
           'Content-Type': 'application/json',
-          'Accept': 'application/json'
+          'Accept': 'application/json',
+          'Idempotency-Key': idempotencyKey
         },
-        body: JSON.stringify(formData),
+        body: JSON.stringify({ ...formData, idioma: currentLang }),
       });
       
       const result = await response.json();
       
       if (response.ok && result.success) {
         setFormState('submitted');
+        submissionKey.current = null;
         setFormData({ nombre: '', email: '', empresa: '', celular: '', mensaje: '' });
         setErrors({});
         setTouched({});
@@ -7,6 +7,12 @@ interface ProjectImage {
   description: string;
 }
 
+// Anchos que /img sirve como variantes redimensionadas (IMAGE_WIDTHS en image_variants.py)
+const IMAGE_WIDTHS = [320, 640, 960, 1280, 1920];
+
+const srcSetFor = (src: string): string =>
+  IMAGE_WIDTHS.map((width) => `${src}?w=${width} ${width}w`).join(', ');
+
 interface Project {
   id: string;
   name: string;
@@ -203,7 +209,10 @@ const PortfolioSection: React.FC = () => {
               <div className="relative h-64 overflow-hidden bg-neutral-900 flex items-center justify-center">
                 <img
                   src={project.images[0].src}
+                  srcSet={srcSetFor(project.images[0].src)}
+                  sizes="(min-width: 1024px) 33vw, (min-width: 768px) 50vw, 100vw"
                   alt={project.name}
+                  loading="lazy"
                   className="w-full h-full object-contain transition-transform duration-700 group-hover:scale-110"
                 />
                 <div className="absolute inset-0 bg-gradient-to-t from-neutral-900 via-neutral-900/40 to-transparent opacity-60 group-hover:opacity-40 transition-opacity duration-300"></div>
@@ -256,6 +265,8 @@ const PortfolioSection: React.FC = () => {
               <div className="relative rounded-xl overflow-hidden shadow-2xl max-h-[70vh] flex items-center justify-center bg-neutral-900">
                 <img
                   src={currentProject.images[selectedImage].src}
+                  srcSet={srcSetFor(currentProject.images[selectedImage].src)}
+                  sizes="(min-width: 1280px) 1280px, 100vw"
                   alt={currentProject.images[selectedImage].title}
                   className="w-full h-full object-contain max-h-[70vh]"
                 />
@@ -318,7 +329,10 @@ const PortfolioSection: React.FC = () => {
                   >
                     <img
                       src={image.src}
+                      srcSet={srcSetFor(image.src)}
+                      sizes="160px"
                       alt={image.title}
+                      loading="lazy"
                       className="w-full h-full object-contain"
                     />
                   </button>
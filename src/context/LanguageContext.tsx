@@ -55,7 +55,10 @@ export const useLanguage = () => {
 };
 
 export const LanguageProvider: React.FC<{ children: React.ReactNode }> = ({ children }) => {
-  const [currentLang, setCurrentLang] = useState<Language>('es');
+  // Idioma elegido por prerender.py (<html data-lang>, según Accept-Language o ?lang=); sin él, español
+  const [currentLang, setCurrentLang] = useState<Language>(
+    () => (document.documentElement.dataset.lang === 'en' ? 'en' : 'es')
+  );
 
   const toggleLanguage = () => {
     const newLang = currentLang === 'es' ? 'en' : 'es';
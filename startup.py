@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Tiempo de arranque de StarkMind Landing
+
+Cada worker de gunicorn y cada reinicio del contenedor importan `wsgi` (app,
+índice estático, plantillas...). Este script mide ese coste en un intérprete
+nuevo:
+
+    python startup.py importtime [--top 20]   # desglose estilo `python -X importtime`
+    python startup.py check [--budget-ms 400]  # falla (exit 1) si se supera el presupuesto
+
+`check` también falla si al arrancar se importan módulos que deben cargarse
+de forma perezosa (SDK de Brevo, Pillow).
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Presupuesto de arranque en frío (mediana de `import wsgi`, en ms)
+STARTUP_BUDGET_MS = float(os.getenv('STARTUP_BUDGET_MS', '400'))
+# Módulos que no deben importarse al arrancar: se cargan en el primer uso
+DEFERRED_MODULES = ('brevo_python', 'PIL')
+
+PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - started
+print(json.dumps({{'import_ms': elapsed * 1000, 'modules': sorted(sys.modules)}}))
+"""
+
+
+def _run(args: List[str]) -> subprocess.CompletedProcess:
+    return subprocess.run([sys.executable] + args, cwd=BASE_DIR, capture_output=True, text=True)
+
+
+def importtime(module: str = 'wsgi') -> List[Tuple[int, int, int, str]]:
+    """Entradas (profundidad, self µs, acumulado µs, módulo) de `-X importtime`"""
+    result = _run(['-X', 'importtime', '-c', f'import {module}'])
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else 'import falló')
+    entries = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|', 2)
+        depth = (len(name) - len(name.lstrip(' '))) // 2
+        entries.append((depth, int(self_us), int(cumulative_us), name.strip()))
+    return entries
+
+
+def by_package(entries: List[Tuple[int, int, int, str]]) -> Dict[str, int]:
+    """Tiempo propio (µs) agrupado por paquete de primer nivel"""
+    totals: Dict[str, int] = {}
+    for _, self_us, _, name in entries:
+        package = name.split('.', 1)[0]
+        totals[package] = totals.get(package, 0) + self_us
+    return dict(sorted(totals.items(), key=lambda item: item[1], reverse=True))
+
+
+def cold_start(module: str = 'wsgi', runs: int = 5) -> dict:
+    """Mediana del tiempo de `import module` en intérpretes nuevos y módulos cargados"""
+    samples = []
+    modules: List[str] = []
+    for _ in range(runs):
+        result = _run(['-c', PROBE.format(module=module)])
+        if result.returncode != 0:
+            raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else 'import falló')
+        probe = json.loads(result.stdout.strip().splitlines()[-1])
+        samples.append(probe['import_ms'])
+        modules = probe['modules']
+    eager = sorted({name.split('.', 1)[0] for name in modules} & set(DEFERRED_MODULES))
+    return {
+        'median_ms': round(statistics.median(samples), 1),
+        'min_ms': round(min(samples), 1),
+        'max_ms': round(max(samples), 1),
+        'modules_loaded': len(modules),
+        'eager_deferred_modules': eager,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Tiempo de arranque de StarkMind Landing')
+    subcommands = parser.add_subparsers(dest='command', required=True)
+
+    report = subcommands.add_parser('importtime', help='Desglose de imports al cargar la app')
+    report.add_argument('--module', default='wsgi')
+    report.add_argument('--top', type=int, default=20)
+    report.add_argument('--json', action='store_true')
+
+    check = subcommands.add_parser('check', help='Comprobar el presupuesto de arranque en frío')
+    check.add_argument('--module', default='wsgi')
+    check.add_argument('--runs', type=int, default=5)
+    check.add_argument('--budget-ms', type=float, default=STARTUP_BUDGET_MS)
+    check.add_argument('--json', action='store_true')
+
+    args = parser.parse_args()
+
+    if args.command == 'importtime':
+        entries = importtime(args.module)
+        packages = by_package(entries)
+        slowest = sorted(entries, key=lambda entry: entry[2], reverse=True)[:args.top]
+        if args.json:
+            print(json.dumps({
+                'packages_ms': {name: round(us / 1000, 2) for name, us in packages.items()},
+                'slowest': [{'module': name, 'self_ms': round(s / 1000, 2), 'cumulative_ms': round(c / 1000, 2)}
+                            for _, s, c, name in slowest],
+            }, indent=2))
+            return
+        total = sum(packages.values())
+        print(f'📦 Import de {args.module}: {total / 1000:.1f} ms en {len(entries)} módulos\n')
+        print(f"{'paquete':<32}{'ms':>10}{'%':>8}")
+        for name, us in list(packages.items())[:args.top]:
+            print(f'{name:<32}{us / 1000:>10.1f}{us / total * 100:>8.1f}')
+        print(f"\n{'módulo (acumulado)':<48}{'self ms':>10}{'total ms':>10}")
+        for _, self_us, cumulative_us, name in slowest:
+            print(f'{name:<48}{self_us / 1000:>10.1f}{cumulative_us / 1000:>10.1f}')
+        return
+
+    result = cold_start(args.module, args.runs)
+    result['budget_ms'] = args.budget_ms
+    result['ok'] = result['median_ms'] <= args.budget_ms and not result['eager_deferred_modules']
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        print(f"⏱️  Arranque en frío de {args.module}: mediana {result['median_ms']} ms "
+              f"(min {result['min_ms']}, max {result['max_ms']}), presupuesto {args.budget_ms:.0f} ms")
+        if result['eager_deferred_modules']:
+            print(f"❌ Importados al arrancar (deben ser perezosos): {', '.join(result['eager_deferred_modules'])}")
+        print('✅ Dentro del presupuesto' if result['ok'] else '❌ Fuera del presupuesto')
+    sys.exit(0 if result['ok'] else 1)
+
+
+if __name__ == '__main__':
+    main()
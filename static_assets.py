@@ -0,0 +1,394 @@
+"""
+Índice en memoria de los archivos estáticos del build de React
+
+Al arrancar se recorre el directorio del build (partiendo de
+asset-manifest.json) y se construye un diccionario ruta -> archivo con su
+tamaño, mtime y content type. Las rutas de Flask resuelven los assets con
+búsquedas en el diccionario en lugar de probar `os.path.exists` en cada
+petición. El índice se reconstruye al recibir SIGHUP o cuando cambia el
+build (comprobación limitada a una vez cada pocos segundos).
+
+Los assets comprimibles se sirven desde hermanos precomprimidos `.br` y
+`.gz` generados en el build de Docker (`python static_assets.py
+--precompress static`) o al arrancar, eligiendo la variante según
+Accept-Encoding sin gastar CPU por petición.
+
+Cada asset lleva su ETag fuerte (hash del contenido, calculado una vez al
+indexar) y su política de Cache-Control: los archivos con hash en el nombre
+se cachean un año como `immutable`; index.html y el resto se revalidan.
+"""
+
+import gzip
+import hashlib
+import json
+import logging
+import mimetypes
+import os
+import posixpath
+import re
+import signal
+import sys
+import tempfile
+import threading
+import time
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+try:
+    import brotli
+except ImportError:  # Opcional: sin brotli solo se generan variantes gzip
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+STATIC_ROOT = os.getenv('STATIC_ROOT', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static'))
+CHECK_INTERVAL = float(os.getenv('STATIC_INDEX_CHECK_INTERVAL', '5'))
+PRECOMPRESS_ON_STARTUP = os.getenv('STATIC_PRECOMPRESS', 'True').lower() == 'true'
+
+# Extensiones que vale la pena comprimir y tamaño mínimo (bytes)
+COMPRESSIBLE_EXTENSIONS = {'js', 'css', 'html', 'json', 'map', 'svg', 'txt', 'ico', 'xml'}
+COMPRESS_MIN_SIZE = 1024
+# Orden de preferencia de las variantes precomprimidas
+ENCODING_SUFFIXES = (('br', '.br'), ('gzip', '.gz'))
+
+# Política de caché: los nombres con hash de CRA (main.3f70f747.js) nunca cambian de contenido
+FINGERPRINT_RE = re.compile(r'\.[0-9a-f]{8,}\.')
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+SHORT_MAX_AGE = int(os.getenv('STATIC_SHORT_MAX_AGE', '300'))
+NO_CACHE_FILES = {'index.html'}
+# Los archivos mayores (videos) usan mtime+tamaño como ETag en lugar de hashear el contenido
+ETAG_HASH_MAX_SIZE = int(os.getenv('STATIC_ETAG_HASH_MAX_SIZE', str(16 * 1024 * 1024)))
+
+# Content types que mimetypes no resuelve igual en todas las plataformas
+CONTENT_TYPE_OVERRIDES = {
+    '.ico': 'image/vnd.microsoft.icon',
+    '.json': 'application/json',
+    '.map': 'application/json',
+    '.js': 'application/javascript',
+    '.svg': 'image/svg+xml',
+    '.woff': 'font/woff',
+    '.woff2': 'font/woff2',
+    '.mp4': 'video/mp4',
+    '.webm': 'video/webm',
+}
+
+# Subdirectorios del build donde se buscan los assets por extensión
+STATIC_SUBDIRS = {
+    'css': ('static/css',),
+    'js': ('static/js',),
+    'map': ('static/css', 'static/js'),
+}
+MEDIA_EXTENSIONS = {'png', 'jpg', 'jpeg', 'svg', 'gif'}
+SPA_MEDIA_EXTENSIONS = {'png', 'jpg', 'jpeg', 'svg', 'ico', 'gif', 'woff', 'woff2', 'ttf', 'eot'}
+
+
+class Variant(NamedTuple):
+    """Representación servible de un asset (original o hermano precomprimido)"""
+    encoding: Optional[str]
+    path: str
+    size: int
+    etag: str
+
+
+class Asset(NamedTuple):
+    """Archivo del build resuelto en disco"""
+    path: str
+    size: int
+    mtime: float
+    content_type: str
+    etag: str = ''
+    cache_control: str = 'no-cache'
+    variants: Tuple[Variant, ...] = ()
+
+    def negotiate(self, accept_encodings) -> Variant:
+        """Elegir la representación según un Accept-Encoding de werkzeug"""
+        for variant in self.variants:
+            if accept_encodings[variant.encoding] > 0:
+                return variant
+        return Variant(None, self.path, self.size, self.etag)
+
+
+def guess_content_type(filename: str) -> str:
+    extension = os.path.splitext(filename)[1].lower()
+    if extension in CONTENT_TYPE_OVERRIDES:
+        return CONTENT_TYPE_OVERRIDES[extension]
+    return mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+
+
+def _extension(path: str) -> str:
+    return path.rsplit('.', 1)[-1].lower() if '.' in path else ''
+
+
+def is_compressible(path: str) -> bool:
+    return _extension(path) in COMPRESSIBLE_EXTENSIONS
+
+
+def cache_control_for(relative: str) -> str:
+    """Cache-Control según el tipo de archivo del build"""
+    basename = posixpath.basename(relative)
+    if FINGERPRINT_RE.search(basename):
+        return IMMUTABLE_CACHE_CONTROL
+    if basename in NO_CACHE_FILES or SHORT_MAX_AGE <= 0:
+        return 'no-cache'
+    return f'public, max-age={SHORT_MAX_AGE}, must-revalidate'
+
+
+def content_etag(path: str, size: int, mtime: float) -> str:
+    """ETag fuerte a partir del contenido (una sola lectura al indexar)"""
+    if size > ETAG_HASH_MAX_SIZE:
+        return f'{int(mtime)}-{size:x}'
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _write_atomic(path: str, data: bytes, mtime: float):
+    """Escribir vía archivo temporal + rename: varios workers pueden precomprimir a la vez"""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.precompress-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.utime(tmp_path, (mtime, mtime))
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def precompress(root: str = STATIC_ROOT) -> List[str]:
+    """Generar hermanos .br/.gz de los assets comprimibles que no los tengan al día"""
+    written = []
+    for directory, _, filenames in os.walk(root):
+        for filename in filenames:
+            if filename.endswith(('.br', '.gz')) or not is_compressible(filename):
+                continue
+            path = os.path.join(directory, filename)
+            stat = os.stat(path)
+            if stat.st_size < COMPRESS_MIN_SIZE:
+                continue
+            data = None
+            for encoding, suffix in ENCODING_SUFFIXES:
+                if encoding == 'br' and brotli is None:
+                    continue
+                target = path + suffix
+                try:
+                    if os.stat(target).st_mtime == stat.st_mtime:
+                        continue
+                except OSError:
+                    pass
+                if data is None:
+                    with open(path, 'rb') as f:
+                        data = f.read()
+                if encoding == 'br':
+                    compressed = brotli.compress(data, quality=11)
+                else:
+                    compressed = gzip.compress(data, compresslevel=9, mtime=0)
+                # Solo vale la pena si ahorra al menos un 10%
+                if len(compressed) < len(data) * 0.9:
+                    _write_atomic(target, compressed, stat.st_mtime)
+                    written.append(target)
+    return written
+
+
+class StaticIndex:
+    """Mapa inmutable ruta relativa -> Asset, reemplazado en bloque al reconstruir"""
+
+    def __init__(self, root: str = STATIC_ROOT, check_interval: float = CHECK_INTERVAL):
+        self.root = root
+        self.check_interval = check_interval
+        self.files: Dict[str, Asset] = {}
+        self.manifest: dict = {}
+        # Se incrementa en cada reconstrucción; las cachés derivadas lo comparan
+        self.generation = 0
+        self._signature: Optional[Tuple] = None
+        self._next_check = 0.0
+        self._stale = False
+        self._lock = threading.Lock()
+        # Una sola reconstrucción aunque varios hilos detecten el cambio a la vez
+        self._build_lock = threading.Lock()
+        self.build()
+
+    # -- Construcción -----------------------------------------------------
+
+    def _build_signature(self) -> Tuple:
+        """Huella barata del build: cambia cuando se despliega uno nuevo"""
+        signature = []
+        for name in ('asset-manifest.json', 'index.html', ''):
+            try:
+                stat = os.stat(os.path.join(self.root, name))
+                signature.append((stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                signature.append(None)
+        return tuple(signature)
+
+    def _load_manifest(self) -> dict:
+        try:
+            with open(os.path.join(self.root, 'asset-manifest.json'), encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _stat_asset(self, relative: str) -> Optional[Asset]:
+        path = os.path.join(self.root, *relative.split('/'))
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        # Reutilizar el hash del índice anterior si el archivo no cambió
+        previous = self.files.get(relative)
+        if previous is not None and previous.mtime == stat.st_mtime and previous.size == stat.st_size:
+            etag = previous.etag
+        else:
+            try:
+                etag = content_etag(path, stat.st_size, stat.st_mtime)
+            except OSError:
+                return None
+        variants = []
+        if is_compressible(relative):
+            for encoding, suffix in ENCODING_SUFFIXES:
+                try:
+                    variant_stat = os.stat(path + suffix)
+                except OSError:
+                    continue
+                # Un hermano de otro build (mtime distinto) se ignora
+                if variant_stat.st_mtime == stat.st_mtime:
+                    variants.append(Variant(encoding, path + suffix, variant_stat.st_size, f'{etag}-{encoding}'))
+        return Asset(path, stat.st_size, stat.st_mtime, guess_content_type(relative),
+                     etag, cache_control_for(relative), tuple(variants))
+
+    def build(self):
+        """Escanear el build completo y reemplazar el índice"""
+        started = time.perf_counter()
+        if PRECOMPRESS_ON_STARTUP and os.path.isdir(self.root):
+            try:
+                written = precompress(self.root)
+                if written:
+                    logger.info(f'Precomprimidos {len(written)} assets estáticos')
+            except OSError as e:
+                logger.warning(f'No se pudieron precomprimir los assets estáticos: {e}')
+        signature = self._build_signature()
+        manifest = self._load_manifest()
+        files: Dict[str, Asset] = {}
+
+        # Sembrar con los archivos que declara asset-manifest.json
+        declared = list(manifest.get('files', {}).values()) + list(manifest.get('entrypoints', []))
+        for url in declared:
+            relative = url.lstrip('/')
+            asset = self._stat_asset(relative)
+            if asset is None:
+                logger.warning(f'Asset declarado en asset-manifest.json no encontrado: {relative}')
+                continue
+            files[relative] = asset
+
+        # Completar con el resto del build (favicon, manifest.json, media, img...)
+        for directory, _, filenames in os.walk(self.root):
+            for filename in filenames:
+                if filename.endswith(('.br', '.gz')) or filename.startswith('.precompress-'):
+                    continue
+                relative = os.path.relpath(os.path.join(directory, filename), self.root).replace(os.sep, '/')
+                if relative not in files:
+                    asset = self._stat_asset(relative)
+                    if asset is not None:
+                        files[relative] = asset
+
+        with self._lock:
+            self.files = files
+            self.manifest = manifest
+            self.generation += 1
+            self._signature = signature
+            self._stale = False
+            self._next_check = time.monotonic() + self.check_interval
+        logger.info(f'Índice estático construido: {len(files)} archivos en {(time.perf_counter() - started) * 1000:.1f} ms')
+
+    def refresh_if_changed(self):
+        """Reconstruir si llegó SIGHUP o si cambió el build (como mucho cada `check_interval`)"""
+        if self._stale:
+            with self._build_lock:
+                if self._stale:
+                    self.build()
+            return
+        now = time.monotonic()
+        if now < self._next_check:
+            return
+        self._next_check = now + self.check_interval
+        if self._build_signature() != self._signature:
+            with self._build_lock:
+                # Otro hilo pudo reconstruir mientras se esperaba el lock
+                if self._build_signature() != self._signature:
+                    logger.info('Cambio detectado en el build, reconstruyendo índice estático')
+                    self.build()
+
+    def mark_stale(self, *_):
+        """Handler de SIGHUP: el siguiente acceso reconstruye el índice"""
+        self._stale = True
+
+    def install_signal_handler(self):
+        """Registrar SIGHUP (solo posible desde el hilo principal)"""
+        if not hasattr(signal, 'SIGHUP') or threading.current_thread() is not threading.main_thread():
+            return
+        previous = signal.getsignal(signal.SIGHUP)
+
+        def handler(signum, frame):
+            self.mark_stale()
+            if callable(previous):
+                previous(signum, frame)
+
+        signal.signal(signal.SIGHUP, handler)
+
+    # -- Búsquedas --------------------------------------------------------
+
+    def get(self, relative: str) -> Optional[Asset]:
+        """Asset por ruta relativa al build"""
+        self.refresh_if_changed()
+        return self.files.get(relative)
+
+    def resolve_static(self, filename: str) -> Optional[Asset]:
+        """Resolver /static/<filename>: ruta directa y luego subdirectorio según la extensión"""
+        self.refresh_if_changed()
+        files = self.files
+        asset = files.get('static/' + filename)
+        if asset is not None:
+            return asset
+        extension = _extension(filename)
+        basename = posixpath.basename(filename)
+        if extension in ('css', 'js'):
+            return files.get(STATIC_SUBDIRS[extension][0] + '/' + basename)
+        if extension in MEDIA_EXTENSIONS:
+            return files.get('static/media/' + basename)
+        return None
+
+    def resolve_spa(self, path: str) -> Optional[Asset]:
+        """Resolver rutas con extensión que llegan al catch-all de React Router"""
+        self.refresh_if_changed()
+        files = self.files
+        extension = _extension(path)
+        basename = posixpath.basename(path)
+        if extension in STATIC_SUBDIRS:
+            asset = files.get('static/' + path)
+            if asset is not None:
+                return asset
+            for subdir in STATIC_SUBDIRS[extension]:
+                asset = files.get(subdir + '/' + basename)
+                if asset is not None:
+                    return asset
+            return None
+        if extension in SPA_MEDIA_EXTENSIONS:
+            return (files.get('static/media/' + basename)
+                    or files.get('static/' + path)
+                    or files.get(path))
+        return None
+
+
+if __name__ == '__main__':
+    # Uso: python static_assets.py --precompress [directorio_build]
+    if len(sys.argv) < 2 or sys.argv[1] != '--precompress':
+        print('Uso: python static_assets.py --precompress [directorio_build]')
+        sys.exit(1)
+    logging.basicConfig(level=logging.INFO)
+    build_root = sys.argv[2] if len(sys.argv) > 2 else STATIC_ROOT
+    if brotli is None:
+        print('⚠️  Módulo brotli no instalado: solo se generarán variantes .gz')
+    written = precompress(build_root)
+    print(f'✅ {len(written)} variantes precomprimidas escritas en {build_root}')
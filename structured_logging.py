@@ -0,0 +1,207 @@
+"""
+Logging estructurado y no bloqueante para StarkMind
+
+Los hilos de las peticiones solo encolan registros (`QueueHandler` sobre una
+cola sin límite); un `QueueListener` en segundo plano los formatea como
+líneas JSON y los escribe:
+
+- Logs de aplicación: consola y `LOG_DIR/app.jsonl`.
+- Access log (`landing.access`): `LOG_DIR/access.jsonl`, una línea JSON por
+  petición con request id, ruta, estado, duración y bytes. Las respuestas
+  correctas de archivos estáticos se muestrean con LOG_STATIC_SAMPLE_RATE;
+  cada línea lleva su `sample_rate` para que access_analytics.py la pondere.
+
+Los archivos rotan por tamaño. Como varios workers escriben el mismo archivo,
+la rotación se serializa con un flock y cada proceso reabre el archivo cuando
+otro lo ha rotado.
+"""
+
+import atexit
+import fcntl
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import threading
+import time
+from typing import List, Optional
+
+from flask import has_request_context, request
+
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+LOG_DIR = os.getenv('LOG_DIR', 'logs')
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'json').lower()  # Consola: 'json' o 'text'
+LOG_MAX_BYTES = int(os.getenv('LOG_MAX_BYTES', str(10 * 1024 * 1024)))
+LOG_BACKUP_COUNT = int(os.getenv('LOG_BACKUP_COUNT', '5'))
+LOG_ACCESS = os.getenv('LOG_ACCESS', 'True').lower() == 'true'
+# Fracción de respuestas 2xx/304 de archivos estáticos que se registran (los errores siempre)
+LOG_STATIC_SAMPLE_RATE = float(os.getenv('LOG_STATIC_SAMPLE_RATE', '0.1'))
+
+ACCESS_LOGGER = 'landing.access'
+
+# Atributos estándar de LogRecord; el resto son campos `extra` y van al JSON
+RESERVED_ATTRS = set(vars(logging.makeLogRecord({}))) | {'message', 'asctime'}
+
+access_logger = logging.getLogger(ACCESS_LOGGER)
+
+
+class JsonFormatter(logging.Formatter):
+    """Una línea JSON por registro, con los campos `extra` al primer nivel"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(record.created)) + f'.{int(record.msecs):03d}Z',
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+            'pid': record.process,
+        }
+        for key, value in vars(record).items():
+            if key not in RESERVED_ATTRS and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_text:
+            entry['exc'] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class SharedRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """Rotación por tamaño segura con varios procesos escribiendo el mismo archivo"""
+
+    def __init__(self, filename: str, max_bytes: int, backup_count: int):
+        super().__init__(filename, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8', delay=True)
+        self._lock_path = self.baseFilename + '.lock'
+        self._inode: Optional[int] = None
+
+    def _open(self):
+        stream = super()._open()
+        self._inode = os.fstat(stream.fileno()).st_ino
+        return stream
+
+    def _reopen_if_rotated(self):
+        """Otro proceso rotó el archivo: seguir escribiendo en el nuevo"""
+        if self.stream is None:
+            return
+        try:
+            current = os.stat(self.baseFilename).st_ino
+        except OSError:
+            current = None
+        if current != self._inode:
+            self.stream.close()
+            self.stream = self._open()
+
+    def emit(self, record: logging.LogRecord):
+        self._reopen_if_rotated()
+        super().emit(record)
+
+    def doRollover(self):
+        with open(self._lock_path, 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                # Con el lock tomado, comprobar si otro proceso ya rotó
+                self._reopen_if_rotated()
+                if self.stream is not None and self.stream.tell() < self.maxBytes:
+                    return
+                super().doRollover()
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+class _NameFilter(logging.Filter):
+    """Separar el access log de los logs de aplicación"""
+
+    def __init__(self, access: bool):
+        super().__init__()
+        self.access = access
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return (record.name == ACCESS_LOGGER) == self.access
+
+
+class RequestIdFilter(logging.Filter):
+    """Añadir el request id de la petición en curso (se ejecuta en el hilo de la petición)"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not hasattr(record, 'request_id') and has_request_context():
+            record.request_id = request.environ.get('landing.request_id')
+        return True
+
+
+class LogPipeline:
+    """QueueHandler en el logger raíz y un QueueListener por proceso"""
+
+    def __init__(self, handlers: List[logging.Handler]):
+        self.handlers = handlers
+        self.queue: queue.SimpleQueue = queue.SimpleQueue()
+        self.queue_handler = logging.handlers.QueueHandler(self.queue)
+        self.queue_handler.addFilter(RequestIdFilter())
+        self.listener: Optional[logging.handlers.QueueListener] = None
+        self._pid: Optional[int] = None
+        self._start_lock = threading.Lock()
+
+    def start(self):
+        """Arrancar el listener en este proceso (idempotente y seguro tras fork)"""
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            # Tras un fork, el hilo del padre no existe: cola y listener nuevos
+            self.queue = queue.SimpleQueue()
+            self.queue_handler.queue = self.queue
+            self.listener = logging.handlers.QueueListener(self.queue, *self.handlers, respect_handler_level=True)
+            self.listener.start()
+            self._pid = os.getpid()
+
+    def stop(self):
+        """Vaciar la cola y detener el listener"""
+        if self.listener is not None and self._pid == os.getpid():
+            self.listener.stop()
+            self._pid = None
+
+
+def _file_handler(name: str, access: bool) -> Optional[logging.Handler]:
+    try:
+        os.makedirs(LOG_DIR, exist_ok=True)
+    except OSError as e:
+        print(f'No se pudo crear {LOG_DIR}: {e}', file=sys.stderr)
+        return None
+    handler = SharedRotatingFileHandler(os.path.join(LOG_DIR, name), LOG_MAX_BYTES, LOG_BACKUP_COUNT)
+    handler.setFormatter(JsonFormatter())
+    handler.addFilter(_NameFilter(access))
+    return handler
+
+
+def configure() -> LogPipeline:
+    """Sustituir los handlers del logger raíz por el pipeline en segundo plano"""
+    console = logging.StreamHandler(sys.stderr)
+    console.setFormatter(JsonFormatter() if LOG_FORMAT == 'json'
+                         else logging.Formatter('%(asctime)s %(levelname)s %(name)s: %(message)s'))
+    console.addFilter(_NameFilter(access=False))
+    handlers = [console]
+    for name, access in (('app.jsonl', False), ('access.jsonl', True)):
+        handler = _file_handler(name, access)
+        if handler is not None:
+            handlers.append(handler)
+
+    pipeline = LogPipeline(handlers)
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(pipeline.queue_handler)
+    root.setLevel(LOG_LEVEL)
+    access_logger.setLevel(logging.INFO if LOG_ACCESS else logging.CRITICAL + 1)
+    pipeline.start()
+    atexit.register(pipeline.stop)
+    return pipeline
+
+
+def access_sample_rate(status: int, static: bool) -> float:
+    """Fracción registrada de las respuestas de este tipo (solo se muestrean los estáticos correctos)"""
+    if not static or status >= 400:
+        return 1.0
+    return LOG_STATIC_SAMPLE_RATE
+
+
+def should_log_access(sample_rate: float) -> bool:
+    return sample_rate >= 1 or random.random() < sample_rate
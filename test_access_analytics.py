@@ -0,0 +1,51 @@
+"""
+Rollups del access log de StarkMind con líneas muestreadas
+
+Las respuestas correctas de archivos estáticos se registran con
+LOG_STATIC_SAMPLE_RATE: cada línea con `sample_rate` cuenta como
+1 / sample_rate peticiones en los rollups.
+
+Uso: python -m pytest test_access_analytics.py
+"""
+
+import json
+
+from access_analytics import Rollup, run
+
+
+def line(path: str, status: int = 200, size: int = 1000, sample_rate: float = None) -> bytes:
+    entry = {'ts': '2026-10-18T16:17:54.829Z', 'path': path, 'status': status, 'bytes': size,
+             'referrer': None, 'user_agent': 'pytest'}
+    if sample_rate is not None:
+        entry['sample_rate'] = sample_rate
+    return json.dumps(entry).encode() + b'\n'
+
+
+def test_sampled_lines_are_weighted():
+    rollup = Rollup()
+    for _ in range(3):
+        rollup.parse(line('/static/js/main.abc.js', sample_rate=0.1))
+    rollup.parse(line('/api/send-email', sample_rate=1.0))
+    rollup.parse(line('/api/health'))
+
+    summary = rollup.summary()
+    assert summary['lines'] == 5
+    assert summary['requests'] == 32
+    routes = {route['route']: route for route in summary['routes']}
+    static = routes['/static/js/*']
+    assert static['requests'] == 30
+    assert static['bytes'] == 30000
+    assert static['status'] == {'2xx': 30}
+    assert routes['/api/send-email']['requests'] == 1
+    assert summary['top_user_agents'] == [('pytest', 32)]
+
+
+def test_weights_survive_checkpoint(tmp_path):
+    log = tmp_path / 'access.jsonl'
+    log.write_bytes(line('/static/css/main.abc.css', sample_rate=0.25) * 4 + line('/'))
+    state = {'files': {}, 'sealed': [], 'rollup': {}}
+    run([str(log)], state, workers=1)
+
+    rollup = Rollup.from_dict(json.loads(json.dumps(state['rollup'])))
+    assert rollup.lines == 5
+    assert rollup.summary()['requests'] == 17
@@ -10,6 +10,7 @@ from datetime import datetime
 from dotenv import load_dotenv
 import brevo_python
 from brevo_python.rest import ApiException
+from brevo_client import brevo_client
 from pprint import pprint
 
 # Cargar variables de entorno
@@ -36,12 +37,8 @@ def test_email_system():
     print()
     
     try:
-        # Configurar la API key
-        configuration = brevo_python.Configuration()
-        configuration.api_key['api-key'] = api_key
-        
-        # Crear instancia del cliente
-        api_instance = brevo_python.TransactionalEmailsApi(brevo_python.ApiClient(configuration))
+        # Cliente compartido (mismo pool y timeouts que app.py)
+        api_instance = brevo_client.get_api()
         
         # Datos de prueba
         test_data = {
@@ -229,7 +226,10 @@ def test_email_system():
         )
         
         # Enviar el email
-        api_response = api_instance.send_transac_email(send_smtp_email)
+        api_response = api_instance.send_transac_email(
+            send_smtp_email,
+            _request_timeout=brevo_client.request_timeout
+        )
         
         print("📬 RESPUESTA DE BREVO PYTHON:")
         pprint(api_response)
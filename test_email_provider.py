@@ -0,0 +1,94 @@
+"""
+Clasificación de errores SMTP en el failover y la cola de StarkMind
+
+Las respuestas SMTP 4xx (421, 450...) son transitorias: cuentan para el
+circuito, pasan al proveedor de respaldo y la cola las reintenta. Las 5xx
+(550...) son rechazos definitivos: van a dead-letter al primer intento.
+
+Uso: python -m pytest test_email_provider.py
+"""
+
+import smtplib
+
+import pytest
+
+from email_provider import EmailProvider, EmailProviderError, FailoverProvider, SmtpProvider
+from email_queue import EmailQueue
+
+
+class RejectingServer:
+    """Conexión SMTP falsa que responde a sendmail con un código fijo"""
+
+    def __init__(self, code: int):
+        self.code = code
+
+    def sendmail(self, *args):
+        raise smtplib.SMTPResponseException(self.code, b'rejected')
+
+    def quit(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class RecordingProvider(EmailProvider):
+    """Proveedor de respaldo que acepta todo y cuenta los envíos"""
+
+    name = 'backup'
+
+    def __init__(self):
+        self.sent = 0
+
+    def send(self, sender, recipients, subject, html, text):
+        self.sent += 1
+        return {'success': True, 'message_id': None, 'response': None}
+
+
+def smtp_replying(code: int) -> SmtpProvider:
+    provider = SmtpProvider(host='smtp.invalid', username='leads@example.com', password='x')
+    provider._acquire = lambda: RejectingServer(code)
+    return provider
+
+
+def send(provider: EmailProvider) -> dict:
+    return provider.send('leads@example.com', ['ana@example.com'], 'Asunto', '<p>Hola</p>', 'Hola')
+
+
+def test_smtp_421_fails_over_and_counts_for_the_circuit():
+    backup = RecordingProvider()
+    failover = FailoverProvider([smtp_replying(421), backup])
+    result = send(failover)
+    assert result['provider'] == 'backup'
+    assert backup.sent == 1
+    assert failover.stats[('smtp', 'error')] == 1
+    assert len(failover.providers[0][1]._calls) == 1
+
+
+def test_smtp_550_is_permanent_and_skips_failover():
+    backup = RecordingProvider()
+    failover = FailoverProvider([smtp_replying(550), backup])
+    with pytest.raises(EmailProviderError) as error:
+        send(failover)
+    assert error.value.permanent
+    assert error.value.smtp_code == 550 and error.value.status is None
+    assert backup.sent == 0
+    assert failover.stats[('smtp', 'rejected')] == 1
+    assert len(failover.providers[0][1]._calls) == 0
+
+
+@pytest.mark.parametrize('code, status, attempts', [(421, 'pending', 1), (550, 'dead', 1)])
+def test_queue_retries_smtp_4xx_and_dead_letters_5xx(tmp_path, code, status, attempts):
+    failover = FailoverProvider([smtp_replying(code)])
+    queue = EmailQueue(handler=lambda payload: send(failover), path=str(tmp_path / 'queue.db'), workers=0)
+    queue.enqueue({})
+    [(job_id, payload, attempt)] = queue.claim()
+    queue.process(job_id, payload, attempt)
+    row = queue._connect().execute('SELECT status, attempts FROM email_jobs WHERE id = ?', (job_id,)).fetchone()
+    assert row == (status, attempts)
+
+
+def test_http_4xx_stays_permanent():
+    assert EmailProviderError('bad request', status=400).permanent
+    assert not EmailProviderError('rate limited', status=429).permanent
+    assert not EmailProviderError('unavailable', status=503).permanent
@@ -0,0 +1,27 @@
+"""
+Presupuesto de arranque en frío de StarkMind Landing
+
+Mismo criterio que `python startup.py check`: la mediana de `import wsgi` en
+intérpretes nuevos no supera STARTUP_BUDGET_MS y los módulos perezosos (SDK de
+Brevo, Pillow) no se cargan al arrancar.
+
+Uso: python -m pytest test_startup.py
+"""
+
+from startup import DEFERRED_MODULES, STARTUP_BUDGET_MS, cold_start
+
+
+def test_cold_start_within_budget():
+    result = cold_start('wsgi', runs=5)
+    assert result['median_ms'] <= STARTUP_BUDGET_MS, (
+        f"import wsgi tarda {result['median_ms']} ms (presupuesto {STARTUP_BUDGET_MS:.0f} ms); "
+        f"desglose: python startup.py importtime"
+    )
+
+
+def test_deferred_modules_not_imported_at_startup():
+    result = cold_start('wsgi', runs=1)
+    assert not result['eager_deferred_modules'], (
+        f"Importados al arrancar (deben ser perezosos: {', '.join(DEFERRED_MODULES)}): "
+        f"{', '.join(result['eager_deferred_modules'])}"
+    )
@@ -0,0 +1,10 @@
+"""
+Punto de entrada WSGI para producción
+
+Uso: gunicorn --config gunicorn.conf.py wsgi:app
+"""
+
+from app import app
+
+if __name__ == '__main__':
+    app.run(host='0.0.0.0', port=5000)